@@ -4,8 +4,9 @@ Specialized agent for manufacturing process analysis
 """
 
 from typing import Dict, Any, TYPE_CHECKING
-import json
 from .prompts.manufacturing_analysis import manufacturing_analysis_prompt
+from app.utils.prompt_projection import item_table, project, to_prompt_json
+from app.services.metrics import track_agent
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
@@ -14,9 +15,24 @@ if TYPE_CHECKING:
 class ManufacturingAnalyzerAgent:
     """Expert agent for manufacturing process analysis"""
     
+    # Product analysis fields the manufacturing prompt uses
+    INPUT_FIELDS = {
+        "product_category": True,
+        "product_name": True,
+        "detected_components": {
+            "name": True, "type": True, "likely_materials": True, "dimensions": True, "manufacturing_process": True
+        },
+        "manufacturing_method": True,
+        "manufacturing_complexity": True,
+        "product_properties": {"estimated_dimensions": True}
+    }
+    # Material item fields it uses (costs and sourcing don't affect the process plan)
+    ITEM_COLUMNS = ["name", "type", "specifications", "estimated_quantity", "unit"]
+    
     def __init__(self, groq_service: "GroqService"):
         self.groq_service = groq_service
     
+    @track_agent
     async def analyze_manufacturing(
         self,
         product_analysis: Dict[str, Any],
@@ -32,30 +48,17 @@ class ManufacturingAnalyzerAgent:
         Returns:
             Manufacturing process analysis
         """
-        # Format prompt using LangChain template
-        formatted_prompt = manufacturing_analysis_prompt.format_messages(
-            product_analysis=json.dumps(product_analysis, indent=2),
-            material_analysis=json.dumps(material_analysis, indent=2)
+        messages = manufacturing_analysis_prompt.render(
+            product_analysis=to_prompt_json(project(product_analysis, self.INPUT_FIELDS)),
+            material_analysis=to_prompt_json(item_table(material_analysis.get("categories"), self.ITEM_COLUMNS))
         )
         
-        # Convert to Groq API format
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
-        
-        import asyncio
-        response = await asyncio.to_thread(
-            self.groq_service._retry_with_backoff,
-            lambda: self.groq_service.client.chat.completions.create(
-                model=self.groq_service.text_model,
-                messages=messages,
-                temperature=0.3,
-                max_completion_tokens=4096,
-                response_format={"type": "json_object"}
-            )
+        response = await self.groq_service.chat_completion(
+            model=self.groq_service.text_model,
+            messages=messages,
+            temperature=0.3,
+            max_completion_tokens=4096,
+            response_format={"type": "json_object"}
         )
         
         result = self.groq_service._parse_json_response(
@@ -3,23 +3,59 @@ Market Forecast Agent
 Expert in market intelligence and demand forecasting
 """
 
+import os
 import json
 import asyncio
-from typing import Dict, Any, List, TYPE_CHECKING
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
 from .prompts.market_forecast import market_forecast_prompt
+from app.services.metrics import track_agent
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
 
 
+MODEL = "llama-3.1-8b-instant"  # Faster, cheaper model for market analysis
+
+# Expanded list of major markets across different regions for selling finished products
+DEFAULT_MARKETS = [
+    "United States", "United Kingdom", "Japan", "Germany", "Australia", "Canada",
+    "France", "Italy", "Spain", "Netherlands", "Sweden", "Switzerland",
+    "China", "India", "South Korea", "Singapore", "Hong Kong", "Thailand",
+    "Brazil", "Mexico", "Argentina", "Chile", "United Arab Emirates", "South Africa"
+]
+
+# Completion budget per market in a shard (one forecast object is ~150 tokens)
+TOKENS_PER_MARKET = 256
+
+
+def _market_key(market: str) -> str:
+    return " ".join(market.lower().split())
+
+
+def _score(value: Any, default: float = 50) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
 class MarketForecastAgent:
     """
     Agent specialized in generating market demand forecasts
+    
+    Target markets are split into shards of `shard_size` (MARKET_FORECAST_SHARD_SIZE,
+    0 = one shard) that run concurrently under the rate limiter. Each market's
+    forecast is cached per (product, market), so only uncached markets are requested.
     """
     
-    def __init__(self, groq_service: "GroqService"):
+    def __init__(self, groq_service: "GroqService", shard_size: Optional[int] = None):
         self.groq_service = groq_service
+        if shard_size is None:
+            shard_size = int(os.getenv("MARKET_FORECAST_SHARD_SIZE", "6"))
+        self.shard_size = shard_size
     
+    @track_agent
     async def generate_forecast(
         self,
         product_name: str,
@@ -37,40 +73,126 @@ class MarketForecastAgent:
             target_markets: Optional list of target countries
         
         Returns:
-            Dictionary with market forecasts for each country
+            Dictionary with market forecasts for each country, in target market order,
+            plus any markets the model failed to cover under "missing_markets". Other
+            top-level keys of the model's response are passed through (first shard wins).
         """
         if target_markets is None:
-            # Expanded list of major markets across different regions for selling finished products
-            target_markets = [
-                "United States", "United Kingdom", "Japan", "Germany", "Australia", "Canada",
-                "France", "Italy", "Spain", "Netherlands", "Sweden", "Switzerland",
-                "China", "India", "South Korea", "Singapore", "Hong Kong", "Thailand",
-                "Brazil", "Mexico", "Argentina", "Chile", "United Arab Emirates", "South Africa"
-            ]
-        
-        formatted_prompt = market_forecast_prompt.format_messages(
-            product_name=product_name,
-            product_description=product_description,
-            bom_materials=', '.join(bom_materials),
-            target_markets=', '.join(target_markets)
+            target_markets = DEFAULT_MARKETS
+        
+        # Deduplicate while keeping the caller's order
+        markets: Dict[str, str] = {}
+        for market in target_markets:
+            markets.setdefault(_market_key(market), market)
+        
+        context = {
+            "product_name": product_name,
+            "product_description": product_description,
+            "bom_materials": ', '.join(bom_materials)
+        }
+        
+        forecasts: Dict[str, Dict[str, Any]] = {}
+        extras: Dict[str, Any] = {}
+        for key, market in markets.items():
+            cached = await self.groq_service.response_cache.get(self._cache_key(context, key), "market_forecast")
+            if cached is not None:
+                forecasts[key] = json.loads(cached)
+        
+        pending = [market for key, market in markets.items() if key not in forecasts]
+        if pending:
+            print(f"🌍 Forecasting {len(pending)} of {len(markets)} markets ({len(markets) - len(pending)} cached)")
+            generated = await self._generate_markets(context, pending, extras)
+            # One follow-up pass for markets lost to truncation or renamed by the model
+            missing = [market for market in pending if _market_key(market) not in generated]
+            if missing and len(missing) < len(pending):
+                print(f"⚠️  Retrying {len(missing)} market(s) missing from shard responses: {', '.join(missing)}")
+                generated.update(await self._generate_markets(context, missing, extras))
+            
+            for key, forecast in generated.items():
+                forecasts[key] = forecast
+                await self.groq_service.response_cache.set(
+                    self._cache_key(context, key), json.dumps(forecast), "market_forecast"
+                )
+        
+        validated_forecasts = [forecasts[key] for key in markets if key in forecasts]
+        missing_markets = [market for key, market in markets.items() if key not in forecasts]
+        
+        if len(validated_forecasts) == 0:
+            print(f"⚠️  Warning: No market forecasts generated for product '{product_name}'. This may indicate an issue with the AI response.")
+        else:
+            print(f"✅ Generated {len(validated_forecasts)} market forecasts for product '{product_name}'")
+        if missing_markets:
+            print(f"⚠️  Warning: No forecast for {len(missing_markets)} market(s): {', '.join(missing_markets)}")
+        
+        return {**extras, "forecasts": validated_forecasts, "missing_markets": missing_markets}
+    
+    async def _generate_markets(
+        self,
+        context: Dict[str, str],
+        markets: List[str],
+        extras: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run one completion per shard concurrently and merge the validated forecasts
+        
+        Args:
+            context: Product fields for the prompt
+            markets: Markets to forecast
+            extras: Collects the non-forecast top-level keys of the shard responses
+        
+        Returns:
+            Forecasts keyed by normalized market name (only requested markets)
+        
+        Raises:
+            The first shard's exception if every shard failed
+        """
+        size = self.shard_size if self.shard_size > 0 else len(markets)
+        shards = [markets[i:i + size] for i in range(0, len(markets), size)]
+        
+        results = await asyncio.gather(
+            *[self._generate_shard(context, shard) for shard in shards],
+            return_exceptions=True
+        )
+        
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if failures and len(failures) == len(results):
+            raise failures[0]
+        for failure in failures:
+            print(f"⚠️  Market forecast shard failed: {failure}")
+        
+        merged: Dict[str, Dict[str, Any]] = {}
+        for result in results:
+            if not isinstance(result, BaseException):
+                validated, shard_extras = result
+                for key, forecast in validated.items():
+                    merged.setdefault(key, forecast)
+                for key, value in shard_extras.items():
+                    extras.setdefault(key, value)
+        return merged
+    
+    async def _generate_shard(
+        self,
+        context: Dict[str, str],
+        markets: List[str]
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """
+        Forecast one shard of markets, keeping only forecasts for markets it asked for
+        
+        Returns:
+            (forecasts keyed by normalized market name, other top-level response keys)
+        """
+        messages = market_forecast_prompt.render(
+            target_markets=', '.join(markets),
+            **context
         )
         
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
-        
-        response = await asyncio.to_thread(
-            self.groq_service._retry_with_backoff,
-            lambda: self.groq_service.client.chat.completions.create(
-                model="llama-3.1-8b-instant",  # Faster, cheaper model for market analysis
-                messages=messages,
-                temperature=0.7,
-                max_completion_tokens=4096,  # Increased for more market data
-                response_format={"type": "json_object"}
-            )
+        response = await self.groq_service.chat_completion(
+            model=MODEL,
+            messages=messages,
+            temperature=0.7,
+            max_completion_tokens=min(4096, max(512, TOKENS_PER_MARKET * len(markets))),
+            response_format={"type": "json_object"},
+            cache_namespace="market_forecast"
         )
         
         result = self.groq_service._parse_json_response(response.choices[0].message.content)
@@ -78,34 +200,33 @@ class MarketForecastAgent:
         # Validate and ensure forecasts array exists
         if "forecasts" not in result:
             print(f"⚠️  Warning: Market forecast response missing 'forecasts' key. Response keys: {result.keys()}")
-            result["forecasts"] = []
-        
-        forecasts = result.get("forecasts", [])
         
-        # Validate each forecast has required fields
-        validated_forecasts = []
-        for forecast in forecasts:
+        requested = {_market_key(market): market for market in markets}
+        validated: Dict[str, Dict[str, Any]] = {}
+        for forecast in result.get("forecasts", []):
+            if not isinstance(forecast, dict):
+                continue
+            key = _market_key(str(forecast.get("country", "")))
+            if key not in requested or key in validated:
+                continue
             # Ensure all required fields exist with defaults
-            validated_forecast = {
-                "country": forecast.get("country", "Unknown"),
+            validated[key] = {
+                "country": requested[key],
                 "city": forecast.get("city"),
-                "demand": float(forecast.get("demand", 50)),
-                "competition": float(forecast.get("competition", 50)),
-                "price": float(forecast.get("price", 50)),
-                "growth": float(forecast.get("growth", 50)),
+                "demand": _score(forecast.get("demand")),
+                "competition": _score(forecast.get("competition")),
+                "price": _score(forecast.get("price")),
+                "growth": _score(forecast.get("growth")),
                 "marketSize": forecast.get("marketSize"),
                 "avgPrice": forecast.get("avgPrice"),
                 "growthPercent": forecast.get("growthPercent"),
                 "trend": forecast.get("trend", "stable"),
             }
-            validated_forecasts.append(validated_forecast)
-        
-        result["forecasts"] = validated_forecasts
-        
-        if len(validated_forecasts) == 0:
-            print(f"⚠️  Warning: No market forecasts generated for product '{product_name}'. This may indicate an issue with the AI response.")
-        else:
-            print(f"✅ Generated {len(validated_forecasts)} market forecasts for product '{product_name}'")
-        
-        return result
-
+        extras = {key: value for key, value in result.items() if key not in ("forecasts", "missing_markets")}
+        return validated, extras
+    
+    @staticmethod
+    def _cache_key(context: Dict[str, str], market_key: str) -> str:
+        """Cache key for one (product, market) forecast"""
+        payload = json.dumps({"agent": "market_forecast", "model": MODEL, "market": market_key, **context}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -3,24 +3,54 @@ Material Analyzer Agent
 Specialized agent for identifying and specifying materials
 """
 
-from typing import List, Dict, Any, TYPE_CHECKING
-import json
-from .prompts.material_analysis import material_analysis_prompt
+from typing import List, Dict, Any, Callable, Awaitable, Optional, Tuple, TYPE_CHECKING
+from .prompts.material_analysis import material_analysis_chunk_prompt, material_analysis_prompt
+from app.utils.prompt_projection import project, to_prompt_json
+from app.services.metrics import track_agent, record_retry
+from app.services.circuit_breaker import CircuitOpenError
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
 
+# Called with {"category", "category_index", "item", "attempt"} as each material item is generated
+MaterialItemCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Which chunk of a chunked analysis lists the materials shared by the whole product
+SHARED_MATERIALS = {
+    True: "Also include product-wide materials not tied to a single component (labels, packaging, whole-product finishes).",
+    False: "Leave out product-wide materials such as labels, packaging and whole-product finishes; another part covers them."
+}
+
 
 class MaterialAnalyzerAgent:
     """Expert agent for material identification and specification"""
     
+    # Product analysis fields the material prompt uses
+    INPUT_FIELDS = {
+        "product_category": True,
+        "product_name": True,
+        "detected_components": {"name": True, "type": True, "likely_materials": True, "dimensions": True},
+        "key_materials": True,
+        "product_properties": {"texture": True, "finish": True, "quality_appearance": True, "estimated_dimensions": True}
+    }
+    
+    # Material completions, truncated ones resumed with the same settings
+    COMPLETION_PARAMS = {
+        "model": "llama-3.3-70b-versatile",  # Use faster model with higher token limit
+        "temperature": 0.3,
+        "max_completion_tokens": 32768  # Higher limit for comprehensive material analysis
+    }
+    
     def __init__(self, groq_service: "GroqService"):
         self.groq_service = groq_service
     
+    @track_agent
     async def analyze_materials(
         self, 
         product_analysis: Dict[str, Any],
-        images: List[Dict[str, Any]]
+        images: List[Dict[str, Any]],
+        on_item: Optional[MaterialItemCallback] = None,
+        chunk: Optional[Tuple[int, int]] = None
     ) -> Dict[str, Any]:
         """
         Analyze and specify all materials required for the product
@@ -28,22 +58,24 @@ class MaterialAnalyzerAgent:
         Args:
             product_analysis: Result from ProductAnalyzerAgent
             images: Product images for reference
+            on_item: Optional callback; when given, the completion is token-streamed
+                and each categories[].items[] element is reported as soon as it closes
+            chunk: Optional (index, count) when `product_analysis` carries one group of
+                the detected components; only the first chunk lists product-wide materials
         
         Returns:
             Detailed material specifications with pricing
         """
-        # Format prompt using LangChain template
-        formatted_prompt = material_analysis_prompt.format_messages(
-            product_analysis=json.dumps(product_analysis, indent=2)
-        )
-        
-        # Convert to Groq API format
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
+        summary = to_prompt_json(project(product_analysis, self.INPUT_FIELDS))
+        if chunk is None:
+            messages = material_analysis_prompt.render(product_analysis=summary)
+        else:
+            index, count = chunk
+            messages = material_analysis_chunk_prompt.render(
+                product_analysis=summary,
+                part=f"{index + 1} of {count}",
+                shared_materials=SHARED_MATERIALS[index == 0]
+            )
         
         import asyncio
         
@@ -51,23 +83,22 @@ class MaterialAnalyzerAgent:
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = await asyncio.to_thread(
-                    self.groq_service._retry_with_backoff,
-                    lambda: self.groq_service.client.chat.completions.create(
-                        model="llama-3.3-70b-versatile",  # Use faster model with higher token limit
-                        messages=messages,
-                        temperature=0.3,
-                        max_completion_tokens=32768,  # Higher limit for comprehensive material analysis
-                        response_format={"type": "json_object"}
-                    )
-                )
-                
-                response_text = response.choices[0].message.content
+                response_text, finish_reason = await self._complete(messages, on_item, attempt + 1)
                 
                 # Check if response was truncated
-                if response.choices[0].finish_reason == "length":
+                if finish_reason == "length":
                     print(f"⚠️  Warning: Material analysis response truncated (attempt {attempt + 1}/{max_retries})")
+                    # Resume from the cut point; regenerate only if the fragments don't stitch
+                    result = await self.groq_service.resume_truncated_json(
+                        messages=messages,
+                        partial=response_text,
+                        on_item=self._with_attempt(on_item, attempt + 1),
+                        **self.COMPLETION_PARAMS
+                    )
+                    if result is not None and result.get("categories"):
+                        return result
                     if attempt < max_retries - 1:
+                        record_retry(self.COMPLETION_PARAMS["model"], "truncated")
                         # Try again with a prompt that requests more concise output
                         messages[-1]["content"] += "\n\nIMPORTANT: Provide a more concise response while maintaining all essential material data. Focus on key materials and categories only."
                         continue
@@ -86,7 +117,8 @@ class MaterialAnalyzerAgent:
                 
             except Exception as e:
                 print(f"Error in material analysis (attempt {attempt + 1}/{max_retries}): {str(e)}")
-                if attempt < max_retries - 1:
+                # An open circuit won't close within the backoff: go straight to the fallback
+                if attempt < max_retries - 1 and not isinstance(e, CircuitOpenError):
                     await asyncio.sleep(2 ** attempt)  # Exponential backoff
                     continue
                 else:
@@ -98,4 +130,51 @@ class MaterialAnalyzerAgent:
         
         # Should not reach here, but just in case
         return {"categories": []}
-
+    
+    async def _complete(
+        self,
+        messages: List[Dict[str, Any]],
+        on_item: Optional[MaterialItemCallback],
+        attempt: int
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Run the material completion, streaming items to `on_item` when given
+        
+        Returns:
+            Tuple of (response text, finish reason)
+        """
+        params = {
+            **self.COMPLETION_PARAMS,
+            "messages": messages,
+            "response_format": {"type": "json_object"}
+        }
+        
+        report = self._with_attempt(on_item, attempt)
+        if report is None:
+            response = await self.groq_service.chat_completion(**params)
+            return response.choices[0].message.content, response.choices[0].finish_reason
+        
+        async for event in self.groq_service.stream_json_items(**params):
+            if event["type"] == "done":
+                return event["content"], event["finish_reason"]
+            await report(event)
+        return "", None
+    
+    @staticmethod
+    def _with_attempt(
+        on_item: Optional[MaterialItemCallback],
+        attempt: int
+    ) -> Optional[Callable[[Dict[str, Any]], Awaitable[None]]]:
+        """Wrap `on_item` to report item events tagged with the attempt number"""
+        if on_item is None:
+            return None
+        
+        async def report(event: Dict[str, Any]) -> None:
+            await on_item({
+                "category": event["category"],
+                "category_index": event["category_index"],
+                "item": event["item"],
+                "attempt": attempt
+            })
+        
+        return report
@@ -5,13 +5,32 @@ Expert in commodity pricing and price trend forecasting
 
 import json
 import asyncio
-from typing import Dict, Any, TYPE_CHECKING
-from .prompts.price_forecast import price_forecast_prompt
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
+from .prompts.price_forecast import price_forecast_prompt, price_forecast_context_prompt
+from app.services.metrics import track_agent
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
 
 
+# Characters of shared search context passed into each per-material prompt
+MAX_CONTEXT_CHARS = 2000
+
+# Material names listed in a group's market-context search query
+MAX_QUERY_MATERIALS = 8
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text or "").lower().split())
+
+
+def _price(value: Any) -> Optional[float]:
+    try:
+        return round(float(value), 4)
+    except (TypeError, ValueError):
+        return None
+
+
 class PriceForecastAgent:
     """
     Agent specialized in generating material price forecasts
@@ -20,6 +39,7 @@ class PriceForecastAgent:
     def __init__(self, groq_service: "GroqService"):
         self.groq_service = groq_service
     
+    @track_agent
     async def generate_forecast(
         self,
         material_name: str,
@@ -39,31 +59,125 @@ class PriceForecastAgent:
         Returns:
             Dictionary with price forecasts for each week
         """
-        formatted_prompt = price_forecast_prompt.format_messages(
+        messages = price_forecast_prompt.render(
             material_name=material_name,
             material_type=material_type,
             unit=unit,
             weeks=weeks
         )
         
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
-        
-        response = await asyncio.to_thread(
-            self.groq_service._retry_with_backoff,
-            lambda: self.groq_service.client.chat.completions.create(
-                model="groq/compound-mini",  # Use compound-mini for web search
-                messages=messages,
-                temperature=0.6,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
-            )
+        response = await self.groq_service.chat_completion(
+            model="groq/compound-mini",  # Use compound-mini for web search
+            messages=messages,
+            temperature=0.6,
+            max_completion_tokens=1024,
+            response_format={"type": "json_object"},
+            cache_namespace="price_forecast"
         )
         
         result = self.groq_service._parse_json_response(response.choices[0].message.content)
         return result
-
+    
+    @track_agent
+    async def generate_forecasts_batch(
+        self,
+        materials: List[Dict[str, str]],
+        weeks: int = 8
+    ) -> Dict[str, Any]:
+        """
+        Generate price forecasts for many materials with shared market context
+        
+        Materials are grouped by material_type. Each group runs one web search
+        for market context, then forecasts its materials concurrently with that
+        context on a non-search model; all groups run concurrently. Identical
+        materials are forecast once.
+        
+        Args:
+            materials: Items with material_name, material_type and unit
+            weeks: Number of weeks to forecast
+        
+        Returns:
+            Columnar result: "weeks" (column labels), "materials" (row labels in
+            request order), "prices" (material x week matrix, None where a week
+            is missing), "groups" (row indices per material type) and "errors"
+        """
+        # Unique materials per normalized type, remembering which rows they fill
+        groups: Dict[str, Dict[str, List[int]]] = {}
+        for index, material in enumerate(materials):
+            type_key = _normalize(material["material_type"])
+            material_key = f"{_normalize(material['material_name'])}|{_normalize(material['unit'])}"
+            groups.setdefault(type_key, {}).setdefault(material_key, []).append(index)
+        
+        prices: List[Optional[List[Optional[float]]]] = [None] * len(materials)
+        errors: List[Dict[str, Any]] = []
+        
+        async def run_group(rows_by_material: Dict[str, List[int]]) -> None:
+            first_rows = [rows[0] for rows in rows_by_material.values()]
+            material_type = materials[first_rows[0]]["material_type"]
+            names = [materials[row]["material_name"] for row in first_rows]
+            search = await self.groq_service.search_web_async(
+                f"current wholesale prices and {weeks}-week price trends for {material_type} materials: "
+                f"{', '.join(names[:MAX_QUERY_MATERIALS])}"
+            )
+            market_context = (search.get("results") or "No market context available.")[:MAX_CONTEXT_CHARS]
+            
+            async def run_material(rows: List[int]) -> None:
+                material = materials[rows[0]]
+                try:
+                    result = await self._forecast_with_context(material, weeks, market_context)
+                except Exception as e:
+                    print(f"⚠️  Price forecast failed for {material['material_name']}: {e}")
+                    errors.extend({"index": row, "material_name": material["material_name"], "error": str(e)} for row in rows)
+                    return
+                by_week = {}
+                for point in result.get("forecasts", []):
+                    if isinstance(point, dict) and point.get("week") is not None:
+                        by_week.setdefault(str(point["week"]), _price(point.get("price")))
+                row_prices = [by_week.get(str(week)) for week in range(1, weeks + 1)]
+                for row in rows:
+                    prices[row] = row_prices
+            
+            await asyncio.gather(*[run_material(rows) for rows in rows_by_material.values()])
+        
+        print(f"📈 Batch price forecast: {len(materials)} materials in {len(groups)} material type group(s)")
+        await asyncio.gather(*[run_group(rows_by_material) for rows_by_material in groups.values()])
+        
+        if materials and len(errors) == len(materials):
+            raise RuntimeError(f"Price forecast failed for every material: {errors[0]['error']}")
+        
+        return {
+            "weeks": list(range(1, weeks + 1)),
+            "materials": [
+                {"material_name": m["material_name"], "material_type": m["material_type"], "unit": m["unit"]}
+                for m in materials
+            ],
+            "prices": prices,
+            "groups": {
+                materials[next(iter(rows_by_material.values()))[0]]["material_type"]: sorted(
+                    row for rows in rows_by_material.values() for row in rows
+                )
+                for rows_by_material in groups.values()
+            },
+            "errors": sorted(errors, key=lambda error: error["index"])
+        }
+    
+    async def _forecast_with_context(self, material: Dict[str, str], weeks: int, market_context: str) -> Dict[str, Any]:
+        """Forecast one material from shared market context (no per-material search)"""
+        messages = price_forecast_context_prompt.render(
+            material_name=material["material_name"],
+            material_type=material["material_type"],
+            unit=material["unit"],
+            weeks=weeks,
+            market_context=market_context
+        )
+        
+        response = await self.groq_service.chat_completion(
+            model="llama-3.1-8b-instant",  # Context already gathered; no web search needed
+            messages=messages,
+            temperature=0.6,
+            max_completion_tokens=1024,
+            response_format={"type": "json_object"},
+            cache_namespace="price_forecast"
+        )
+        
+        return self.groq_service._parse_json_response(response.choices[0].message.content)
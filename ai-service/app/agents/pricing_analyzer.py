@@ -3,20 +3,56 @@ Pricing Analyzer Agent
 Specialized agent for pricing and cost estimation
 """
 
-from typing import Dict, Any, TYPE_CHECKING
+import os
 import json
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
 from .prompts.pricing_analysis import pricing_analysis_prompt
+from app.utils.prompt_projection import item_table, to_prompt_json
+from app.services.metrics import track_agent, record_retry
+from app.services.circuit_breaker import CircuitOpenError
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
 
 
+# Refined price fields kept in the material price index
+INDEXED_FIELDS = ("unit_cost", "price_source", "price_trend", "moq_impact")
+
+
+def _name_key(name: Any) -> str:
+    return " ".join(str(name).lower().split())
+
+
 class PricingAnalyzerAgent:
-    """Expert agent for pricing and cost estimation"""
+    """
+    Expert agent for pricing and cost estimation
+    
+    Items are priced in batches of up to `items_per_call` (PRICING_ITEMS_PER_CALL,
+    0 = one batch) that run concurrently; whole categories share a batch while
+    they fit. Refined prices are kept in a material price index (the response
+    cache's "material_price" namespace) keyed by item name, specifications and
+    unit, and indexed items skip the LLM call.
+    """
+    
+    # Material item fields the pricing prompt uses (total_cost is recomputed from these)
+    ITEM_COLUMNS = ["name", "type", "specifications", "source", "estimated_quantity", "unit", "unit_cost"]
     
-    def __init__(self, groq_service: "GroqService"):
+    # Pricing completions, truncated ones resumed with the same settings
+    COMPLETION_PARAMS = {
+        "model": "groq/compound-mini",
+        "temperature": 0.2,  # Lower temperature for pricing accuracy
+        "max_completion_tokens": 8192  # Max allowed by Groq API
+    }
+    
+    def __init__(self, groq_service: "GroqService", items_per_call: Optional[int] = None):
         self.groq_service = groq_service
+        if items_per_call is None:
+            items_per_call = int(os.getenv("PRICING_ITEMS_PER_CALL", "8"))
+        self.items_per_call = items_per_call
     
+    @track_agent
     async def analyze_pricing(
         self,
         material_analysis: Dict[str, Any]
@@ -28,36 +64,107 @@ class PricingAnalyzerAgent:
             material_analysis: Result from MaterialAnalyzerAgent
         
         Returns:
-            Refined pricing analysis with market data
+            Refined pricing analysis with market data, with categories and items
+            in material analysis order
         """
-        # Format prompt using LangChain template
-        formatted_prompt = pricing_analysis_prompt.format_messages(
-            material_analysis=json.dumps(material_analysis, indent=2)
-        )
+        categories = [
+            category for category in material_analysis.get("categories") or []
+            if isinstance(category, dict)
+        ]
+        
+        # Early exit for items already in the price index
+        indexed: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        pending: List[Tuple[int, int, Dict[str, Any]]] = []
+        for c, category in enumerate(categories):
+            for i, item in enumerate(category.get("items", [])):
+                if not isinstance(item, dict):
+                    continue
+                cached = await self.groq_service.response_cache.get(self._price_key(item), "material_price")
+                if cached is not None:
+                    indexed[(c, i)] = self._apply_price(item, json.loads(cached))
+                else:
+                    pending.append((c, i, item))
+        
+        batches = self._batch_items(pending)
+        if indexed:
+            print(f"💾 {len(indexed)} of {len(indexed) + len(pending)} items priced from the material price index")
+        if len(batches) > 1:
+            print(f"💰 Pricing {len(pending)} items in {len(batches)} concurrent batches")
         
-        # Convert to Groq API format
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
+        results = await asyncio.gather(*[self._price_batch(categories, batch) for batch in batches])
         
-        import asyncio
+        if batches and not indexed and all(result is None for result in results):
+            # Return fallback structure - preserve categories from material_analysis if available
+            fallback = {
+                "pricing_analysis": {
+                    "analysis_date": "2025-01-13",
+                    "currency": "USD",
+                    "market_conditions": "Unable to fetch current market data"
+                },
+                "materials_pricing": []
+            }
+            # Preserve categories from material_analysis if pricing failed
+            if categories:
+                print(f"⚠️  Pricing analysis failed, preserving {len(categories)} categories from material_analysis")
+                fallback["categories"] = material_analysis["categories"]
+            return fallback
+        
+        if len(batches) == 1 and not indexed:
+            merged = {key: value for key, value in results[0].items() if key != "categories"}
+        else:
+            merged = self._merge_batch_fields(results, from_index=not batches)
+        merged["categories"] = await self._merge_prices(categories, batches, results, indexed)
+        print(f"✅ Pricing analysis returned {len(merged['categories'])} categories")
+        return merged
+    
+    def _batch_items(self, pending: List[Tuple[int, int, Dict[str, Any]]]) -> List[List[Tuple[int, int, Dict[str, Any]]]]:
+        """Group pending items into batches, keeping categories together while they fit"""
+        if not pending:
+            return []
+        budget = self.items_per_call if self.items_per_call > 0 else len(pending)
+        
+        by_category: Dict[int, List[Tuple[int, int, Dict[str, Any]]]] = {}
+        for entry in pending:
+            by_category.setdefault(entry[0], []).append(entry)
+        
+        batches: List[List[Tuple[int, int, Dict[str, Any]]]] = [[]]
+        for entries in by_category.values():
+            # Categories larger than the budget are split into budget-sized pieces
+            for start in range(0, len(entries), budget):
+                piece = entries[start:start + budget]
+                if len(batches[-1]) + len(piece) > budget:
+                    batches.append([])
+                batches[-1].extend(piece)
+        return batches
+    
+    async def _price_batch(
+        self,
+        categories: List[Dict[str, Any]],
+        batch: List[Tuple[int, int, Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Price one batch of items with the LLM
+        
+        Returns:
+            The parsed pricing response, or None if pricing failed
+        """
+        batch_categories: Dict[int, Dict[str, Any]] = {}
+        for c, _, item in batch:
+            batch_categories.setdefault(c, {"category": categories[c].get("category", "Uncategorized"), "items": []})
+            batch_categories[c]["items"].append(item)
+        
+        messages = pricing_analysis_prompt.render(
+            material_analysis=to_prompt_json(item_table(list(batch_categories.values()), self.ITEM_COLUMNS))
+        )
         
         # Retry logic for truncated responses
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = await asyncio.to_thread(
-                    self.groq_service._retry_with_backoff,
-                    lambda: self.groq_service.client.chat.completions.create(
-                        model="groq/compound-mini",
-                        messages=messages,
-                        temperature=0.2,  # Lower temperature for pricing accuracy
-                        max_completion_tokens=8192,  # Max allowed by Groq API
-                        response_format={"type": "json_object"}
-                    )
+                response = await self.groq_service.chat_completion(
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    **self.COMPLETION_PARAMS
                 )
                 
                 response_text = response.choices[0].message.content
@@ -65,7 +172,16 @@ class PricingAnalyzerAgent:
                 # Check if response was truncated (common indicators)
                 if response.choices[0].finish_reason == "length":
                     print(f"Warning: Response truncated (attempt {attempt + 1}/{max_retries})")
+                    # Resume from the cut point; regenerate only if the fragments don't stitch
+                    result = await self.groq_service.resume_truncated_json(
+                        messages=messages,
+                        partial=response_text,
+                        **self.COMPLETION_PARAMS
+                    )
+                    if result is not None and (result.get("categories") or result.get("materials_pricing")):
+                        return result
                     if attempt < max_retries - 1:
+                        record_retry(self.COMPLETION_PARAMS["model"], "truncated")
                         # Try again with a prompt that requests more concise output
                         messages[-1]["content"] += "\n\nIMPORTANT: Provide a more concise response while maintaining all essential pricing data. Focus on key materials only."
                         continue
@@ -74,7 +190,6 @@ class PricingAnalyzerAgent:
                 
                 # Validate that we got pricing data OR categories
                 if "categories" in result and len(result.get("categories", [])) > 0:
-                    print(f"✅ Pricing analysis returned {len(result.get('categories', []))} categories")
                     return result
                 elif "materials_pricing" in result or "pricing_analysis" in result:
                     return result
@@ -85,25 +200,124 @@ class PricingAnalyzerAgent:
                         continue
                 
                 return result
-                
+            
             except Exception as e:
                 print(f"Error in pricing analysis (attempt {attempt + 1}/{max_retries}): {str(e)}")
-                if attempt < max_retries - 1:
+                # An open circuit won't close within the backoff: go straight to the fallback
+                if attempt < max_retries - 1 and not isinstance(e, CircuitOpenError):
                     await asyncio.sleep(2 ** attempt)  # Exponential backoff
                     continue
+                return None
+        
+        return None
+    
+    async def _merge_prices(
+        self,
+        categories: List[Dict[str, Any]],
+        batches: List[List[Tuple[int, int, Dict[str, Any]]]],
+        results: List[Optional[Dict[str, Any]]],
+        indexed: Dict[Tuple[int, int], Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Put priced items back into the material analysis category structure
+        
+        Batch results are matched to the requested items by category and item
+        name (falling back to the item name alone when the model renamed the
+        category); newly priced items are added to the price index. Items a
+        batch failed to price keep their material analysis values. Items the
+        model added are appended to their category, unless the material
+        analysis already has an item of that name (e.g. one priced by another
+        batch).
+        """
+        priced: Dict[Tuple[int, int], Dict[str, Any]] = dict(indexed)
+        extras: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+        category_keys = {_name_key(category.get("category", "Uncategorized")): c for c, category in enumerate(categories)}
+        known_names = {
+            _name_key(item.get("name", ""))
+            for category in categories for item in category.get("items", []) if isinstance(item, dict)
+        }
+        
+        for batch, result in zip(batches, results):
+            if result is None:
+                continue
+            requested = {(c, _name_key(item.get("name", ""))): (c, i) for c, i, item in batch}
+            by_name = {name: position for (_, name), position in requested.items()}
+            for category in result.get("categories") or []:
+                if not isinstance(category, dict):
+                    continue
+                c = category_keys.get(_name_key(category.get("category", "")))
+                for item in category.get("items", []):
+                    if not isinstance(item, dict):
+                        continue
+                    name = _name_key(item.get("name", ""))
+                    position = requested.get((c, name)) or by_name.get(name)
+                    if position is None:
+                        if name not in known_names:
+                            known_names.add(name)
+                            category_name = category.get("category", "Uncategorized")
+                            extras.setdefault(_name_key(category_name), (category_name, []))[1].append(item)
+                    elif position not in priced:
+                        original = categories[position[0]]["items"][position[1]]
+                        priced[position] = {**original, **item}
+                        await self._index_price(original, item)
+        
+        merged = []
+        for c, category in enumerate(categories):
+            items = [
+                priced.get((c, i), item)
+                for i, item in enumerate(category.get("items", []))
+            ]
+            items.extend(extras.pop(_name_key(category.get("category", "Uncategorized")), ("", []))[1])
+            merged.append({**category, "items": items})
+        for name, items in extras.values():
+            merged.append({"category": name, "items": items})
+        return merged
+    
+    @staticmethod
+    def _merge_batch_fields(results: List[Optional[Dict[str, Any]]], from_index: bool = False) -> Dict[str, Any]:
+        """Combine the non-category fields of several batch responses (from_index: no batch ran)"""
+        merged: Dict[str, Any] = {}
+        for result in results:
+            if result is None:
+                continue
+            for key, value in result.items():
+                # Per-batch cost breakdowns don't describe the whole product
+                if key in ("categories", "cost_breakdown"):
+                    continue
+                if isinstance(value, list):
+                    merged.setdefault(key, []).extend(value)
                 else:
-                    # Return fallback structure - preserve categories from material_analysis if available
-                    fallback = {
-                        "pricing_analysis": {
-                            "analysis_date": "2025-01-13",
-                            "currency": "USD",
-                            "market_conditions": "Unable to fetch current market data"
-                        },
-                        "materials_pricing": []
-                    }
-                    # Preserve categories from material_analysis if pricing failed
-                    if "categories" in material_analysis and len(material_analysis.get("categories", [])) > 0:
-                        print(f"⚠️  Pricing analysis failed, preserving {len(material_analysis.get('categories', []))} categories from material_analysis")
-                        fallback["categories"] = material_analysis["categories"]
-                    return fallback
-
+                    merged.setdefault(key, value)
+        if from_index:
+            merged["pricing_analysis"] = {"currency": "USD", "market_conditions": "Prices from the material price index"}
+        return merged
+    
+    async def _index_price(self, material_item: Dict[str, Any], priced_item: Dict[str, Any]) -> None:
+        """Store a refined price in the material price index"""
+        try:
+            unit_cost = float(priced_item.get("unit_cost"))
+        except (TypeError, ValueError):
+            return
+        if unit_cost <= 0:
+            return
+        entry = {field: priced_item[field] for field in INDEXED_FIELDS if priced_item.get(field) is not None}
+        entry["unit_cost"] = unit_cost
+        await self.groq_service.response_cache.set(self._price_key(material_item), json.dumps(entry), "material_price")
+    
+    @staticmethod
+    def _apply_price(item: Dict[str, Any], entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Material item with an indexed price (total_cost is recomputed when building the BOM)"""
+        priced = {key: value for key, value in item.items() if key not in ("total_cost", "totalCost")}
+        priced.update(entry)
+        return priced
+    
+    @staticmethod
+    def _price_key(item: Dict[str, Any]) -> str:
+        """Price index key for one material: (name, specifications, unit)"""
+        payload = json.dumps({
+            "agent": "pricing",
+            "name": _name_key(item.get("name", "")),
+            "specifications": item.get("specifications"),
+            "unit": _name_key(item.get("unit", ""))
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -6,6 +6,8 @@ Specialized agent for analyzing product images and identifying components
 from typing import List, Dict, Any, TYPE_CHECKING
 import json
 from .prompts.product_analysis import product_analysis_prompt
+from app.services.metrics import track_agent
+from app.services.circuit_breaker import CircuitOpenError
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
@@ -17,6 +19,7 @@ class ProductAnalyzerAgent:
     def __init__(self, groq_service: "GroqService"):
         self.groq_service = groq_service
     
+    @track_agent
     async def analyze(self, images: List[Dict[str, Any]], description: str = "") -> Dict[str, Any]:
         """
         Analyze product images to identify category, components, and manufacturing requirements
@@ -28,17 +31,10 @@ class ProductAnalyzerAgent:
         Returns:
             Analysis result with product category, components, and manufacturing insights
         """
-        # Format prompt using LangChain template
-        formatted_prompt = product_analysis_prompt.format_messages(description=description)
+        messages = product_analysis_prompt.render(description=description)
         
-        # Extract system and human messages
-        system_message = None
-        human_message_text = None
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                system_message = msg.content
-            elif msg.type == "human":
-                human_message_text = msg.content
+        # Downscale, recompress and deduplicate uploads off the event loop
+        images = await self.groq_service.image_preprocessor.prepare(images)
         
         # Prepare image content - handle both URL and base64 data
         image_contents = []
@@ -53,28 +49,18 @@ class ProductAnalyzerAgent:
                 # Base64 data - convert to data URL
                 import base64
                 img_base64 = base64.b64encode(img["data"]).decode('utf-8')
+                content_type = img.get("content_type") or "image/jpeg"
                 image_contents.append({
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{img_base64}"}
+                    "image_url": {"url": f"data:{content_type};base64,{img_base64}"}
                 })
         
-        # Build messages for Groq API
-        messages = []
-        if system_message:
-            messages.append({
-                "role": "system",
-                "content": system_message
-            })
-        
         # Combine human message text with images
-        messages.append({
-            "role": "user",
-            "content": [
-                {"type": "text", "text": human_message_text or ""}
-            ] + image_contents
-        })
+        messages[-1]["content"] = [
+            {"type": "text", "text": messages[-1]["content"]}
+        ] + image_contents
         
-        # Call Groq API (using sync method in async context)
+        # Call Groq API on the pooled async client
         # Use more retries for product analysis (critical step)
         import asyncio
         max_retries = 3  # Reduced retries to prevent excessive API calls
@@ -82,15 +68,12 @@ class ProductAnalyzerAgent:
         
         for attempt in range(max_retries):
             try:
-                response = await asyncio.to_thread(
-                    self.groq_service._retry_with_backoff,
-                    lambda: self.groq_service.client.chat.completions.create(
-                        model=self.groq_service.vision_model,
-                        messages=messages,
-                        temperature=0.3,
-                        max_completion_tokens=4096,
-                        response_format={"type": "json_object"}
-                    ),
+                response = await self.groq_service.chat_completion(
+                    model=self.groq_service.vision_model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_completion_tokens=4096,
+                    response_format={"type": "json_object"},
                     max_retries=2,  # Reduced internal retries to prevent excessive calls
                     initial_delay=2.0
                 )
@@ -100,6 +83,9 @@ class ProductAnalyzerAgent:
                 )
                 
                 return result
+            except CircuitOpenError:
+                # The vision model is down: no point retrying until its circuit half-opens
+                raise
             except Exception as e:
                 error_str = str(e)
                 is_server_error = (
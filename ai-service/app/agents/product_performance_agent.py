@@ -4,9 +4,9 @@ Expert in product performance metrics and analytics
 """
 
 import json
-import asyncio
 from typing import Dict, Any, List, TYPE_CHECKING
 from .prompts.product_performance import product_performance_prompt
+from app.services.metrics import track_agent
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
@@ -20,6 +20,7 @@ class ProductPerformanceAgent:
     def __init__(self, groq_service: "GroqService"):
         self.groq_service = groq_service
     
+    @track_agent
     async def generate_performance(
         self,
         products: List[Dict[str, Any]]
@@ -41,27 +42,18 @@ class ProductPerformanceAgent:
             for p in products
         ])
         
-        formatted_prompt = product_performance_prompt.format_messages(
+        messages = product_performance_prompt.render(
             product_list=product_list,
             product_count=len(products)
         )
         
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
-        
-        response = await asyncio.to_thread(
-            self.groq_service._retry_with_backoff,
-            lambda: self.groq_service.client.chat.completions.create(
-                model="groq/compound-mini",  # Use compound-mini for web search
-                messages=messages,
-                temperature=0.7,
-                max_completion_tokens=2048,
-                response_format={"type": "json_object"}
-            )
+        response = await self.groq_service.chat_completion(
+            model="groq/compound-mini",  # Use compound-mini for web search
+            messages=messages,
+            temperature=0.7,
+            max_completion_tokens=2048,
+            response_format={"type": "json_object"},
+            cache_namespace="product_performance"
         )
         
         result = self.groq_service._parse_json_response(response.choices[0].message.content)
@@ -3,7 +3,7 @@ Manufacturing Analysis Agent Prompt
 Expert in manufacturing processes and production requirements
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 MANUFACTURING_ANALYSIS_PROMPT_TEMPLATE = """## ROLE
@@ -20,6 +20,8 @@ You are a Manufacturing Analysis Agent - an expert manufacturing engineer with d
 
 You receive a product analysis and material analysis that identifies the product structure and required materials. Your task is to analyze the manufacturing processes required to produce this product.
 
+Both are compact JSON. In the material analysis, "item_columns" lists the item fields once, and each category's "items" holds one array of values per material in that column order.
+
 ## OUTPUT
 
 Return a JSON object with the following structure:
@@ -68,17 +70,18 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-manufacturing_analysis_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(MANUFACTURING_ANALYSIS_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+manufacturing_analysis_prompt = register_prompt(
+    "manufacturing_analysis",
+    system=MANUFACTURING_ANALYSIS_PROMPT_TEMPLATE,
+    human="""
 Product Analysis:
 {product_analysis}
 
-Material Analysis:
+Material Analysis (items as rows of item_columns):
 {material_analysis}
 
 Based on the product and materials, analyze the manufacturing processes required.
 Provide detailed manufacturing insights including steps, tooling, assembly sequence, and complexity.
-""")
-])
+"""
+)
 
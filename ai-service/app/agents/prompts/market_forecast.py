@@ -3,7 +3,7 @@ Market Forecast Agent Prompt
 Expert in market intelligence and demand forecasting
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 MARKET_FORECAST_PROMPT_TEMPLATE = """## ROLE
@@ -58,14 +58,16 @@ Return a JSON object with the following structure:
   * 50-69: "Medium" - Moderate market potential
   * 0-49: "Low" - Limited market opportunity
 - Return ONLY valid JSON, no markdown or additional text
-- CRITICAL: You MUST generate forecasts for at least 6-10 major markets across different regions
+- CRITICAL: You MUST generate a forecast for every target market in the request
 - If you cannot find market data, provide realistic estimates based on product category and market characteristics
 - Ensure every forecast has: country, city (optional), demand, competition, price, growth, and optional fields (marketSize, avgPrice, growthPercent, trend)
 """
 
-market_forecast_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(MARKET_FORECAST_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+# The agent shards target markets, so the model must cover exactly the listed markets
+market_forecast_prompt = register_prompt(
+    "market_forecast",
+    system=MARKET_FORECAST_PROMPT_TEMPLATE,
+    human="""
 Product Name: {product_name}
 Product Description: {product_description}
 Materials Used (for context only): {bom_materials}
@@ -73,13 +75,6 @@ Target Markets: {target_markets}
 
 IMPORTANT: Analyze markets where this FINISHED PRODUCT can be SOLD to consumers, not where to buy materials.
 
-Use web search to find current market trends for similar finished products and generate realistic forecasts for each target market showing:
-- Where consumers would buy this product
-- Demand for the complete product
-- Pricing opportunities
-- Growth potential
-
-Return the forecasts as JSON with at least 6-10 markets across different regions.
-""")
-])
-
+Use web search to find current market trends for similar finished products. Return EXACTLY one forecast for each target market listed above, using the market name as written for "country", and no other markets.
+"""
+)
@@ -3,7 +3,7 @@ Marketing Campaigns Agent Prompt
 Expert in marketing strategy and campaign planning
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 MARKETING_CAMPAIGNS_PROMPT_TEMPLATE = """## ROLE
@@ -52,9 +52,10 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-marketing_campaigns_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(MARKETING_CAMPAIGNS_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+marketing_campaigns_prompt = register_prompt(
+    "marketing_campaigns",
+    system=MARKETING_CAMPAIGNS_PROMPT_TEMPLATE,
+    human="""
 Product Name: {product_name}
 Product Description: {product_description}
 Target Markets: {target_markets}
@@ -65,6 +66,6 @@ Current Marketing Trends:
 Use web search to find current marketing strategies and trends for this product category.
 Generate realistic marketing campaign recommendations across different platforms.
 Return the campaigns as JSON.
-""")
-])
+"""
+)
 
@@ -3,7 +3,7 @@ Material Analysis Agent Prompt
 Expert in identifying and specifying materials for any product type
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 MATERIAL_ANALYSIS_PROMPT_TEMPLATE = """## ROLE
@@ -73,9 +73,10 @@ The structure should be:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-material_analysis_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(MATERIAL_ANALYSIS_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+material_analysis_prompt = register_prompt(
+    "material_analysis",
+    system=MATERIAL_ANALYSIS_PROMPT_TEMPLATE,
+    human="""
 Product Analysis Summary:
 {product_analysis}
 
@@ -84,6 +85,21 @@ For each material, provide detailed specifications and use web search to find cu
 
 Return a JSON structure with a "categories" array, where each category contains an array of "items" (materials).
 Each material must have accurate pricing where total_cost = unit_cost * estimated_quantity.
-""")
-])
+"""
+)
+
+
+# Chunked variant: same system prompt, but the model covers only the components in the summary
+material_analysis_chunk_prompt = register_prompt(
+    "material_analysis_chunk",
+    system=MATERIAL_ANALYSIS_PROMPT_TEMPLATE,
+    human="""
+Product Analysis Summary:
+{product_analysis}
 
+This request is part {part} of the product's material analysis and covers only the detected_components listed above. Identify ALL materials required to manufacture those components, with detailed specifications and current market prices. {shared_materials}
+
+Return a JSON structure with a "categories" array, where each category contains an array of "items" (materials).
+Each material must have accurate pricing where total_cost = unit_cost * estimated_quantity.
+"""
+)
@@ -3,7 +3,7 @@ Price Forecast Agent Prompt
 Expert in commodity pricing and price trend forecasting
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 PRICE_FORECAST_PROMPT_TEMPLATE = """## ROLE
@@ -47,9 +47,10 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-price_forecast_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(PRICE_FORECAST_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+price_forecast_prompt = register_prompt(
+    "price_forecast",
+    system=PRICE_FORECAST_PROMPT_TEMPLATE,
+    human="""
 Material: {material_name}
 Type: {material_type}
 Unit: {unit}
@@ -58,6 +59,25 @@ Weeks to Forecast: {weeks}
 Use web search to find current market prices and trends for this material.
 Generate price forecasts for the next {weeks} weeks with realistic trends and volatility.
 Return the forecasts as JSON.
-""")
-])
+"""
+)
+
 
+# Batch variant: market context comes from one shared web search per material type
+price_forecast_context_prompt = register_prompt(
+    "price_forecast_context",
+    system=PRICE_FORECAST_PROMPT_TEMPLATE,
+    human="""
+Material: {material_name}
+Type: {material_type}
+Unit: {unit}
+Weeks to Forecast: {weeks}
+
+Current market context for {material_type} materials (from a web search):
+{market_context}
+
+Base the forecast on this market context instead of searching again.
+Generate price forecasts for the next {weeks} weeks with realistic trends and volatility.
+Return the forecasts as JSON.
+"""
+)
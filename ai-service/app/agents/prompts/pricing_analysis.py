@@ -3,7 +3,7 @@ Pricing Analysis Agent Prompt
 Expert in market pricing and cost estimation
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 PRICING_ANALYSIS_PROMPT_TEMPLATE = """## ROLE
@@ -19,6 +19,8 @@ You are a Pricing Analysis Agent - an expert cost estimator and market analyst w
 
 You receive a material analysis that identifies all materials and components required for the product. Your task is to verify and refine pricing using current market data.
 
+The material analysis is compact JSON: "item_columns" lists the item fields once, and each category's "items" holds one array of values per material in that column order.
+
 ## OUTPUT
 
 Return a JSON object with the following structure:
@@ -73,10 +75,11 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-pricing_analysis_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(PRICING_ANALYSIS_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
-Material Analysis:
+pricing_analysis_prompt = register_prompt(
+    "pricing_analysis",
+    system=PRICING_ANALYSIS_PROMPT_TEMPLATE,
+    human="""
+Material Analysis (items as rows of item_columns):
 {material_analysis}
 
 Review the materials organized by categories and use web search to:
@@ -88,6 +91,6 @@ Review the materials organized by categories and use web search to:
 6. Suggest cost optimization opportunities
 
 Return updated pricing data preserving the categories structure. Ensure total_cost is calculated correctly for every material item.
-""")
-])
+"""
+)
 
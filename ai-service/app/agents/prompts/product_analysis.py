@@ -3,7 +3,7 @@ Product Analysis Agent Prompt
 Expert in analyzing any type of product from images
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 PRODUCT_ANALYSIS_PROMPT_TEMPLATE = """## ROLE
@@ -50,12 +50,13 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-product_analysis_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(PRODUCT_ANALYSIS_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+product_analysis_prompt = register_prompt(
+    "product_analysis",
+    system=PRODUCT_ANALYSIS_PROMPT_TEMPLATE,
+    human="""
 Product Description: {description}
 
 Analyze the provided images and provide a comprehensive product analysis in JSON format.
-""")
-])
+"""
+)
 
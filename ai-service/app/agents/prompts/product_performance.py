@@ -3,7 +3,7 @@ Product Performance Agent Prompt
 Expert in product performance metrics and analytics
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 PRODUCT_PERFORMANCE_PROMPT_TEMPLATE = """## ROLE
@@ -47,15 +47,16 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-product_performance_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(PRODUCT_PERFORMANCE_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+product_performance_prompt = register_prompt(
+    "product_performance",
+    system=PRODUCT_PERFORMANCE_PROMPT_TEMPLATE,
+    human="""
 Products:
 {product_list}
 
 Use web search to find typical performance metrics for similar products in these categories.
 Generate realistic performance metrics (sales, revenue, margin) for all {product_count} products.
 Return the performance data as JSON.
-""")
-])
+"""
+)
 
@@ -0,0 +1,93 @@
+"""
+Prompt Registry - Precompiled agent prompts rendered straight to Groq message dicts
+Templates use str.format syntax ({name}, {{ and }} for literal braces) and are compiled when their module is imported
+"""
+import string
+from typing import Any, Dict, FrozenSet, List
+
+
+class MessageTemplate:
+    """One compiled message template"""
+
+    def __init__(self, role: str, template: str):
+        """
+        Args:
+            role: Groq message role ("system" or "user")
+            template: str.format template; fields are names, optionally with a format spec ({cost:.2f})
+
+        Raises:
+            ValueError: If a field uses indexing or attribute access
+        """
+        variables = set()
+        for _, field, _, _ in string.Formatter().parse(template):
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise ValueError(f"Unsupported field {{{field}}} in {role} template: use {{name}} fields")
+            variables.add(field)
+        self.role = role
+        self.template = template
+        self.variables: FrozenSet[str] = frozenset(variables)
+        # Templates without fields render once, here
+        self.static = template.format() if not variables else None
+
+    def render(self, values: Dict[str, Any]) -> str:
+        if self.static is not None:
+            return self.static
+        return self.template.format_map(values)
+
+
+class ChatPrompt:
+    """A system + user prompt pair"""
+
+    def __init__(self, name: str, system: str, human: str):
+        self.name = name
+        self.system = MessageTemplate("system", system)
+        self.human = MessageTemplate("user", human)
+        self.input_variables = sorted(self.system.variables | self.human.variables)
+
+    def render(self, **values: Any) -> List[Dict[str, Any]]:
+        """
+        Render the prompt as Groq API message dicts
+
+        Args:
+            **values: Template fields (values are formatted with str())
+
+        Returns:
+            [{"role": "system", ...}, {"role": "user", ...}]; fresh dicts each
+            call, so callers may amend the content
+
+        Raises:
+            KeyError: If a template field has no value
+        """
+        return [
+            {"role": "system", "content": self.system.render(values)},
+            {"role": "user", "content": self.human.render(values)}
+        ]
+
+
+# Every registered prompt by name
+PROMPTS: Dict[str, ChatPrompt] = {}
+
+
+def register_prompt(name: str, system: str, human: str) -> ChatPrompt:
+    """
+    Compile and register an agent prompt
+
+    Args:
+        name: Unique prompt name
+        system: System message template
+        human: User message template
+
+    Returns:
+        The compiled prompt
+    """
+    if name in PROMPTS:
+        raise ValueError(f"Prompt already registered: {name}")
+    prompt = PROMPTS[name] = ChatPrompt(name, system, human)
+    return prompt
+
+
+def get_prompt(name: str) -> ChatPrompt:
+    """Look up a registered prompt"""
+    return PROMPTS[name]
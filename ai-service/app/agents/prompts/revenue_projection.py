@@ -3,7 +3,7 @@ Revenue Projection Agent Prompt
 Expert in financial forecasting and revenue analysis
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 REVENUE_PROJECTION_PROMPT_TEMPLATE = """## ROLE
@@ -55,9 +55,10 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-revenue_projection_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(REVENUE_PROJECTION_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+revenue_projection_prompt = register_prompt(
+    "revenue_projection",
+    system=REVENUE_PROJECTION_PROMPT_TEMPLATE,
+    human="""
 Product Name: {product_name}
 Product Description: {product_description}
 BOM Cost: ${bom_cost:.2f}
@@ -69,6 +70,6 @@ Market Research Data:
 Use web search to find current market pricing for similar products.
 Generate realistic monthly revenue projections for the next 8 months, considering markup, demand trends, and seasonal variations.
 Return the projections as JSON.
-""")
-])
+"""
+)
 
@@ -3,7 +3,7 @@ Supplier Contact Info Agent Prompt
 Expert in finding business contact information
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 SUPPLIER_CONTACT_INFO_PROMPT_TEMPLATE = """## ROLE
@@ -37,9 +37,10 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-supplier_contact_info_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(SUPPLIER_CONTACT_INFO_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+supplier_contact_info_prompt = register_prompt(
+    "supplier_contact_info",
+    system=SUPPLIER_CONTACT_INFO_PROMPT_TEMPLATE,
+    human="""
 Supplier: {supplier_name}
 Location: {city}, {country}
 Website: {website}
@@ -47,6 +48,6 @@ Website: {website}
 Search the web and extract the business contact email address for this supplier.
 If not found directly, generate a realistic email following the company's email pattern.
 Return the contact information as JSON.
-""")
-])
+"""
+)
 
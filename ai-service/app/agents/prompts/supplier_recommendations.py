@@ -3,7 +3,7 @@ Supplier Recommendations Agent Prompt
 Expert in global sourcing and supplier identification
 """
 
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from .registry import register_prompt
 
 
 SUPPLIER_RECOMMENDATIONS_PROMPT_TEMPLATE = """## ROLE
@@ -83,9 +83,10 @@ Return a JSON object with the following structure:
 - Return ONLY valid JSON, no markdown or additional text
 """
 
-supplier_recommendations_prompt = ChatPromptTemplate.from_messages([
-    SystemMessagePromptTemplate.from_template(SUPPLIER_RECOMMENDATIONS_PROMPT_TEMPLATE),
-    HumanMessagePromptTemplate.from_template("""
+supplier_recommendations_prompt = register_prompt(
+    "supplier_recommendations",
+    system=SUPPLIER_RECOMMENDATIONS_PROMPT_TEMPLATE,
+    human="""
 Material: {material_name}
 Type: {material_type}
 Quantity Needed: {quantity} {unit}
@@ -117,6 +118,27 @@ For each selected supplier, extract:
 - Certifications
 
 Return the top 3 best suppliers (or all if 3 or fewer found) as JSON.
-""")
-])
+"""
+)
+
+
+# Bulk variant: several materials per prompt, answered as one entry per material id
+supplier_recommendations_bulk_prompt = register_prompt(
+    "supplier_recommendations_bulk",
+    system=SUPPLIER_RECOMMENDATIONS_PROMPT_TEMPLATE,
+    human="""
+Find suppliers for EACH of the following materials (one per line, with its id):
+
+{materials}
+
+CRITICAL: Treat every material as a separate search. For each one, find REAL supplier companies who SELL/SUPPLY that MATERIAL (not finished products), rank them by rating, reliability, price competitiveness, certifications and reputation, and keep the TOP 3 BEST (or all if 3 or fewer found). Suppliers must be unique within a material.
 
+Return a JSON object with one entry per material id, using the supplier fields described above:
+
+{{
+  "materials": [
+    {{"id": "m1", "suppliers": [ ... up to 3 suppliers ... ]}}
+  ]
+}}
+"""
+)
@@ -4,9 +4,9 @@ Expert in financial forecasting and revenue analysis
 """
 
 import json
-import asyncio
 from typing import Dict, Any, List, TYPE_CHECKING
 from .prompts.revenue_projection import revenue_projection_prompt
+from app.services.metrics import track_agent
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
@@ -20,6 +20,7 @@ class RevenueProjectionAgent:
     def __init__(self, groq_service: "GroqService"):
         self.groq_service = groq_service
     
+    @track_agent
     async def generate_projection(
         self,
         product_name: str,
@@ -44,9 +45,9 @@ class RevenueProjectionAgent:
         
         # Use web search to get real pricing data
         search_query = f"average selling price for {product_name} in {', '.join(target_markets)} 2024"
-        web_results = self.groq_service.search_web(search_query)
+        web_results = await self.groq_service.search_web_async(search_query)
         
-        formatted_prompt = revenue_projection_prompt.format_messages(
+        messages = revenue_projection_prompt.render(
             product_name=product_name,
             product_description=product_description,
             bom_cost=bom_cost,
@@ -54,22 +55,13 @@ class RevenueProjectionAgent:
             web_results=web_results.get('results', 'No specific market data available')
         )
         
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
-        
-        response = await asyncio.to_thread(
-            self.groq_service._retry_with_backoff,
-            lambda: self.groq_service.client.chat.completions.create(
-                model="groq/compound-mini",  # Use compound-mini for web search
-                messages=messages,
-                temperature=0.6,
-                max_completion_tokens=2048,
-                response_format={"type": "json_object"}
-            )
+        response = await self.groq_service.chat_completion(
+            model="groq/compound-mini",  # Use compound-mini for web search
+            messages=messages,
+            temperature=0.6,
+            max_completion_tokens=2048,
+            response_format={"type": "json_object"},
+            cache_namespace="revenue_projection"
         )
         
         result = self.groq_service._parse_json_response(response.choices[0].message.content)
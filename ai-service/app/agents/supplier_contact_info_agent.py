@@ -4,9 +4,9 @@ Expert in finding business contact information
 """
 
 import json
-import asyncio
 from typing import Dict, Any, TYPE_CHECKING
 from .prompts.supplier_contact_info import supplier_contact_info_prompt
+from app.services.metrics import track_agent
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
@@ -20,6 +20,7 @@ class SupplierContactInfoAgent:
     def __init__(self, groq_service: "GroqService"):
         self.groq_service = groq_service
     
+    @track_agent
     async def find_contact_info(
         self,
         supplier_name: str,
@@ -39,29 +40,20 @@ class SupplierContactInfoAgent:
         Returns:
             Dictionary with contact email and website
         """
-        formatted_prompt = supplier_contact_info_prompt.format_messages(
+        messages = supplier_contact_info_prompt.render(
             supplier_name=supplier_name,
             city=city,
             country=country,
             website=website or "Not provided"
         )
         
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
-        
-        response = await asyncio.to_thread(
-            self.groq_service._retry_with_backoff,
-            lambda: self.groq_service.client.chat.completions.create(
-                model="groq/compound-mini",  # Use compound-mini for web search
-                messages=messages,
-                temperature=0.2,  # Very low temperature for accurate contact info
-                max_completion_tokens=256,  # Small response for just contact info
-                response_format={"type": "json_object"}
-            )
+        response = await self.groq_service.chat_completion(
+            model="groq/compound-mini",  # Use compound-mini for web search
+            messages=messages,
+            temperature=0.2,  # Very low temperature for accurate contact info
+            max_completion_tokens=256,  # Small response for just contact info
+            response_format={"type": "json_object"},
+            cache_namespace="supplier_contact"
         )
         
         result = self.groq_service._parse_json_response(response.choices[0].message.content)
@@ -3,23 +3,50 @@ Supplier Recommendations Agent
 Expert in global sourcing and supplier identification
 """
 
+import os
+import re
 import json
+import math
 import asyncio
-from typing import Dict, Any, List, TYPE_CHECKING
-from .prompts.supplier_recommendations import supplier_recommendations_prompt
+import hashlib
+from typing import Dict, Any, List, Optional, Callable, Awaitable, TYPE_CHECKING
+from .prompts.supplier_recommendations import supplier_recommendations_prompt, supplier_recommendations_bulk_prompt
+from app.services.metrics import track_agent
 
 if TYPE_CHECKING:
     from app.services.groq_service import GroqService
 
 
+MODEL = "llama-3.1-8b-instant"  # Faster, cheaper model for supplier recommendations
+
+# Completion tokens budgeted per material in a bulk pack (3 suppliers with full details)
+TOKENS_PER_MATERIAL = 700
+
+# Called with each material's result line as it becomes available
+SupplierResultCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _normalize(text: Any) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text or "").lower()).split())
+
+
+def _quantity_bucket(quantity: float) -> int:
+    """Order of magnitude of a quantity (1-9 -> 0, 10-99 -> 1, ...; -1 for none)"""
+    return math.floor(math.log10(quantity)) if quantity > 0 else -1
+
+
 class SupplierRecommendationsAgent:
     """
     Agent specialized in finding legitimate supplier companies
     """
     
-    def __init__(self, groq_service: "GroqService"):
+    def __init__(self, groq_service: "GroqService", pack_token_budget: Optional[int] = None):
         self.groq_service = groq_service
+        if pack_token_budget is None:
+            pack_token_budget = int(os.getenv("SUPPLIER_PACK_TOKEN_BUDGET", "4096"))
+        self.pack_token_budget = pack_token_budget
     
+    @track_agent
     async def find_suppliers(
         self,
         material_name: str,
@@ -44,7 +71,7 @@ class SupplierRecommendationsAgent:
         if preferred_countries is None:
             preferred_countries = []
         
-        formatted_prompt = supplier_recommendations_prompt.format_messages(
+        messages = supplier_recommendations_prompt.render(
             material_name=material_name,
             material_type=material_type,
             quantity=quantity,
@@ -52,59 +79,235 @@ class SupplierRecommendationsAgent:
             preferred_countries=', '.join(preferred_countries) if preferred_countries else "None"
         )
         
-        messages = []
-        for msg in formatted_prompt:
-            if msg.type == "system":
-                messages.append({"role": "system", "content": msg.content})
-            elif msg.type == "human":
-                messages.append({"role": "user", "content": msg.content})
-        
-        response = await asyncio.to_thread(
-            self.groq_service._retry_with_backoff,
-            lambda: self.groq_service.client.chat.completions.create(
-                model="llama-3.1-8b-instant",  # Faster, cheaper model for supplier recommendations
-                messages=messages,
-                temperature=0.3,  # Lower temperature for more accurate supplier data
-                max_completion_tokens=4096,  # Higher for detailed supplier info
-                response_format={"type": "json_object"}
-            )
+        response = await self.groq_service.chat_completion(
+            model=MODEL,
+            messages=messages,
+            temperature=0.3,  # Lower temperature for more accurate supplier data
+            max_completion_tokens=4096,  # Higher for detailed supplier info
+            response_format={"type": "json_object"},
+            cache_namespace="supplier_recommendations"
         )
         
         result = self.groq_service._parse_json_response(response.choices[0].message.content)
         
-        # Ensure max 3 best suppliers per material (AI should have already ranked them)
         if "suppliers" in result:
-            suppliers = result["suppliers"]
-            
-            # Remove duplicates by company name
-            seen_names = set()
-            unique_suppliers = []
-            for supplier in suppliers:
-                supplier_name = supplier.get("name", "").strip().lower()
-                if supplier_name and supplier_name not in seen_names:
-                    seen_names.add(supplier_name)
-                    unique_suppliers.append(supplier)
-            
-            # If AI returned more than 3, take the top 3 best ones
-            # (AI should have already ranked them, but we ensure here as well)
-            if len(unique_suppliers) > 3:
-                # Sort by rating, reliability, and price competitiveness
-                unique_suppliers.sort(
-                    key=lambda s: (
-                        s.get("rating", 0) or 0,  # Higher is better
-                        s.get("reliability", 0) or 0,  # Higher is better
-                        -(s.get("unitPrice", 0) or 999999)  # Lower price is better (negative for reverse sort)
-                    ),
-                    reverse=True
-                )
-                unique_suppliers = unique_suppliers[:3]
-                print(f"✅ Selected top 3 best suppliers for {material_name} from {len(suppliers)} found")
-            elif len(unique_suppliers) == 3:
-                print(f"✅ Found exactly 3 suppliers for {material_name}")
+            result["suppliers"] = self._select_suppliers(material_name, result["suppliers"])
+        
+        return result
+    
+    @track_agent
+    async def find_suppliers_bulk(
+        self,
+        materials: List[Dict[str, Any]],
+        on_result: SupplierResultCallback,
+        preferred_countries: List[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate supplier recommendations for a whole BOM
+        
+        Equivalent materials (same normalized name, type, unit and countries) are
+        requested once with their quantities summed. Cached results are reused
+        for the same material at the same order of magnitude of quantity, since
+        the quantity shapes which suppliers' MOQs fit. Unique materials are packed
+        several per prompt up to the pack token budget and the packs run
+        concurrently; `on_result` is awaited once per input material as soon as
+        its pack completes. Materials a pack fails to cover fall back to a
+        single-material request.
+        
+        Args:
+            materials: Items with material_name, material_type, quantity, unit and
+                optional preferred_countries
+            on_result: Async callback receiving {"index", "material_name", "success",
+                "data" | "error", "cached"} for each input material
+            preferred_countries: Default countries for items that don't set their own
+        
+        Returns:
+            Summary with input, unique, cached and pack counts
+        """
+        groups: Dict[str, Dict[str, Any]] = {}
+        for index, material in enumerate(materials):
+            countries = material.get("preferred_countries") or preferred_countries or []
+            key = "|".join([
+                _normalize(material["material_name"]),
+                _normalize(material["material_type"]),
+                _normalize(material["unit"]),
+                ",".join(sorted(_normalize(c) for c in countries))
+            ])
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {
+                    "id": f"m{len(groups) + 1}",
+                    "material_name": material["material_name"],
+                    "material_type": material["material_type"],
+                    "unit": material["unit"],
+                    "quantity": 0.0,
+                    "preferred_countries": countries,
+                    "indices": [],
+                    "material_key": key
+                }
+            group["quantity"] += float(material.get("quantity") or 0)
+            group["indices"].append(index)
+        for group in groups.values():
+            group["cache_key"] = self._cache_key(group.pop("material_key"), _quantity_bucket(group["quantity"]))
+        
+        async def emit(group: Dict[str, Any], data: Optional[Dict[str, Any]] = None,
+                       error: Optional[str] = None, cached: bool = False) -> None:
+            for index in group["indices"]:
+                line = {"index": index, "material_name": materials[index]["material_name"], "success": error is None}
+                if error is None:
+                    line.update({"data": data, "cached": cached})
+                else:
+                    line["error"] = error
+                await on_result(line)
+        
+        pending = []
+        cached_count = 0
+        for group in groups.values():
+            cached = await self.groq_service.response_cache.get(group["cache_key"], "supplier_recommendations")
+            if cached is not None:
+                cached_count += 1
+                await emit(group, json.loads(cached), cached=True)
             else:
-                print(f"⚠️  Found {len(unique_suppliers)} supplier(s) for {material_name} (target: 3, but returning all available)")
+                pending.append(group)
+        
+        packs = self._pack(pending)
+        
+        async def run_pack(pack: List[Dict[str, Any]]) -> None:
+            try:
+                found = await self._find_pack(pack)
+            except Exception as e:
+                print(f"⚠️  Supplier pack of {len(pack)} material(s) failed: {e}")
+                for group in pack:
+                    await emit(group, error=str(e))
+                return
+            
+            async def resolve(group: Dict[str, Any]) -> None:
+                data = found.get(group["id"])
+                if data is None:
+                    # Pack response skipped this material (truncation or a mislabeled id)
+                    try:
+                        data = await self.find_suppliers(
+                            material_name=group["material_name"],
+                            material_type=group["material_type"],
+                            quantity=group["quantity"],
+                            unit=group["unit"],
+                            preferred_countries=group["preferred_countries"]
+                        )
+                    except Exception as e:
+                        await emit(group, error=str(e))
+                        return
+                # Only complete results are cached; a repaired partial response must not stick for a day
+                if isinstance(data.get("suppliers"), list):
+                    await self.groq_service.response_cache.set(
+                        group["cache_key"], json.dumps(data), "supplier_recommendations"
+                    )
+                await emit(group, data)
             
-            result["suppliers"] = unique_suppliers
+            await asyncio.gather(*[resolve(group) for group in pack])
         
-        return result
-
+        await asyncio.gather(*[run_pack(pack) for pack in packs])
+        
+        return {
+            "materials": len(materials),
+            "unique_materials": len(groups),
+            "cached": cached_count,
+            "packs": len(packs)
+        }
+    
+    def _pack(self, groups: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Greedily pack materials into prompts whose estimated output fits the token budget"""
+        packs: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        used = 0
+        for group in groups:
+            cost = TOKENS_PER_MATERIAL + len(self._material_line(group)) // 4
+            if current and used + cost > self.pack_token_budget:
+                packs.append(current)
+                current, used = [], 0
+            current.append(group)
+            used += cost
+        if current:
+            packs.append(current)
+        return packs
+    
+    async def _find_pack(self, pack: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """One completion for a pack; returns {"suppliers": [...]} keyed by material id"""
+        messages = supplier_recommendations_bulk_prompt.render(
+            material_name="each material",
+            materials="\n".join(self._material_line(group) for group in pack)
+        )
+        
+        response = await self.groq_service.chat_completion(
+            model=MODEL,
+            messages=messages,
+            temperature=0.3,
+            max_completion_tokens=max(1024, min(8192, TOKENS_PER_MATERIAL * len(pack) + 512)),
+            response_format={"type": "json_object"},
+            cache_namespace="supplier_recommendations"
+        )
+        
+        result = self.groq_service._parse_json_response(response.choices[0].message.content)
+        
+        names = {group["id"]: group["material_name"] for group in pack}
+        found: Dict[str, Dict[str, Any]] = {}
+        for entry in result.get("materials", []):
+            if not isinstance(entry, dict):
+                continue
+            material_id = str(entry.get("id", "")).strip()
+            if material_id in names and material_id not in found and isinstance(entry.get("suppliers"), list):
+                found[material_id] = {"suppliers": self._select_suppliers(names[material_id], entry["suppliers"])}
+        return found
+    
+    @staticmethod
+    def _material_line(group: Dict[str, Any]) -> str:
+        countries = ', '.join(group["preferred_countries"]) if group["preferred_countries"] else "None"
+        return (
+            f"{group['id']}: {group['material_name']} | Type: {group['material_type']} | "
+            f"Quantity Needed: {group['quantity']:g} {group['unit']} | Preferred Countries: {countries}"
+        )
+    
+    @staticmethod
+    def _cache_key(material_key: str, quantity_bucket: int) -> str:
+        """Cache key for one deduplicated material's bulk result"""
+        payload = json.dumps({
+            "agent": "supplier_recommendations",
+            "model": MODEL,
+            "material": material_key,
+            "quantity_bucket": quantity_bucket
+        })
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _select_suppliers(material_name: str, suppliers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Ensure max 3 best suppliers per material (AI should have already ranked them)"""
+        # Remove duplicates by company name
+        seen_names = set()
+        unique_suppliers = []
+        for supplier in suppliers:
+            if not isinstance(supplier, dict):
+                continue
+            supplier_name = (supplier.get("name") or "").strip().lower()
+            if supplier_name and supplier_name not in seen_names:
+                seen_names.add(supplier_name)
+                unique_suppliers.append(supplier)
+        
+        # If AI returned more than 3, take the top 3 best ones
+        # (AI should have already ranked them, but we ensure here as well)
+        if len(unique_suppliers) > 3:
+            # Sort by rating, reliability, and price competitiveness
+            unique_suppliers.sort(
+                key=lambda s: (
+                    s.get("rating", 0) or 0,  # Higher is better
+                    s.get("reliability", 0) or 0,  # Higher is better
+                    -(s.get("unitPrice", 0) or 999999)  # Lower price is better (negative for reverse sort)
+                ),
+                reverse=True
+            )
+            unique_suppliers = unique_suppliers[:3]
+            print(f"✅ Selected top 3 best suppliers for {material_name} from {len(suppliers)} found")
+        elif len(unique_suppliers) == 3:
+            print(f"✅ Found exactly 3 suppliers for {material_name}")
+        else:
+            print(f"⚠️  Found {len(unique_suppliers)} supplier(s) for {material_name} (target: 3, but returning all available)")
+        
+        return unique_suppliers
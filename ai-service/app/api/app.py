@@ -6,10 +6,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.config import APIConfig
-from app.api.routers import health, inference, batch
+from app.api.middleware.metrics import MetricsMiddleware
+from app.api.routers import health, inference, batch, jobs, metrics
 from app.models.bom_generator import BOMGenerator
 from app.services.groq_service import GroqService
 from app.services.batch_service import BatchService
+from app.services.batch_manager import BatchManager
+from app.services.deferred_batcher import DeferredBatcher
+from app.services.job_queue import BOMJobQueue
+from app.services.job_store import create_job_store
 
 
 @asynccontextmanager
@@ -29,10 +34,13 @@ async def lifespan(app: FastAPI):
     bom_generator = None
     groq_service = None
     batch_svc = None
+    batch_manager = None
+    job_queue = None
+    deferred_batcher = None
     
     try:
-        bom_generator = BOMGenerator()
         groq_service = GroqService()
+        bom_generator = BOMGenerator(groq_service)
         batch_svc = BatchService()
         print("✅ AI Service initialized successfully")
     except ValueError as e:
@@ -44,14 +52,36 @@ async def lifespan(app: FastAPI):
     # Set services in routers
     if bom_generator and groq_service:
         inference.set_services(bom_generator, groq_service)
+        job_queue = BOMJobQueue.from_env(bom_generator, create_job_store())
+        await job_queue.start()
+        jobs.set_job_queue(job_queue)
+        inference.set_job_queue(job_queue)
     
     if batch_svc:
         batch.set_batch_service(batch_svc)
+        # One poller tracks every batch (API-submitted and deferred)
+        batch_manager = BatchManager.from_env(batch_svc)
+        await batch_manager.start()
+        batch.set_batch_manager(batch_manager)
+        if groq_service:
+            # Bulk lane for priority="deferred" requests
+            deferred_batcher = DeferredBatcher.from_env(batch_manager)
+            groq_service.deferred_batcher = deferred_batcher
     
     yield
     
     # Shutdown
     print("🛑 Shutting down AI Service...")
+    if deferred_batcher:
+        await deferred_batcher.stop()
+    if batch_manager:
+        await batch_manager.stop()
+    if batch_svc:
+        await batch_svc.aclose()
+    if job_queue:
+        await job_queue.stop()
+    if groq_service:
+        await groq_service.aclose()
     print("✅ AI Service shutdown complete")
 
 
@@ -75,10 +105,15 @@ def create_app() -> FastAPI:
         allow_headers=APIConfig.CORS_ALLOW_HEADERS,
     )
     
+    # Per-route latency for /metrics
+    app.add_middleware(MetricsMiddleware)
+    
     # Include routers
     app.include_router(health.router)
+    app.include_router(metrics.router)
     app.include_router(inference.router)
     app.include_router(batch.router)
+    app.include_router(jobs.router)
     
     # Root endpoint
     @app.get("/")
@@ -88,14 +123,27 @@ def create_app() -> FastAPI:
             "version": APIConfig.SERVICE_VERSION,
             "endpoints": {
                 "health": "/health",
+                "metrics": "/metrics",
                 "generate_bom": "/api/v1/ai/generate-bom",
+                "generate_bom_stream": "/api/v1/ai/generate-bom/stream",
                 "generate_market_forecast": "/api/v1/ai/generate-market-forecast",
                 "generate_price_forecast": "/api/v1/ai/generate-price-forecast",
+                "generate_price_forecast_batch": "/api/v1/ai/generate-price-forecast/batch",
                 "generate_suppliers": "/api/v1/ai/generate-suppliers",
+                "generate_suppliers_bulk": "/api/v1/ai/generate-suppliers/bulk",
                 "fetch_supplier_contact": "/api/v1/ai/fetch-supplier-contact",
                 "generate_revenue_projection": "/api/v1/ai/generate-revenue-projection",
                 "generate_product_performance": "/api/v1/ai/generate-product-performance",
-                "generate_marketing_campaigns": "/api/v1/ai/generate-marketing-campaigns"
+                "generate_marketing_campaigns": "/api/v1/ai/generate-marketing-campaigns",
+                "cache_stats": "/api/v1/ai/cache-stats",
+                "rate_limits": "/api/v1/ai/rate-limits",
+                "deferred_stats": "/api/v1/ai/deferred-stats",
+                "create_batch": "/api/v1/batch/create",
+                "batch_status": "/api/v1/batch/status/{batch_id}",
+                "tracked_batches": "/api/v1/batch/tracked",
+                "submit_bom_job": "/api/v1/ai/jobs/bom",
+                "bom_job_status": "/api/v1/ai/jobs/{job_id}",
+                "bom_job_result": "/api/v1/ai/jobs/{job_id}/result"
             }
         }
     
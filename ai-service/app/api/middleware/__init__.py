@@ -0,0 +1,3 @@
+"""
+API Middleware
+"""
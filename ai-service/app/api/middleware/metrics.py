@@ -0,0 +1,58 @@
+"""
+Request Metrics Middleware
+Records per-route request latency for the /metrics endpoint
+"""
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import HTTP_LATENCY
+
+
+class MetricsMiddleware:
+    """
+    Observe request latency labeled by method, route template and status
+
+    A pure ASGI middleware, so the timer stops at the final response body
+    message: streaming (SSE/NDJSON) routes report their full duration rather
+    than the time to their headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        observed = False
+
+        def observe() -> None:
+            nonlocal observed
+            if observed:
+                return
+            observed = True
+            # Route templates (not raw paths) keep label cardinality bounded
+            route = scope.get("route")
+            HTTP_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status)
+            ).observe(time.perf_counter() - start)
+
+        async def send_and_observe(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        finally:
+            # Errors and client disconnects end the request without a final body
+            observe()
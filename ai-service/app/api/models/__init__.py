@@ -2,13 +2,17 @@
 API Request/Response Models
 """
 from .bom import BOMRequest, BOMResponse
+from .common import Priority
 from .forecast import (
     MarketForecastRequest,
     PriceForecastRequest,
+    PriceForecastMaterial,
+    PriceForecastBatchRequest,
     RevenueProjectionRequest
 )
 from .supplier import (
     SupplierRequest,
+    BulkSupplierRequest,
     SupplierContactRequest
 )
 from .product import (
@@ -19,12 +23,15 @@ from .product import (
 __all__ = [
     'BOMRequest',
     'BOMResponse',
+    'Priority',
     'MarketForecastRequest',
     'PriceForecastRequest',
+    'PriceForecastMaterial',
+    'PriceForecastBatchRequest',
     'RevenueProjectionRequest',
     'SupplierRequest',
+    'BulkSupplierRequest',
     'SupplierContactRequest',
     'ProductPerformanceRequest',
     'MarketingCampaignRequest',
 ]
-
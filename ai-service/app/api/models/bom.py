@@ -16,4 +16,5 @@ class BOMResponse(BaseModel):
     bom: Dict[str, Any]
     confidence: float
     processing_time: float
+    stage_timings: Dict[str, float] = {}  # Wall time per orchestrator stage (seconds)
 
@@ -0,0 +1,8 @@
+"""
+Shared Request Model Types
+"""
+from typing import Literal
+
+
+# "deferred" requests run through the Groq Batch API and are polled via /api/v1/ai/jobs
+Priority = Literal["interactive", "deferred"]
@@ -1,9 +1,11 @@
 """
 Forecast Request Models
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
+from .common import Priority
+
 
 class MarketForecastRequest(BaseModel):
     """Request model for market forecast generation"""
@@ -11,6 +13,7 @@ class MarketForecastRequest(BaseModel):
     product_description: Optional[str] = None
     bom_materials: List[str]
     target_markets: Optional[List[str]] = None
+    priority: Priority = "interactive"
 
 
 class PriceForecastRequest(BaseModel):
@@ -19,6 +22,21 @@ class PriceForecastRequest(BaseModel):
     material_type: str
     unit: str
     weeks: int = 8
+    priority: Priority = "interactive"
+
+
+class PriceForecastMaterial(BaseModel):
+    """One material in a batch price forecast"""
+    material_name: str
+    material_type: str
+    unit: str
+
+
+class PriceForecastBatchRequest(BaseModel):
+    """Request model for batch price forecast generation"""
+    materials: List[PriceForecastMaterial] = Field(..., min_length=1)
+    weeks: int = 8
+    priority: Priority = "interactive"
 
 
 class RevenueProjectionRequest(BaseModel):
@@ -27,4 +45,5 @@ class RevenueProjectionRequest(BaseModel):
     product_description: Optional[str] = None
     bom_cost: float
     target_markets: Optional[List[str]] = None
+    priority: Priority = "interactive"
 
@@ -4,10 +4,13 @@ Product Request Models
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 
+from .common import Priority
+
 
 class ProductPerformanceRequest(BaseModel):
     """Request model for product performance generation"""
     products: List[Dict[str, Any]]
+    priority: Priority = "interactive"
 
 
 class MarketingCampaignRequest(BaseModel):
@@ -15,4 +18,5 @@ class MarketingCampaignRequest(BaseModel):
     product_name: str
     product_description: Optional[str] = None
     target_markets: Optional[List[str]] = None
+    priority: Priority = "interactive"
 
@@ -1,8 +1,10 @@
 """
 Supplier Request Models
 """
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, List, Optional
+
+from .common import Priority
 
 
 class SupplierRequest(BaseModel):
@@ -12,6 +14,30 @@ class SupplierRequest(BaseModel):
     quantity: float
     unit: str
     preferred_countries: Optional[List[str]] = None
+    priority: Priority = "interactive"
+
+
+class SupplierMaterial(BaseModel):
+    """One material in a bulk supplier request"""
+    material_name: str
+    material_type: str
+    quantity: float
+    unit: str
+    preferred_countries: Optional[List[str]] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def reject_priority(cls, data: Any) -> Any:
+        # Bulk requests always run interactively; don't silently drop a per-item priority
+        if isinstance(data, dict) and "priority" in data:
+            raise ValueError("priority is not supported per material in bulk supplier requests")
+        return data
+
+
+class BulkSupplierRequest(BaseModel):
+    """Request model for supplier recommendations for a whole BOM"""
+    materials: List[SupplierMaterial] = Field(..., min_length=1)
+    preferred_countries: Optional[List[str]] = None
 
 
 class SupplierContactRequest(BaseModel):
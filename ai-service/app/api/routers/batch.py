@@ -2,16 +2,19 @@
 Batch Processing Router
 Handles Groq Batch API operations
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 import json
 
+from app.services.batch_manager import BatchManager
 from app.services.batch_service import BatchService
 
 router = APIRouter(prefix="/api/v1/batch", tags=["Batch"])
 
-# Global batch service
+# Global batch service and the manager that tracks its batches
 batch_service: Optional[BatchService] = None
+batch_manager: Optional[BatchManager] = None
 
 
 def set_batch_service(service: BatchService):
@@ -20,11 +23,27 @@ def set_batch_service(service: BatchService):
     batch_service = service
 
 
+def set_batch_manager(manager: BatchManager):
+    """Set global batch manager (called during app startup)"""
+    global batch_manager
+    batch_manager = manager
+
+
+def _require_manager() -> BatchManager:
+    if not batch_manager:
+        raise HTTPException(
+            status_code=500,
+            detail="Batch service not initialized"
+        )
+    return batch_manager
+
+
 @router.post("/create")
 async def create_batch(
     requests: List[dict],
     endpoint: str = "/v1/chat/completions",
-    completion_window: str = "24h"
+    completion_window: str = "24h",
+    callback_url: Optional[str] = None
 ):
     """
     Create a batch job from a list of requests
@@ -33,82 +52,111 @@ async def create_batch(
         requests: List of batch request dictionaries
         endpoint: API endpoint
         completion_window: Processing window (24h to 7d)
+        callback_url: Optional URL POSTed `{"event": "batch.<status>", "batch": {...}}`
+            when the batch finishes
     
     Returns:
         Batch job information
     """
-    if not batch_service:
-        raise HTTPException(
-            status_code=500,
-            detail="Batch service not initialized"
-        )
+    manager = _require_manager()
     
     try:
-        # Create batch file
-        file_path = batch_service.create_batch_file(requests)
-        
-        # Upload file
-        file_obj = batch_service.upload_batch_file(file_path)
-        
-        # Create batch job
-        batch = batch_service.create_batch_job(
-            input_file_id=file_obj.id,
+        record = await manager.submit(
+            requests,
             endpoint=endpoint,
-            completion_window=completion_window
+            completion_window=completion_window,
+            callback_url=callback_url
         )
-        
         return {
             "success": True,
-            "batch_id": batch.id,
-            "status": batch.status,
-            "input_file_id": batch.input_file_id,
-            "completion_window": batch.completion_window,
-            "expires_at": batch.expires_at
+            "batch_id": record["batch_id"],
+            "status": record["status"],
+            "input_file_id": record["input_file_id"],
+            "completion_window": record["completion_window"],
+            "expires_at": record["expires_at"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch creation failed: {str(e)}")
 
 
 @router.get("/status/{batch_id}")
-async def get_batch_status(batch_id: str):
-    """Get the status of a batch job"""
-    if not batch_service:
-        raise HTTPException(
-            status_code=500,
-            detail="Batch service not initialized"
-        )
+async def get_batch_status(batch_id: str, refresh: bool = False):
+    """
+    Get the status of a batch job
+    
+    Answered from the batch manager's registry, which its background poller
+    keeps current; `refresh=true` retrieves the batch from Groq first.
+    """
+    manager = _require_manager()
     
     try:
-        status = batch_service.get_batch_status(batch_id)
+        record = await manager.get_status(batch_id, refresh=refresh)
         return {
             "success": True,
-            "batch_id": status.id,
-            "status": status.status,
-            "request_counts": status.request_counts,
-            "output_file_id": status.output_file_id,
-            "error_file_id": status.error_file_id,
-            "completed_at": status.completed_at,
-            "expires_at": status.expires_at
+            "batch_id": record["batch_id"],
+            "status": record["status"],
+            "request_counts": record["request_counts"],
+            "output_file_id": record["output_file_id"],
+            "error_file_id": record["error_file_id"],
+            "completed_at": record["completed_at"],
+            "expires_at": record["expires_at"],
+            "last_polled_at": record["last_polled_at"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get batch status: {str(e)}")
 
 
+@router.get("/tracked")
+async def list_tracked_batches():
+    """List batches in the manager's registry with poller counters"""
+    manager = _require_manager()
+    return {
+        "success": True,
+        "batches": manager.list(),
+        "stats": manager.stats()
+    }
+
+
 @router.get("/results/{output_file_id}")
-async def get_batch_results(output_file_id: str):
-    """Get results from a completed batch job"""
+async def get_batch_results(
+    output_file_id: str,
+    custom_id: Optional[List[str]] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """
+    Stream results from a completed batch job as NDJSON
+    
+    Lines are read from the Files API and forwarded one at a time, so memory
+    stays flat however large the file is. Repeat `custom_id` to select
+    specific requests; `offset`/`limit` page through the (filtered) results,
+    and a page shorter than `limit` is the last one.
+    """
     if not batch_service:
         raise HTTPException(
             status_code=500,
             detail="Batch service not initialized"
         )
     
+    results = batch_service.iter_batch_results_async(
+        output_file_id, custom_ids=custom_id, offset=offset, limit=limit
+    )
+    # Pull the first line before responding so a missing file is still a plain HTTP error
     try:
-        results = batch_service.get_batch_results(output_file_id)
-        return {
-            "success": True,
-            "results": results
-        }
+        first = await results.__anext__()
+    except StopAsyncIteration:
+        first = None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get batch results: {str(e)}")
-
+    
+    async def lines():
+        if first is None:
+            return
+        try:
+            yield json.dumps(first) + "\n"
+            async for result in results:
+                yield json.dumps(result) + "\n"
+        finally:
+            await results.aclose()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
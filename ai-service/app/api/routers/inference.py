@@ -3,17 +3,24 @@ AI Inference Router
 Handles all AI-related endpoints
 """
 from fastapi import APIRouter, File, UploadFile, HTTPException
-from typing import List, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional, Dict, Any, Awaitable, Callable
+import asyncio
+import functools
+import json
+import math
 import time
 
 from app.api.models.bom import BOMRequest, BOMResponse
 from app.api.models.forecast import (
     MarketForecastRequest,
     PriceForecastRequest,
+    PriceForecastBatchRequest,
     RevenueProjectionRequest
 )
 from app.api.models.supplier import (
     SupplierRequest,
+    BulkSupplierRequest,
     SupplierContactRequest
 )
 from app.api.models.product import (
@@ -21,13 +28,16 @@ from app.api.models.product import (
     MarketingCampaignRequest
 )
 from app.models.bom_generator import BOMGenerator
+from app.services.circuit_breaker import find_circuit_open
 from app.services.groq_service import GroqService
+from app.services.job_queue import BOMJobQueue, QueueFullError
 
 router = APIRouter(prefix="/api/v1/ai", tags=["AI"])
 
 # Global services (will be injected via dependency)
 bom_generator: Optional[BOMGenerator] = None
 groq_service: Optional[GroqService] = None
+job_queue: Optional[BOMJobQueue] = None
 
 
 def set_services(bom_gen: BOMGenerator, groq_svc: GroqService):
@@ -37,6 +47,101 @@ def set_services(bom_gen: BOMGenerator, groq_svc: GroqService):
     groq_service = groq_svc
 
 
+def set_job_queue(queue: BOMJobQueue):
+    """Set global job queue used for deferred-priority requests (called during app startup)"""
+    global job_queue
+    job_queue = queue
+
+
+async def _read_images(images: List[UploadFile]) -> List[Dict[str, Any]]:
+    """Read and validate uploaded product images"""
+    image_data = []
+    for image in images:
+        if not image.content_type or not image.content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail=f"Invalid file type: {image.content_type}")
+        
+        data = await image.read()
+        image_data.append({
+            "data": data,
+            "filename": image.filename,
+            "content_type": image.content_type
+        })
+    return image_data
+
+
+def _unavailable(error: Exception) -> Optional[HTTPException]:
+    """503 with Retry-After when the failure was a Groq model's circuit being open"""
+    circuit_open = find_circuit_open(error)
+    if circuit_open is None:
+        return None
+    return HTTPException(
+        status_code=503,
+        detail=str(circuit_open),
+        headers={"Retry-After": str(math.ceil(circuit_open.retry_after))}
+    )
+
+
+def _generation_error(error: Exception, action: str) -> HTTPException:
+    """Map a generation failure to an HTTP error"""
+    print(f"Error in {action.lower()}: {str(error)}")
+    return _unavailable(error) or HTTPException(status_code=500, detail=f"{action} failed: {str(error)}")
+
+
+def _bom_error(error: Exception) -> HTTPException:
+    """Map a BOM generation failure to an HTTP error"""
+    error_str = str(error)
+    print(f"Error generating BOM: {error_str}")
+    
+    unavailable = _unavailable(error)
+    if unavailable is not None:
+        return unavailable
+    
+    # Check if it's a rate limit error
+    if "429" in error_str or "rate limit" in error_str.lower() or "quota" in error_str.lower():
+        return HTTPException(
+            status_code=429,
+            detail="Groq API rate limit exceeded. Please wait a few minutes and try again."
+        )
+    
+    # Generic error
+    return HTTPException(
+        status_code=500,
+        detail=f"BOM generation failed: {error_str}"
+    )
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _ndjson(data: Dict[str, Any]) -> str:
+    """Format one newline-delimited JSON line"""
+    return json.dumps(data) + "\n"
+
+
+async def _defer(kind: str, generate: Callable[[], Awaitable[Any]]) -> JSONResponse:
+    """
+    Run a deferred-priority request through the Batch API lane
+    
+    Returns 202 with a job ID; the result is fetched from /api/v1/ai/jobs/{job_id}/result.
+    """
+    if not job_queue or groq_service.deferred_batcher is None:
+        raise HTTPException(status_code=503, detail="Deferred priority is unavailable: batch service not initialized")
+    
+    try:
+        job = await job_queue.submit_deferred(kind, generate)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JSONResponse(status_code=202, content={"success": True, "data": {
+        "job_id": job["job_id"],
+        "kind": kind,
+        "priority": "deferred",
+        "status": job["status"],
+        "created_at": job["created_at"]
+    }})
+
+
 @router.post("/generate-bom", response_model=BOMResponse)
 async def generate_bom(
     images: List[UploadFile] = File(...),
@@ -61,17 +166,7 @@ async def generate_bom(
     
     try:
         # Read image data
-        image_data = []
-        for image in images:
-            if not image.content_type or not image.content_type.startswith("image/"):
-                raise HTTPException(status_code=400, detail=f"Invalid file type: {image.content_type}")
-            
-            data = await image.read()
-            image_data.append({
-                "data": data,
-                "filename": image.filename,
-                "content_type": image.content_type
-            })
+        image_data = await _read_images(images)
         
         # Generate BOM using Groq
         result = await bom_generator.generate(
@@ -84,30 +179,106 @@ async def generate_bom(
         
         # Log if processing takes too long
         if processing_time > 5.0:
-            print(f"WARNING: BOM generation took {processing_time:.2f}s (target: <5s)")
+            print(f"WARNING: BOM generation took {processing_time:.2f}s (target: <5s), stages: {result.get('stage_timings', {})}")
         
         return BOMResponse(
             bom=result["bom"],
             confidence=result["confidence"],
-            processing_time=round(processing_time, 2)
+            processing_time=round(processing_time, 2),
+            stage_timings=result.get("stage_timings", {})
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        error_str = str(e)
-        print(f"Error generating BOM: {error_str}")
-        
-        # Check if it's a rate limit error
-        if "429" in error_str or "rate limit" in error_str.lower() or "quota" in error_str.lower():
-            raise HTTPException(
-                status_code=429,
-                detail="Groq API rate limit exceeded. Please wait a few minutes and try again."
-            )
-        
-        # Generic error
+        raise _bom_error(e)
+
+
+@router.post("/generate-bom/stream")
+async def generate_bom_stream(
+    images: List[UploadFile] = File(...),
+    description: Optional[str] = None,
+    yield_buffer: float = 10.0
+):
+    """
+    Generate BOM and stream progress as Server-Sent Events
+    
+    Emits an `item` event for each material item as the material analysis
+    generates it, a `stage` event as each orchestrator stage finishes (with
+    the partial BOM and stage timing), then a `bom` event carrying the final
+    BOMResponse, or an `error` event if generation fails. Items carry the
+    material attempt number; a higher attempt supersedes earlier items. When
+    the components are analyzed in chunks, items also carry their `chunk`
+    index, and attempts (and category indexes) count per chunk.
+    Closing the connection cancels the pipeline.
+    """
+    start_time = time.time()
+    
+    if not images:
+        raise HTTPException(status_code=400, detail="At least one image is required")
+    
+    if not bom_generator:
         raise HTTPException(
             status_code=500,
-            detail=f"BOM generation failed: {error_str}"
+            detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
         )
+    
+    image_data = await _read_images(images)
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def on_stage_complete(stage_name: str, stage_time: float, partial_bom: Dict[str, Any]) -> None:
+        await events.put(_sse("stage", {
+            "stage": stage_name,
+            "stage_time": stage_time,
+            "elapsed": round(time.time() - start_time, 2),
+            "bom": partial_bom
+        }))
+    
+    async def on_material_item(event: Dict[str, Any]) -> None:
+        await events.put(_sse("item", {
+            **event,
+            "elapsed": round(time.time() - start_time, 2)
+        }))
+    
+    async def run_pipeline() -> None:
+        try:
+            result = await bom_generator.generate(
+                images=image_data,
+                description=description or "",
+                yield_buffer=yield_buffer,
+                on_stage_complete=on_stage_complete,
+                on_material_item=on_material_item
+            )
+            response = BOMResponse(
+                bom=result["bom"],
+                confidence=result["confidence"],
+                processing_time=round(time.time() - start_time, 2),
+                stage_timings=result.get("stage_timings", {})
+            )
+            await events.put(_sse("bom", response.model_dump()))
+        except Exception as e:
+            error = _bom_error(e)
+            await events.put(_sse("error", {"status_code": error.status_code, "detail": error.detail}))
+        finally:
+            await events.put(None)
+    
+    async def event_stream():
+        pipeline = asyncio.create_task(run_pipeline())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # Client went away (or stream finished): stop any work still running
+            pipeline.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post("/generate-market-forecast")
@@ -119,17 +290,21 @@ async def generate_market_forecast(request: MarketForecastRequest):
             detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
         )
     
+    generate = functools.partial(
+        groq_service.generate_market_demand_forecast,
+        product_name=request.product_name,
+        product_description=request.product_description or "",
+        bom_materials=request.bom_materials,
+        target_markets=request.target_markets
+    )
+    if request.priority == "deferred":
+        return await _defer("market_forecast", generate)
+    
     try:
-        result = await groq_service.generate_market_demand_forecast(
-            product_name=request.product_name,
-            product_description=request.product_description or "",
-            bom_materials=request.bom_materials,
-            target_markets=request.target_markets
-        )
+        result = await generate()
         return {"success": True, "data": result}
     except Exception as e:
-        print(f"Error generating market forecast: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Market forecast generation failed: {str(e)}")
+        raise _generation_error(e, "Market forecast generation")
 
 
 @router.post("/generate-price-forecast")
@@ -141,17 +316,51 @@ async def generate_price_forecast(request: PriceForecastRequest):
             detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
         )
     
+    generate = functools.partial(
+        groq_service.generate_material_price_forecast,
+        material_name=request.material_name,
+        material_type=request.material_type,
+        unit=request.unit,
+        weeks=request.weeks
+    )
+    if request.priority == "deferred":
+        return await _defer("price_forecast", generate)
+    
     try:
-        result = await groq_service.generate_material_price_forecast(
-            material_name=request.material_name,
-            material_type=request.material_type,
-            unit=request.unit,
-            weeks=request.weeks
+        result = await generate()
+        return {"success": True, "data": result}
+    except Exception as e:
+        raise _generation_error(e, "Price forecast generation")
+
+
+@router.post("/generate-price-forecast/batch")
+async def generate_price_forecast_batch(request: PriceForecastBatchRequest):
+    """
+    Generate price forecasts for many materials in one request
+    
+    Materials sharing a material_type share one market-context search.
+    Returns a material x week price matrix (`prices[row][week - 1]`) with
+    rows in request order.
+    """
+    if not groq_service:
+        raise HTTPException(
+            status_code=500,
+            detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
         )
+    
+    generate = functools.partial(
+        groq_service.generate_material_price_forecast_batch,
+        materials=[material.model_dump() for material in request.materials],
+        weeks=request.weeks
+    )
+    if request.priority == "deferred":
+        return await _defer("price_forecast_batch", generate)
+    
+    try:
+        result = await generate()
         return {"success": True, "data": result}
     except Exception as e:
-        print(f"Error generating price forecast: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Price forecast generation failed: {str(e)}")
+        raise _generation_error(e, "Price forecast generation")
 
 
 @router.post("/generate-suppliers")
@@ -163,18 +372,78 @@ async def generate_suppliers(request: SupplierRequest):
             detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
         )
     
+    generate = functools.partial(
+        groq_service.generate_supplier_recommendations,
+        material_name=request.material_name,
+        material_type=request.material_type,
+        quantity=request.quantity,
+        unit=request.unit,
+        preferred_countries=request.preferred_countries
+    )
+    if request.priority == "deferred":
+        return await _defer("supplier_recommendations", generate)
+    
     try:
-        result = await groq_service.generate_supplier_recommendations(
-            material_name=request.material_name,
-            material_type=request.material_type,
-            quantity=request.quantity,
-            unit=request.unit,
-            preferred_countries=request.preferred_countries
-        )
+        result = await generate()
         return {"success": True, "data": result}
     except Exception as e:
-        print(f"Error generating suppliers: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Supplier generation failed: {str(e)}")
+        raise _generation_error(e, "Supplier generation")
+
+
+@router.post("/generate-suppliers/bulk")
+async def generate_suppliers_bulk(request: BulkSupplierRequest):
+    """
+    Generate supplier recommendations for every material in a BOM
+    
+    Streams newline-delimited JSON: one `material` line per input item (in
+    completion order, with its `index` in the request) carrying the same
+    `data` as `/generate-suppliers` or an `error`, then a final `done` line
+    with dedupe/packing counts. Equivalent materials are requested once and
+    several materials share each prompt.
+    """
+    start_time = time.time()
+    
+    if not groq_service:
+        raise HTTPException(
+            status_code=500,
+            detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
+        )
+    
+    lines: asyncio.Queue = asyncio.Queue()
+    
+    async def on_result(result: Dict[str, Any]) -> None:
+        await lines.put(_ndjson({"type": "material", **result}))
+    
+    async def run_bulk() -> None:
+        try:
+            summary = await groq_service.generate_supplier_recommendations_bulk(
+                materials=[material.model_dump() for material in request.materials],
+                on_result=on_result,
+                preferred_countries=request.preferred_countries
+            )
+            await lines.put(_ndjson({
+                "type": "done",
+                **summary,
+                "elapsed": round(time.time() - start_time, 2)
+            }))
+        except Exception as e:
+            print(f"Error generating bulk suppliers: {str(e)}")
+            await lines.put(_ndjson({"type": "error", "detail": f"Supplier generation failed: {str(e)}"}))
+        finally:
+            await lines.put(None)
+    
+    async def line_stream():
+        task = asyncio.create_task(run_bulk())
+        try:
+            while True:
+                line = await lines.get()
+                if line is None:
+                    break
+                yield line
+        finally:
+            task.cancel()
+    
+    return StreamingResponse(line_stream(), media_type="application/x-ndjson")
 
 
 @router.post("/fetch-supplier-contact")
@@ -195,8 +464,7 @@ async def fetch_supplier_contact(request: SupplierContactRequest):
         )
         return {"success": True, "data": result}
     except Exception as e:
-        print(f"Error fetching supplier contact: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Contact fetch failed: {str(e)}")
+        raise _generation_error(e, "Contact fetch")
 
 
 @router.post("/generate-revenue-projection")
@@ -208,17 +476,21 @@ async def generate_revenue_projection(request: RevenueProjectionRequest):
             detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
         )
     
+    generate = functools.partial(
+        groq_service.generate_revenue_projection,
+        product_name=request.product_name,
+        product_description=request.product_description or "",
+        bom_cost=request.bom_cost,
+        target_markets=request.target_markets
+    )
+    if request.priority == "deferred":
+        return await _defer("revenue_projection", generate)
+    
     try:
-        result = await groq_service.generate_revenue_projection(
-            product_name=request.product_name,
-            product_description=request.product_description or "",
-            bom_cost=request.bom_cost,
-            target_markets=request.target_markets
-        )
+        result = await generate()
         return {"success": True, "data": result}
     except Exception as e:
-        print(f"Error generating revenue projection: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Revenue projection generation failed: {str(e)}")
+        raise _generation_error(e, "Revenue projection generation")
 
 
 @router.post("/generate-product-performance")
@@ -230,14 +502,18 @@ async def generate_product_performance(request: ProductPerformanceRequest):
             detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
         )
     
+    generate = functools.partial(
+        groq_service.generate_product_performance,
+        products=request.products
+    )
+    if request.priority == "deferred":
+        return await _defer("product_performance", generate)
+    
     try:
-        result = await groq_service.generate_product_performance(
-            products=request.products
-        )
+        result = await generate()
         return {"success": True, "data": result}
     except Exception as e:
-        print(f"Error generating product performance: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Product performance generation failed: {str(e)}")
+        raise _generation_error(e, "Product performance generation")
 
 
 @router.post("/generate-marketing-campaigns")
@@ -249,14 +525,70 @@ async def generate_marketing_campaigns(request: MarketingCampaignRequest):
             detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
         )
     
+    generate = functools.partial(
+        groq_service.generate_marketing_campaigns,
+        product_name=request.product_name,
+        product_description=request.product_description or "",
+        target_markets=request.target_markets
+    )
+    if request.priority == "deferred":
+        return await _defer("marketing_campaigns", generate)
+    
     try:
-        result = await groq_service.generate_marketing_campaigns(
-            product_name=request.product_name,
-            product_description=request.product_description or "",
-            target_markets=request.target_markets
-        )
+        result = await generate()
         return {"success": True, "data": result}
     except Exception as e:
-        print(f"Error generating marketing campaigns: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Marketing campaign generation failed: {str(e)}")
+        raise _generation_error(e, "Marketing campaign generation")
 
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Response cache hit/miss counters per endpoint namespace, plus request coalescing counters"""
+    if not groq_service:
+        raise HTTPException(
+            status_code=500,
+            detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
+        )
+    
+    return {
+        "success": True,
+        "data": {**groq_service.response_cache.stats(), "single_flight": groq_service.single_flight.stats()}
+    }
+
+
+@router.get("/rate-limits")
+async def get_rate_limits():
+    """Per-model request/token budgets and rate-limiter queue-wait metrics"""
+    if not groq_service:
+        raise HTTPException(
+            status_code=500,
+            detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
+        )
+    
+    return {"success": True, "data": groq_service.rate_limiter.stats()}
+
+
+@router.get("/model-health")
+async def get_model_health():
+    """Per-model circuit breaker state and adaptive concurrency limit"""
+    if not groq_service:
+        raise HTTPException(
+            status_code=500,
+            detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
+        )
+    
+    return {"success": True, "data": groq_service.model_guard.stats()}
+
+
+@router.get("/deferred-stats")
+async def get_deferred_stats():
+    """Deferred-priority buffer size, batches in flight and request counters"""
+    if not groq_service:
+        raise HTTPException(
+            status_code=500,
+            detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
+        )
+    
+    batcher = groq_service.deferred_batcher
+    return {"success": True, "data": batcher.stats() if batcher else {"enabled": False}}
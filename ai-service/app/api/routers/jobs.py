@@ -0,0 +1,108 @@
+"""
+BOM Jobs Router
+Submit BOM generation as a background job and poll for its status and result
+"""
+from fastapi import APIRouter, File, UploadFile, HTTPException, Header
+from typing import List, Optional
+
+from app.api.routers.inference import _read_images
+from app.services.job_queue import BOMJobQueue, QueueFullError
+from app.services.job_store import SUCCEEDED, FAILED
+
+router = APIRouter(prefix="/api/v1/ai/jobs", tags=["Jobs"])
+
+# Global job queue
+job_queue: Optional[BOMJobQueue] = None
+
+
+def set_job_queue(queue: BOMJobQueue):
+    """Set global job queue (called during app startup)"""
+    global job_queue
+    job_queue = queue
+
+
+def _require_queue() -> BOMJobQueue:
+    if not job_queue:
+        raise HTTPException(
+            status_code=500,
+            detail="AI service not initialized. Please set GROQ_API_KEY environment variable."
+        )
+    return job_queue
+
+
+def _job_status(job: dict) -> dict:
+    """Public view of a job record (without the result payload)"""
+    return {
+        "job_id": job["job_id"],
+        "kind": job.get("kind", "bom"),
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "progress": job.get("progress", {}),
+        "error": job.get("error")
+    }
+
+
+@router.post("/bom", status_code=202)
+async def submit_bom_job(
+    images: List[UploadFile] = File(...),
+    description: Optional[str] = None,
+    yield_buffer: float = 10.0,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Queue BOM generation and return a job ID immediately
+
+    Send an `Idempotency-Key` header to make retries safe: resubmitting the
+    same key returns the original job instead of starting a new pipeline.
+    """
+    queue = _require_queue()
+
+    if not images:
+        raise HTTPException(status_code=400, detail="At least one image is required")
+
+    image_data = await _read_images(images)
+
+    try:
+        job = await queue.submit(
+            images=image_data,
+            description=description or "",
+            yield_buffer=yield_buffer,
+            idempotency_key=idempotency_key
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"success": True, "data": _job_status(job)}
+
+
+@router.get("/{job_id}")
+async def get_bom_job(job_id: str):
+    """Job status and per-stage progress"""
+    job = await _require_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    return {"success": True, "data": _job_status(job)}
+
+
+@router.get("/{job_id}/result")
+async def get_bom_job_result(job_id: str):
+    """
+    Finished job's BOMResponse payload
+
+    Returns 409 while the job is still queued or running, and the job's
+    original error status (429/500, or 503 if the model's circuit was open) if it failed.
+    """
+    job = await _require_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    if job["status"] == FAILED:
+        error = job.get("error") or {}
+        raise HTTPException(status_code=error.get("status_code", 500), detail=error.get("detail", "BOM generation failed"))
+
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+
+    return {"success": True, "data": job["result"]}
@@ -0,0 +1,14 @@
+"""
+Metrics Router
+Prometheus scrape endpoint
+"""
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
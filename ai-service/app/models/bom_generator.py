@@ -2,9 +2,10 @@
 BOM Generator - Core AI logic for generating Bill of Materials
 Now using LangGraph agents with Groq API (free tier)
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.services.groq_service import GroqService
-from app.agents.orchestrator import AnalysisOrchestrator
+from app.agents.orchestrator import AnalysisOrchestrator, StageCallback
+from app.agents.material_analyzer import MaterialItemCallback
 
 
 class BOMGenerator:
@@ -12,15 +13,18 @@ class BOMGenerator:
     Main BOM generation orchestrator using LangGraph agents
     """
     
-    def __init__(self):
-        self.groq_service = GroqService()
+    def __init__(self, groq_service: Optional[GroqService] = None):
+        # Share the caller's GroqService (and its connection pool) when given
+        self.groq_service = groq_service or GroqService()
         self.orchestrator = AnalysisOrchestrator(self.groq_service)
     
     async def generate(
         self,
         images: List[Dict[str, Any]],
         description: str = "",
-        yield_buffer: float = 10.0
+        yield_buffer: float = 10.0,
+        on_stage_complete: Optional[StageCallback] = None,
+        on_material_item: Optional[MaterialItemCallback] = None
     ) -> Dict[str, Any]:
         """
         Generate multi-level BOM from images and description using LangGraph agents
@@ -29,18 +33,23 @@ class BOMGenerator:
             images: List of image data dictionaries
             description: Textual product description
             yield_buffer: Percentage buffer for material waste (default 10%)
+            on_stage_complete: Optional callback for per-stage progress (partial BOMs)
+            on_material_item: Optional callback for material items as they are generated
         
         Returns:
-            Dictionary containing BOM structure and confidence score
+            Dictionary containing BOM structure, confidence score and per-stage timings
         """
         # Use the orchestrator with all specialized agents
         result = await self.orchestrator.analyze_product(
             images=images,
             description=description,
-            yield_buffer=yield_buffer
+            yield_buffer=yield_buffer,
+            on_stage_complete=on_stage_complete,
+            on_material_item=on_material_item
         )
         
         return {
             "bom": result["bom"],
-            "confidence": result.get("confidence", 0.8)
+            "confidence": result.get("confidence", 0.8),
+            "stage_timings": result.get("stage_timings", {})
         }
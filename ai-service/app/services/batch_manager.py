@@ -0,0 +1,387 @@
+"""
+Batch Manager - Tracks submitted Groq batches and polls them from one background task
+Status is served from the registry; completion fires handlers and HTTP callbacks
+"""
+import asyncio
+import inspect
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import httpx
+
+
+# Batch states after which no more results will arrive
+TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+# Record fields copied from the Groq batch object
+_BATCH_FIELDS = (
+    "status", "endpoint", "input_file_id", "completion_window", "output_file_id", "error_file_id",
+    "created_at", "expires_at", "completed_at", "request_counts", "errors"
+)
+
+BatchHandler = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+
+def _plain(value: Any) -> Any:
+    """SDK models (request_counts, errors) as plain dicts"""
+    return value.model_dump() if hasattr(value, "model_dump") else value
+
+
+class BatchManager:
+    """
+    Registry of submitted batches with a single adaptive poller
+
+    Every tracked batch has its own poll interval: it starts at
+    `min_interval`, grows by `backoff` each time a poll shows no progress
+    (up to `max_interval`) and drops back to `min_interval` as soon as the
+    status or request counts move. One background task polls whichever
+    batches are due, so polling cost grows with activity rather than with
+    the number of callers asking for status.
+
+    When a batch reaches a terminal state its record is passed to the
+    batch's own `on_complete` handler, every handler added with
+    `add_handler`, and POSTed to its `callback_url` if one was given.
+    """
+
+    def __init__(
+        self,
+        batch_service: Any,
+        min_interval: float = 5.0,
+        max_interval: float = 300.0,
+        backoff: float = 2.0,
+        callback_retries: int = 3,
+        callback_timeout: float = 10.0,
+        retention: float = 86400.0,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        """
+        Args:
+            batch_service: BatchService used to submit and poll batches
+            min_interval: Seconds between polls of a batch that is making progress
+            max_interval: Upper bound on the interval of an idle batch
+            backoff: Interval multiplier applied after a poll with no progress
+            callback_retries: Attempts per HTTP callback before giving up
+            callback_timeout: Seconds before an HTTP callback attempt times out
+            retention: Seconds a finished batch stays in the registry
+            http_client: Client for HTTP callbacks (created on first use if omitted)
+        """
+        self.batch_service = batch_service
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.callback_retries = callback_retries
+        self.callback_timeout = callback_timeout
+        self.retention = retention
+
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._watch: Dict[str, Dict[str, Any]] = {}
+        self._handlers: List[BatchHandler] = []
+        self._callbacks: set = set()
+        self._wakeup = asyncio.Event()
+        self._poller: Optional[asyncio.Task] = None
+        self._http = http_client
+        self._owns_http = http_client is None
+        self._stats = {"polls": 0, "poll_errors": 0, "completed": 0, "callbacks_sent": 0, "callbacks_failed": 0}
+
+    @classmethod
+    def from_env(cls, batch_service: Any) -> "BatchManager":
+        """Create a manager configured from BATCH_* environment variables"""
+        return cls(
+            batch_service,
+            min_interval=float(os.getenv("BATCH_POLL_MIN_INTERVAL", "5")),
+            max_interval=float(os.getenv("BATCH_POLL_MAX_INTERVAL", "300")),
+            backoff=float(os.getenv("BATCH_POLL_BACKOFF", "2")),
+            callback_retries=int(os.getenv("BATCH_CALLBACK_RETRIES", "3")),
+            retention=float(os.getenv("BATCH_RETENTION", "86400"))
+        )
+
+    async def start(self) -> None:
+        """Start the background poller"""
+        if self._poller is None:
+            self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        """Stop polling, cancel pending callbacks and fail anyone waiting on a batch"""
+        tasks = [task for task in [self._poller, *self._callbacks] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for watch in self._watch.values():
+            for waiter in watch["waiters"]:
+                if not waiter.done():
+                    waiter.set_exception(RuntimeError("Batch manager stopped"))
+        self._poller, self._callbacks, self._watch = None, set(), {}
+        if self._http is not None and self._owns_http:
+            await self._http.aclose()
+            self._http = None
+
+    def add_handler(self, handler: BatchHandler) -> None:
+        """Call `handler(record)` whenever any tracked batch finishes"""
+        self._handlers.append(handler)
+
+    async def submit(
+        self,
+        requests: List[Dict[str, Any]],
+        endpoint: str = "/v1/chat/completions",
+        completion_window: str = "24h",
+        callback_url: Optional[str] = None,
+        on_complete: Optional[BatchHandler] = None
+    ) -> Dict[str, Any]:
+        """
+        Upload requests as a JSONL buffer, create the batch and start tracking it
+
+        Args:
+            requests: Batch request dictionaries (custom_id, method, url, body)
+            endpoint: API endpoint
+            completion_window: Processing window ("24h" to "7d")
+            callback_url: Optional URL POSTed the batch record when it finishes
+            on_complete: Optional handler called with the record when it finishes
+
+        Returns:
+            Registry record of the new batch
+        """
+        buffer = await asyncio.to_thread(self.batch_service.serialize_batch_requests, requests)
+        try:
+            file_obj = await self.batch_service.upload_batch_file_async(buffer)
+        finally:
+            buffer.close()
+        batch = await self.batch_service.create_batch_job_async(
+            input_file_id=file_obj.id,
+            endpoint=endpoint,
+            completion_window=completion_window
+        )
+        return self.track(batch, callback_url=callback_url, on_complete=on_complete)
+
+    def track(
+        self,
+        batch: Any,
+        callback_url: Optional[str] = None,
+        on_complete: Optional[BatchHandler] = None
+    ) -> Dict[str, Any]:
+        """
+        Register a batch object returned by the Batches API
+
+        Args:
+            batch: Batch object (from create or retrieve)
+            callback_url: Optional URL POSTed the batch record when it finishes
+            on_complete: Optional handler called with the record when it finishes
+
+        Returns:
+            Registry record of the batch
+        """
+        now = time.time()
+        record = self._records.setdefault(batch.id, {"batch_id": batch.id, "tracked_at": now})
+        self._update(record, batch, now)
+        if callback_url:
+            record["callback_url"] = callback_url
+
+        watch = self._watch.get(batch.id)
+        if record["status"] not in TERMINAL_STATES and watch is None:
+            watch = self._watch[batch.id] = {
+                "interval": self.min_interval, "next_poll": now + self.min_interval, "handlers": [], "waiters": []
+            }
+            self._wakeup.set()
+        if on_complete:
+            if watch is not None:
+                watch["handlers"].append(on_complete)
+            else:
+                self._spawn(self._call(on_complete, record))
+        if record["status"] in TERMINAL_STATES and callback_url:
+            self._spawn(self._send_callback(record))
+        return record
+
+    async def get_status(self, batch_id: str, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Status of a batch, answered from the registry
+
+        A batch the manager has not seen yet (or `refresh=True`) is retrieved
+        from Groq once and tracked from then on.
+
+        Args:
+            batch_id: Batch job ID
+            refresh: Retrieve from Groq even when the batch is cached
+
+        Returns:
+            Registry record of the batch
+        """
+        record = self._records.get(batch_id)
+        if record is not None and not refresh:
+            return record
+        batch = await self.batch_service.get_batch_status_async(batch_id)
+        if record is not None and batch_id in self._watch:
+            await self._apply(batch_id, batch)
+            return record
+        return self.track(batch)
+
+    async def wait(self, batch_id: str) -> Dict[str, Any]:
+        """Wait until a tracked batch reaches a terminal state and return its record"""
+        record = self._records.get(batch_id)
+        if record is None:
+            raise KeyError(f"Batch {batch_id} is not tracked")
+        watch = self._watch.get(batch_id)
+        if watch is None:
+            return record
+        waiter = asyncio.get_running_loop().create_future()
+        watch["waiters"].append(waiter)
+        return await waiter
+
+    async def process_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        endpoint: str = "/v1/chat/completions",
+        completion_window: str = "24h",
+        max_wait_time: float = 300.0
+    ) -> Dict[str, Any]:
+        """
+        Submit a batch and wait for its results
+
+        Args:
+            requests: List of batch request dictionaries
+            endpoint: API endpoint
+            completion_window: Processing window
+            max_wait_time: Maximum time to wait in seconds
+
+        Returns:
+            Dictionary with batch_id, status, results, errors
+        """
+        record = await self.submit(requests, endpoint=endpoint, completion_window=completion_window)
+        batch_id = record["batch_id"]
+        try:
+            record = await asyncio.wait_for(self.wait(batch_id), timeout=max_wait_time)
+        except asyncio.TimeoutError:
+            return {
+                "batch_id": batch_id,
+                "status": "timeout",
+                "results": [],
+                "errors": [{"message": f"Batch processing exceeded max wait time of {max_wait_time}s"}],
+                "request_counts": {}
+            }
+
+        results, errors = [], []
+        if record["status"] == "completed":
+            if record.get("output_file_id"):
+                results = await self.batch_service.get_batch_results_async(record["output_file_id"])
+            if record.get("error_file_id"):
+                errors = await self.batch_service.get_batch_results_async(record["error_file_id"])
+        else:
+            errors = record.get("errors") or []
+        return {
+            "batch_id": batch_id,
+            "status": record["status"],
+            "results": results,
+            "errors": errors,
+            "request_counts": record.get("request_counts") or {}
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Every batch in the registry, newest first"""
+        return sorted(self._records.values(), key=lambda record: record["tracked_at"], reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry size, batches being polled and lifetime counters"""
+        return {"tracked": len(self._records), "polling": len(self._watch), **self._stats}
+
+    def _update(self, record: Dict[str, Any], batch: Any, now: float) -> None:
+        for field in _BATCH_FIELDS:
+            record[field] = _plain(getattr(batch, field, None))
+        record["last_polled_at"] = now
+
+    async def _poll_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            due = [batch_id for batch_id, watch in self._watch.items() if watch["next_poll"] <= now]
+            if due:
+                await asyncio.gather(*[self._poll(batch_id) for batch_id in due])
+            self._prune(time.time())
+
+            if self._watch:
+                delay = max(0.0, min(watch["next_poll"] for watch in self._watch.values()) - time.time())
+            else:
+                delay = None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, batch_id: str) -> None:
+        watch = self._watch[batch_id]
+        self._stats["polls"] += 1
+        try:
+            batch = await self.batch_service.get_batch_status_async(batch_id)
+        except Exception as e:
+            self._stats["poll_errors"] += 1
+            print(f"⚠️  Polling batch {batch_id} failed: {str(e)}")
+            watch["interval"] = min(self.max_interval, watch["interval"] * self.backoff)
+            watch["next_poll"] = time.time() + watch["interval"]
+            return
+        await self._apply(batch_id, batch)
+
+    async def _apply(self, batch_id: str, batch: Any) -> None:
+        """Fold a fresh batch object into the registry and reschedule or finish it"""
+        record = self._records[batch_id]
+        watch = self._watch.get(batch_id)
+        before = (record["status"], record["request_counts"])
+        now = time.time()
+        self._update(record, batch, now)
+        if watch is None:
+            return
+
+        if record["status"] in TERMINAL_STATES:
+            del self._watch[batch_id]
+            self._stats["completed"] += 1
+            print(f"✅ Batch {batch_id} {record['status']} after {now - record['tracked_at']:.0f}s")
+            for handler in [*watch["handlers"], *self._handlers]:
+                await self._call(handler, record)
+            if record.get("callback_url"):
+                self._spawn(self._send_callback(record))
+            for waiter in watch["waiters"]:
+                if not waiter.done():
+                    waiter.set_result(record)
+            return
+
+        progressed = (record["status"], record["request_counts"]) != before
+        if progressed or record["status"] == "finalizing":
+            watch["interval"] = self.min_interval
+        else:
+            watch["interval"] = min(self.max_interval, watch["interval"] * self.backoff)
+        watch["next_poll"] = now + watch["interval"]
+
+    async def _call(self, handler: BatchHandler, record: Dict[str, Any]) -> None:
+        try:
+            result = handler(record)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"⚠️  Batch completion handler failed for {record['batch_id']}: {str(e)}")
+
+    async def _send_callback(self, record: Dict[str, Any]) -> None:
+        """POST the finished batch record to its callback URL, retrying with backoff"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.callback_timeout)
+        payload = {"event": f"batch.{record['status']}", "batch": record}
+        for attempt in range(self.callback_retries):
+            try:
+                response = await self._http.post(record["callback_url"], json=payload)
+                response.raise_for_status()
+                self._stats["callbacks_sent"] += 1
+                return
+            except Exception as e:
+                print(f"⚠️  Batch callback to {record['callback_url']} failed (attempt {attempt + 1}): {str(e)}")
+                if attempt + 1 < self.callback_retries:
+                    await asyncio.sleep(2 ** attempt)
+        self._stats["callbacks_failed"] += 1
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.create_task(coro)
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            batch_id for batch_id, record in self._records.items()
+            if batch_id not in self._watch and now - record["last_polled_at"] > self.retention
+        ]
+        for batch_id in expired:
+            del self._records[batch_id]
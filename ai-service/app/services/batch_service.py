@@ -3,16 +3,61 @@ Groq Batch API Service
 Handles batch processing for cost-efficient bulk operations
 50% cost discount, higher rate limits, 24h-7d processing window
 """
+import io
 import os
 import json
-import time
-from typing import List, Dict, Any, Optional
-from groq import Groq
+import tempfile
+from typing import List, Dict, Any, AsyncIterator, BinaryIO, Iterable, Iterator, Optional, Union
+from groq import Groq, AsyncGroq
+
+
+# Requests serialized per write when building a batch file
+_SERIALIZE_CHUNK = 1000
+
+# Compact separators: batch files are uploaded, never read by people
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def _jsonl_chunks(requests: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode requests as JSONL, a chunk of lines at a time"""
+    for start in range(0, len(requests), _SERIALIZE_CHUNK):
+        chunk = requests[start:start + _SERIALIZE_CHUNK]
+        yield "".join([_encode(req) + "\n" for req in chunk]).encode("utf-8")
+
+
+def _parse(line: str, wanted: Optional[set]) -> Optional[Dict[str, Any]]:
+    """Parse one JSONL result line; None for blank lines and filtered-out custom IDs"""
+    if not line.strip():
+        return None
+    result = json.loads(line)
+    if wanted is not None and result.get("custom_id") not in wanted:
+        return None
+    return result
+
+
+def _select(lines: Iterable[str], wanted: Optional[set], offset: int, limit: Optional[int]) -> Iterator[Dict[str, Any]]:
+    """Apply the custom_id filter and offset/limit window to result lines"""
+    if limit == 0:
+        return
+    matched = 0
+    for line in lines:
+        result = _parse(line, wanted)
+        if result is None:
+            continue
+        matched += 1
+        if matched <= offset:
+            continue
+        yield result
+        if limit is not None and matched - offset >= limit:
+            return
 
 
 class BatchService:
     """
     Service for managing Groq Batch API operations
+    
+    The `*_async` methods use AsyncGroq and are the ones to call from async
+    code; the synchronous ones block on the SDK call.
     """
     
     def __init__(self):
@@ -21,42 +66,67 @@ class BatchService:
             raise ValueError("GROQ_API_KEY environment variable is required")
         
         self.client = Groq(api_key=api_key)
+        self.async_client = AsyncGroq(api_key=api_key)
         self.base_url = "https://api.groq.com/openai/v1"
+        # Batch files larger than this spill from memory to an unnamed temp file
+        self.spool_threshold = int(os.getenv("BATCH_SPOOL_THRESHOLD_BYTES", str(16 * 1024 * 1024)))
     
-    def create_batch_file(self, requests: List[Dict[str, Any]], file_path: str = None) -> str:
+    def serialize_batch_requests(self, requests: List[Dict[str, Any]]) -> BinaryIO:
         """
-        Create a JSONL batch file from a list of requests
+        Serialize requests into an upload-ready JSONL buffer
+        
+        The buffer lives in memory until it passes `spool_threshold` bytes,
+        then moves to a `tempfile.TemporaryFile`, which has no directory entry
+        (or is unlinked at creation) and disappears when closed, so nothing
+        is ever left behind in the temp dir. The caller closes the buffer.
         
         Args:
             requests: List of request dictionaries with custom_id, method, url, body
-            file_path: Optional path to save the file (if None, creates temp file)
         
         Returns:
-            Path to the created JSONL file
+            Binary file object positioned at the start
+        """
+        buffer: BinaryIO = io.BytesIO()
+        for chunk in _jsonl_chunks(requests):
+            buffer.write(chunk)
+            if isinstance(buffer, io.BytesIO) and buffer.tell() > self.spool_threshold:
+                spilled = tempfile.TemporaryFile()
+                spilled.write(buffer.getbuffer())
+                buffer.close()
+                buffer = spilled
+        buffer.seek(0)
+        return buffer
+    
+    def create_batch_file(self, requests: List[Dict[str, Any]], file_path: str) -> str:
         """
-        import tempfile
+        Write a JSONL batch file to disk (uploads use serialize_batch_requests)
         
-        if file_path is None:
-            fd, file_path = tempfile.mkstemp(suffix='.jsonl', prefix='batch_')
-            os.close(fd)
+        Args:
+            requests: List of request dictionaries with custom_id, method, url, body
+            file_path: Path to save the file
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            for req in requests:
-                f.write(json.dumps(req) + '\n')
+        Returns:
+            Path to the created JSONL file
+        """
+        with open(file_path, 'wb') as f:
+            for chunk in _jsonl_chunks(requests):
+                f.write(chunk)
         
         return file_path
     
-    def upload_batch_file(self, file_path: str) -> Dict[str, Any]:
+    def upload_batch_file(self, file: Union[str, BinaryIO]) -> Dict[str, Any]:
         """
         Upload a batch file to Groq Files API
         
         Args:
-            file_path: Path to the JSONL file
+            file: Path to a JSONL file, or a buffer from serialize_batch_requests
         
         Returns:
             File object with id, bytes, created_at, etc.
         """
-        with open(file_path, 'rb') as f:
+        if not isinstance(file, str):
+            return self.client.files.create(file=("batch.jsonl", file), purpose="batch")
+        with open(file, 'rb') as f:
             response = self.client.files.create(
                 file=f,
                 purpose="batch"
@@ -110,25 +180,41 @@ class BatchService:
         Returns:
             List of result dictionaries
         """
-        response = self.client.files.content(output_file_id)
+        return list(self.iter_batch_results(output_file_id))
+    
+    def iter_batch_results(
+        self,
+        output_file_id: str,
+        custom_ids: Optional[Iterable[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream results from a batch output/error file one line at a time
         
-        # Read the JSONL content
-        content = response.read()
-        if isinstance(content, bytes):
-            content = content.decode('utf-8')
+        Only the line being parsed is held in memory, and the download stops
+        as soon as `limit` results have been yielded.
         
-        results = []
-        for line in content.strip().split('\n'):
-            if line:
-                results.append(json.loads(line))
+        Args:
+            output_file_id: Output (or error) file ID from batch status
+            custom_ids: Only yield results with one of these custom IDs
+            offset: Matching results to skip before yielding
+            limit: Maximum number of results to yield
         
-        return results
+        Yields:
+            Result dictionaries in file order
+        """
+        wanted = set(custom_ids) if custom_ids else None
+        with self.client.files.with_streaming_response.content(output_file_id) as response:
+            for result in _select(response.iter_lines(), wanted, offset, limit):
+                yield result
     
     def create_chat_completion_batch_requests(
         self,
         messages_list: List[List[Dict[str, str]]],
         model: str = "llama-3.3-70b-versatile",
-        custom_ids: Optional[List[str]] = None
+        custom_ids: Optional[List[str]] = None,
+        params_list: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict[str, Any]]:
         """
         Create batch request format for chat completions
@@ -137,6 +223,8 @@ class BatchService:
             messages_list: List of message arrays (one per request)
             model: Model to use
             custom_ids: Optional list of custom IDs (auto-generated if not provided)
+            params_list: Optional per-request body parameters (temperature,
+                max_completion_tokens, response_format, ...) merged into each body
         
         Returns:
             List of batch request dictionaries
@@ -145,100 +233,77 @@ class BatchService:
         for i, messages in enumerate(messages_list):
             custom_id = custom_ids[i] if custom_ids and i < len(custom_ids) else f"request-{i+1}"
             
+            body = {
+                "model": model,
+                "messages": messages,
+                "response_format": {"type": "json_object"}
+            }
+            if params_list and i < len(params_list):
+                body.update({key: value for key, value in params_list[i].items() if value is not None})
+            
             requests.append({
                 "custom_id": custom_id,
                 "method": "POST",
                 "url": "/v1/chat/completions",
-                "body": {
-                    "model": model,
-                    "messages": messages,
-                    "response_format": {"type": "json_object"}
-                }
+                "body": body
             })
         
         return requests
     
-    def process_batch_sync(
-        self,
-        requests: List[Dict[str, Any]],
-        endpoint: str = "/v1/chat/completions",
-        completion_window: str = "24h",
-        poll_interval: int = 5,
-        max_wait_time: int = 300
-    ) -> Dict[str, Any]:
+    async def upload_batch_file_async(self, file: BinaryIO) -> Dict[str, Any]:
         """
-        Process a batch synchronously (wait for completion)
-        
-        Args:
-            requests: List of batch request dictionaries
-            endpoint: API endpoint
-            completion_window: Processing window
-            poll_interval: Seconds between status checks
-            max_wait_time: Maximum time to wait in seconds
+        Upload a buffer from serialize_batch_requests without blocking the event loop
         
-        Returns:
-            Dictionary with batch_id, status, results, errors
+        The buffer is streamed to the request body in chunks rather than read
+        into one bytes object first.
         """
-        # Create and upload batch file
-        file_path = self.create_batch_file(requests)
-        try:
-            file_obj = self.upload_batch_file(file_path)
-            input_file_id = file_obj.id
-            
-            # Create batch job
-            batch = self.create_batch_job(
-                input_file_id=input_file_id,
-                endpoint=endpoint,
-                completion_window=completion_window
-            )
-            batch_id = batch.id
-            
-            # Poll for completion
-            start_time = time.time()
-            while time.time() - start_time < max_wait_time:
-                status = self.get_batch_status(batch_id)
-                
-                if status.status == "completed":
-                    results = []
-                    errors = []
-                    
-                    if status.output_file_id:
-                        results = self.get_batch_results(status.output_file_id)
-                    
-                    if status.error_file_id:
-                        errors = self.get_batch_results(status.error_file_id)
-                    
-                    return {
-                        "batch_id": batch_id,
-                        "status": "completed",
-                        "results": results,
-                        "errors": errors,
-                        "request_counts": status.request_counts
-                    }
-                
-                elif status.status in ["failed", "expired", "cancelled"]:
-                    return {
-                        "batch_id": batch_id,
-                        "status": status.status,
-                        "results": [],
-                        "errors": status.errors or [],
-                        "request_counts": status.request_counts
-                    }
-                
-                # Wait before next poll
-                time.sleep(poll_interval)
-            
-            # Timeout
-            return {
-                "batch_id": batch_id,
-                "status": "timeout",
-                "results": [],
-                "errors": [{"message": f"Batch processing exceeded max wait time of {max_wait_time}s"}],
-                "request_counts": {}
-            }
-        
-        finally:
-            # Clean up temp file
-            if os.path.exists(file_path):
-                os.remove(file_path)
-
+        return await self.async_client.files.create(file=("batch.jsonl", file), purpose="batch")
+    
+    async def create_batch_job_async(
+        self,
+        input_file_id: str,
+        endpoint: str = "/v1/chat/completions",
+        completion_window: str = "24h"
+    ) -> Dict[str, Any]:
+        """Create a batch job from an uploaded file without blocking the event loop"""
+        return await self.async_client.batches.create(
+            input_file_id=input_file_id,
+            endpoint=endpoint,
+            completion_window=completion_window
+        )
+    
+    async def get_batch_status_async(self, batch_id: str) -> Dict[str, Any]:
+        """Get the status of a batch job without blocking the event loop"""
+        return await self.async_client.batches.retrieve(batch_id)
+    
+    async def get_batch_results_async(self, output_file_id: str) -> List[Dict[str, Any]]:
+        """Retrieve results from a completed batch job without blocking the event loop"""
+        return [result async for result in self.iter_batch_results_async(output_file_id)]
+    
+    async def iter_batch_results_async(
+        self,
+        output_file_id: str,
+        custom_ids: Optional[Iterable[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of iter_batch_results (same arguments, same bounded memory)"""
+        wanted = set(custom_ids) if custom_ids else None
+        if limit == 0:
+            return
+        matched = 0
+        async with self.async_client.files.with_streaming_response.content(output_file_id) as response:
+            async for line in response.iter_lines():
+                result = _parse(line, wanted)
+                if result is None:
+                    continue
+                matched += 1
+                if matched <= offset:
+                    continue
+                yield result
+                if limit is not None and matched - offset >= limit:
+                    return
+    
+    async def aclose(self) -> None:
+        """Close the async client and release pooled connections"""
+        await self.async_client.close()
@@ -0,0 +1,397 @@
+"""
+Circuit Breaker - Per-model circuit breakers and adaptive concurrency limits for Groq calls
+Breakers fail calls fast while a model is degraded; AIMD limits follow observed latency and errors
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import groq
+
+from app.services import metrics
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Outcomes of one upstream call
+OK = "ok"                # answered (including 4xx client errors: the upstream is up)
+FAILURE = "failure"      # 5xx, timeout or connection error
+OVERLOAD = "overload"    # 429 from Groq: back off concurrency, but the model is up
+
+# Latency is compared per completion token, with this floor so short answers
+# (dominated by time-to-first-token) are not judged as slow
+LATENCY_TOKEN_FLOOR = 64
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit is open"""
+
+    def __init__(self, model: str, retry_after: float):
+        self.model = model
+        self.retry_after = retry_after
+        super().__init__(
+            f"Groq model {model} is unavailable (circuit open after repeated upstream failures); "
+            f"retry in {retry_after:.0f}s"
+        )
+
+
+def find_circuit_open(error: BaseException) -> Optional[CircuitOpenError]:
+    """Return the CircuitOpenError behind `error` (itself or a cause), if any"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, CircuitOpenError):
+            return error
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def classify(error: BaseException) -> str:
+    """Map an exception from the Groq client to a call outcome"""
+    if isinstance(error, groq.RateLimitError):
+        return OVERLOAD
+    if isinstance(error, (groq.APIConnectionError, groq.InternalServerError, asyncio.TimeoutError)):
+        return FAILURE
+    if isinstance(error, groq.APIStatusError):
+        return FAILURE if error.status_code >= 500 else OK
+    return OK
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one model
+
+    Closed: calls pass and outcomes land in a sliding window. The breaker
+    opens when `consecutive_failures` calls fail in a row, or when at least
+    `min_calls` calls in the last `window` seconds fail at `failure_ratio`
+    or worse. 429s are left out of the window: they are the limiter's signal.
+    Open: calls raise CircuitOpenError until `open_seconds` have passed.
+    Half-open: up to `half_open_probes` calls go through; a success closes
+    the breaker, a failure re-opens it for twice as long (up to
+    `max_open_seconds`).
+    """
+
+    def __init__(
+        self,
+        model: str,
+        failure_ratio: float = 0.5,
+        min_calls: int = 10,
+        consecutive_failures: int = 5,
+        window: float = 30.0,
+        open_seconds: float = 15.0,
+        max_open_seconds: float = 120.0,
+        half_open_probes: int = 1
+    ):
+        self.model = model
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.consecutive_failures = consecutive_failures
+        self.window = window
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self._outcomes: deque = deque()
+        self._streak = 0
+        self._opened_at = 0.0
+        self._open_for = open_seconds
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+
+    def retry_after(self, now: Optional[float] = None) -> float:
+        """Seconds until an open breaker lets a probe through"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._opened_at + self._open_for - now)
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if a call would be rejected right now"""
+        if self.state == OPEN and self.retry_after() > 0:
+            self.rejected += 1
+            raise CircuitOpenError(self.model, self.retry_after())
+        if self.state == HALF_OPEN and self._probes >= self.half_open_probes:
+            self.rejected += 1
+            raise CircuitOpenError(self.model, self._open_for)
+
+    def before_call(self) -> None:
+        """Admit one call (taking a probe slot when half-open)"""
+        self.check()
+        if self.state == OPEN:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            self._probes += 1
+
+    def record(self, outcome: Optional[str]) -> None:
+        """Record the outcome of an admitted call (None: cancelled, no verdict)"""
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if outcome is None:
+                return
+            if outcome == FAILURE:
+                self._open(now, min(self.max_open_seconds, self._open_for * 2))
+            else:
+                self._outcomes.clear()
+                self._streak = 0
+                self._open_for = self.open_seconds
+                self._transition(CLOSED)
+            return
+        if self.state == OPEN or outcome in (None, OVERLOAD):
+            # Cancelled, rate-limited (says nothing about health), or admitted before the breaker opened
+            return
+
+        failed = outcome == FAILURE
+        self._streak = self._streak + 1 if failed else 0
+        self._outcomes.append((now, failed))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        failures = sum(1 for _, bad in self._outcomes if bad)
+        if self._streak >= self.consecutive_failures or (
+            len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_ratio
+        ):
+            self._open(now, self.open_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        failures = sum(1 for _, bad in self._outcomes if bad)
+        return {
+            "state": self.state,
+            "retry_after": round(self.retry_after(), 1) if self.state == OPEN else 0.0,
+            "window_calls": len(self._outcomes),
+            "window_failures": failures,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
+
+    def _open(self, now: float, duration: float) -> None:
+        self._opened_at = now
+        self._open_for = duration
+        self._probes = 0
+        self.opened += 1
+        self._transition(OPEN)
+        print(f"🔌 Circuit for {self.model} opened for {duration:.0f}s")
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            metrics.set_circuit_state(self.model, state)
+            if state == CLOSED:
+                print(f"✅ Circuit for {self.model} closed")
+
+
+class ConcurrencyLimiter:
+    """
+    AIMD concurrency limit for one model
+
+    Until the first backoff each successful call raises the limit by 1
+    (slow start: it doubles per round of `limit` calls); after that by
+    1/limit, i.e. about +1 per round. Failures, 429s and calls slower than `tolerance`
+    times the baseline cut it by `backoff`, at most once per `cooldown`
+    seconds so one burst of errors counts as one signal. Latency is
+    measured per completion token (see LATENCY_TOKEN_FLOOR) against a
+    baseline that tracks the fastest recent calls and drifts up 1% per
+    call, so it follows a model that becomes permanently slower. Callers
+    over the limit wait for a slot.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        initial: int = 32,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        cooldown: float = 1.0
+    ):
+        self.model = model
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._slow_start = True
+        self._waiters: deque = deque()
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we were cancelled: pass it on
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: float, outcome: Optional[str], tokens: Optional[int] = None) -> None:
+        """
+        Free a slot and adjust the limit
+
+        Args:
+            latency: Seconds the call took
+            outcome: OK, FAILURE, OVERLOAD, or None for a cancelled call (no adjustment)
+            tokens: Completion tokens, when known, for the latency comparison
+        """
+        self.in_flight -= 1
+        if outcome == OK:
+            slow = False
+            if tokens is not None:
+                sample = latency / max(tokens, LATENCY_TOKEN_FLOOR)
+                self.baseline = sample if self.baseline is None else min(sample, self.baseline * 1.01)
+                slow = sample > self.baseline * self.tolerance
+            if slow:
+                self._decrease()
+            else:
+                self.limit = min(self.max_limit, self.limit + (1 if self._slow_start else 1 / self.limit))
+        elif outcome is not None:
+            self._decrease()
+        metrics.set_concurrency_limit(self.model, int(self.limit))
+        self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "baseline_seconds_per_token": round(self.baseline, 5) if self.baseline is not None else None
+        }
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class GuardedCall:
+    """Handle for one guarded call; set `tokens` to the completion token count"""
+
+    def __init__(self):
+        self.tokens: Optional[int] = None
+
+
+class ModelGuard:
+    """
+    Circuit breaker plus concurrency limiter for every model called through GroqService
+
+    `check(model)` fails fast before a call queues anywhere; `guard(model)`
+    wraps the upstream request itself, admitting it through the breaker and
+    limiter and recording its latency and outcome on exit. The caller may
+    set `tokens` on the yielded GuardedCall to the completion token count.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        breaker_options: Optional[Dict[str, Any]] = None,
+        limiter_options: Optional[Dict[str, Any]] = None
+    ):
+        self.enabled = enabled
+        self.breaker_options = breaker_options or {}
+        self.limiter_options = limiter_options or {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+
+    @classmethod
+    def from_env(cls) -> "ModelGuard":
+        """Create a guard configured from GROQ_CIRCUIT_* and GROQ_CONCURRENCY_* environment variables"""
+        return cls(
+            enabled=os.getenv("GROQ_CIRCUIT_ENABLED", "true").lower() not in ("0", "false", "no"),
+            breaker_options={
+                "failure_ratio": float(os.getenv("GROQ_CIRCUIT_FAILURE_RATIO", "0.5")),
+                "min_calls": int(os.getenv("GROQ_CIRCUIT_MIN_CALLS", "10")),
+                "consecutive_failures": int(os.getenv("GROQ_CIRCUIT_CONSECUTIVE_FAILURES", "5")),
+                "window": float(os.getenv("GROQ_CIRCUIT_WINDOW", "30")),
+                "open_seconds": float(os.getenv("GROQ_CIRCUIT_OPEN_SECONDS", "15")),
+                "max_open_seconds": float(os.getenv("GROQ_CIRCUIT_MAX_OPEN_SECONDS", "120"))
+            },
+            limiter_options={
+                "initial": int(os.getenv("GROQ_CONCURRENCY_INITIAL", "32")),
+                "min_limit": int(os.getenv("GROQ_CONCURRENCY_MIN", "1")),
+                "max_limit": int(os.getenv("GROQ_CONCURRENCY_MAX", "64"))
+            }
+        )
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(model, **self.breaker_options)
+        return breaker
+
+    def limiter(self, model: str) -> ConcurrencyLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limiter = self._limiters[model] = ConcurrencyLimiter(model, **self.limiter_options)
+        return limiter
+
+    def check(self, model: str) -> None:
+        """Raise CircuitOpenError if `model`'s circuit would reject a call now"""
+        if self.enabled:
+            self.breaker(model).check()
+
+    @asynccontextmanager
+    async def guard(self, model: str) -> AsyncIterator["GuardedCall"]:
+        """Admit one upstream call to `model` and record how it went"""
+        call = GuardedCall()
+        if not self.enabled:
+            yield call
+            return
+        breaker = self.breaker(model)
+        limiter = self.limiter(model)
+        breaker.check()
+        await limiter.acquire()
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            limiter.release(0.0, None)
+            raise
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception as e:
+            outcome = classify(e)
+            limiter.release(time.perf_counter() - start, outcome)
+            breaker.record(outcome)
+            raise
+        except BaseException:
+            limiter.release(time.perf_counter() - start, None)
+            breaker.record(None)
+            raise
+        limiter.release(time.perf_counter() - start, OK, call.tokens)
+        breaker.record(OK)
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and concurrency limit per model"""
+        return {
+            "enabled": self.enabled,
+            "models": {
+                model: {"circuit": breaker.stats(), "concurrency": self.limiter(model).stats()}
+                for model, breaker in self._breakers.items()
+            }
+        }
@@ -0,0 +1,226 @@
+"""
+Deferred Batcher - Routes non-urgent chat completions through the Groq Batch API
+Deferred calls are buffered, flushed as one batch per model and resolved by custom_id
+"""
+import asyncio
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from groq.types.chat import ChatCompletion
+
+
+# Whether chat completions made in the current task should take the batch lane
+_deferred: ContextVar[bool] = ContextVar("deferred", default=False)
+
+
+class DeferredBatchError(Exception):
+    """Raised to a deferred caller whose request failed or was dropped by the batch"""
+
+
+def is_deferred() -> bool:
+    """True when completions in the current context should be deferred"""
+    return _deferred.get()
+
+
+@contextmanager
+def deferred_priority() -> Iterator[None]:
+    """Defer every chat completion made inside this block (and tasks it spawns)"""
+    token = _deferred.set(True)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+
+
+class DeferredBatcher:
+    """
+    Time/size-windowed buffer in front of the BatchManager
+
+    `complete()` parks a request in the buffer and waits for its result. The
+    buffer is flushed when it reaches `max_batch_size` requests or `max_wait`
+    seconds after its first request; each flush submits one batch per model
+    to the BatchManager, whose poller tracks it alongside every other batch.
+    When it finishes, every waiting caller is resolved with the
+    ChatCompletion for its custom_id.
+    """
+
+    def __init__(
+        self,
+        batch_manager: Any,
+        max_batch_size: int = 500,
+        max_wait: float = 60.0,
+        completion_window: str = "24h"
+    ):
+        """
+        Args:
+            batch_manager: BatchManager used to submit and track batches
+            max_batch_size: Buffered requests that trigger an immediate flush
+            max_wait: Seconds after the first buffered request before flushing
+            completion_window: Groq batch processing window ("24h" to "7d")
+        """
+        self.batch_manager = batch_manager
+        self.batch_service = batch_manager.batch_service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.completion_window = completion_window
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._batches: Dict[str, asyncio.Task] = {}
+        self._flushes: set = set()
+        self._stats = {"submitted": 0, "batches": 0, "completed": 0, "failed": 0}
+
+    @classmethod
+    def from_env(cls, batch_manager: Any) -> "DeferredBatcher":
+        """Create a batcher configured from DEFERRED_BATCH_* environment variables"""
+        return cls(
+            batch_manager,
+            max_batch_size=int(os.getenv("DEFERRED_BATCH_MAX_SIZE", "500")),
+            max_wait=float(os.getenv("DEFERRED_BATCH_MAX_WAIT", "60")),
+            completion_window=os.getenv("DEFERRED_BATCH_COMPLETION_WINDOW", "24h")
+        )
+
+    async def complete(self, params: Dict[str, Any]) -> ChatCompletion:
+        """
+        Queue one chat completion for the next batch and wait for its result
+
+        Args:
+            params: Completion parameters (model, messages, temperature, ...)
+
+        Returns:
+            The ChatCompletion from the batch output
+
+        Raises:
+            DeferredBatchError: If the request errored or the batch did not complete
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append({"custom_id": f"deferred-{uuid.uuid4().hex}", "params": params, "future": future})
+        self._stats["submitted"] += 1
+
+        if len(self._buffer) >= self.max_batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_after_wait())
+
+        return await future
+
+    async def flush(self) -> None:
+        """Submit everything buffered now (without waiting for the window)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        entries, self._buffer = self._buffer, []
+        if not entries:
+            return
+
+        by_model: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            by_model.setdefault(entry["params"]["model"], []).append(entry)
+
+        groups = list(by_model.items())
+        try:
+            while groups:
+                model, group = groups[0]
+                try:
+                    batch_id = await self._submit(model, group)
+                except Exception as e:
+                    print(f"❌ Deferred batch submission failed for {model}: {str(e)}")
+                    self._fail(group, f"Batch submission failed: {str(e)}")
+                else:
+                    print(f"📦 Submitted deferred batch {batch_id} ({len(group)} {model} requests)")
+                    self._stats["batches"] += 1
+                    self._batches[batch_id] = asyncio.create_task(self._collect(batch_id, group))
+                groups.pop(0)
+        except asyncio.CancelledError:
+            for _, group in groups:
+                self._fail(group, "Service shutting down")
+            raise
+
+    async def stop(self) -> None:
+        """Cancel timers and pollers and fail every caller still waiting"""
+        tasks = [task for task in [self._timer, *self._flushes, *self._batches.values()] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._fail(self._buffer, "Service shutting down")
+        self._buffer, self._timer, self._batches = [], None, {}
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer size, batches in flight and lifetime counters"""
+        return {
+            "buffered": len(self._buffer),
+            "batches_in_flight": len(self._batches),
+            **self._stats
+        }
+
+    def _start_flush(self) -> None:
+        task = asyncio.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush_after_wait(self) -> None:
+        await asyncio.sleep(self.max_wait)
+        self._timer = None
+        await self.flush()
+
+    async def _submit(self, model: str, entries: List[Dict[str, Any]]) -> str:
+        """Build one batch for a model and hand it to the BatchManager"""
+        requests = self.batch_service.create_chat_completion_batch_requests(
+            messages_list=[entry["params"]["messages"] for entry in entries],
+            model=model,
+            custom_ids=[entry["custom_id"] for entry in entries],
+            params_list=[
+                {key: value for key, value in entry["params"].items() if key not in ("model", "messages")}
+                for entry in entries
+            ]
+        )
+        record = await self.batch_manager.submit(requests, completion_window=self.completion_window)
+        return record["batch_id"]
+
+    async def _collect(self, batch_id: str, entries: List[Dict[str, Any]]) -> None:
+        """Wait for the manager to see the batch finish and route its results back by custom_id"""
+        start_time = time.time()
+        try:
+            record = await self.batch_manager.wait(batch_id)
+
+            pending = {entry["custom_id"]: entry["future"] for entry in entries}
+            for file_id in (record.get("output_file_id"), record.get("error_file_id")):
+                if file_id:
+                    async for line in self.batch_service.iter_batch_results_async(file_id):
+                        self._route(line, pending)
+            self._fail_futures(pending.values(), f"Request missing from batch {batch_id} output (status: {record['status']})")
+            print(f"✅ Deferred batch {batch_id} {record['status']} after {time.time() - start_time:.0f}s")
+        except asyncio.CancelledError:
+            self._fail(entries, f"Service shutting down before batch {batch_id} finished")
+            raise
+        except Exception as e:
+            print(f"❌ Collecting deferred batch {batch_id} failed: {str(e)}")
+            self._fail(entries, f"Batch {batch_id} polling failed: {str(e)}")
+        finally:
+            self._batches.pop(batch_id, None)
+
+    def _route(self, line: Dict[str, Any], pending: Dict[str, asyncio.Future]) -> None:
+        future = pending.pop(line.get("custom_id"), None)
+        if future is None or future.done():
+            return
+        response = line.get("response") or {}
+        if response.get("status_code") == 200 and response.get("body"):
+            future.set_result(ChatCompletion.model_validate(response["body"]))
+            self._stats["completed"] += 1
+        else:
+            error = line.get("error") or (response.get("body") or {}).get("error") or response
+            future.set_exception(DeferredBatchError(f"Deferred request failed: {error}"))
+            self._stats["failed"] += 1
+
+    def _fail(self, entries: List[Dict[str, Any]], reason: str) -> None:
+        self._fail_futures([entry["future"] for entry in entries], reason)
+
+    def _fail_futures(self, futures: Any, reason: str) -> None:
+        for future in futures:
+            if not future.done():
+                future.set_exception(DeferredBatchError(reason))
+                self._stats["failed"] += 1
@@ -3,15 +3,28 @@ Groq Service - Groq API integration for multimodal analysis and text generation
 Uses free tier models with generous rate limits
 Now uses agents for all AI operations
 """
-from groq import Groq
+from groq import Groq, AsyncGroq, DefaultAsyncHttpxClient
+from groq.types.chat import ChatCompletion
+import httpx
 import os
-from typing import List, Dict, Any, Callable, Optional
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Optional
 import base64
-from io import BytesIO
-from PIL import Image
+import asyncio
+import inspect
 import json
 import time
 import random
+from contextlib import AsyncExitStack
+
+from app.services.response_cache import ResponseCache, make_cache_key
+from app.services.deferred_batcher import DeferredBatcher, is_deferred
+from app.services.rate_limiter import CHARS_PER_TOKEN, RateLimiter, RateLimitExceeded, estimate_tokens
+from app.services.single_flight import SingleFlight, coalesce
+from app.services.circuit_breaker import CircuitOpenError, ModelGuard
+from app.services import metrics
+from app.services.image_preprocessor import ImagePreprocessor, prepare_image
+from app.utils.json_repair import repair_json, stitch_json
+from app.utils.json_stream import CategoryItemExtractor
 
 
 class GroqService:
@@ -29,6 +42,42 @@ class GroqService:
         
         self.client = Groq(api_key=api_key)
         
+        # Async client backed by a single keep-alive connection pool.
+        # Agents await this directly instead of parking a default-executor
+        # thread per in-flight call, so concurrency is bounded by the pool
+        # limits below rather than by the executor's thread cap.
+        self.async_client = AsyncGroq(
+            api_key=api_key,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "100")),
+                    max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "20")),
+                    keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30"))
+                )
+            )
+        )
+        
+        # Content-addressed cache for completions (GROQ_CACHE_* env vars)
+        self.response_cache = ResponseCache.from_env()
+        
+        # Batch API lane for deferred-priority calls (attached at app startup)
+        self.deferred_batcher: Optional[DeferredBatcher] = None
+        
+        # Identical concurrent generate_* calls share one in-flight call (GROQ_SINGLE_FLIGHT_ENABLED)
+        self.single_flight = SingleFlight.from_env()
+        
+        # Per-model RPM/TPM budgets shared by every async call (GROQ_RATE_LIMIT* env vars)
+        self.rate_limiter = RateLimiter.from_env()
+        
+        # Per-model circuit breakers and adaptive concurrency limits (GROQ_CIRCUIT_*, GROQ_CONCURRENCY_*)
+        self.model_guard = ModelGuard.from_env()
+        
+        # Truncated JSON completions are resumed up to this many times before regenerating
+        self.max_continuations = int(os.getenv("GROQ_MAX_CONTINUATIONS", "2"))
+        
+        # Downscale/recompress/dedup stage for vision uploads (IMAGE_* env vars)
+        self.image_preprocessor = ImagePreprocessor.from_env()
+        
         # Model selection based on task
         # Vision model: Supports images, JSON mode, tool use
         self.vision_model = "meta-llama/llama-4-scout-17b-16e-instruct"
@@ -129,6 +178,332 @@ class GroqService:
         """Marketing campaigns agent property"""
         return self._get_marketing_campaigns_agent()
     
+    async def aclose(self) -> None:
+        """Close the async client and release pooled connections"""
+        await self.async_client.close()
+        self.response_cache.close()
+        self.image_preprocessor.shutdown()
+    
+    async def chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_completion_tokens: int,
+        response_format: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        initial_delay: float = 2.0,
+        cache_namespace: Optional[str] = None
+    ) -> Any:
+        """
+        Create a chat completion on the pooled async client
+        
+        Identical requests are served from the response cache while the
+        namespace's TTL holds; truncated responses are never cached. Inside
+        `deferred_priority()` (and with a deferred batcher attached) the
+        request goes through the Groq Batch API instead.
+        
+        Args:
+            model: Model to use
+            messages: Groq API (OpenAI-compatible) message dicts
+            temperature: Sampling temperature
+            max_completion_tokens: Completion token cap
+            response_format: Optional response format (e.g. {"type": "json_object"})
+            max_retries: Maximum retry attempts for 429/500 errors
+            initial_delay: Initial backoff delay in seconds
+            cache_namespace: Endpoint name used for cache TTL and counters
+        
+        Returns:
+            ChatCompletion response object
+        """
+        params = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_completion_tokens": max_completion_tokens
+        }
+        if response_format is not None:
+            params["response_format"] = response_format
+        
+        cache_key = make_cache_key(params)
+        cached = await self.response_cache.get(cache_key, cache_namespace)
+        if cached is not None:
+            return ChatCompletion.model_validate_json(cached)
+        
+        if self.deferred_batcher is not None and is_deferred():
+            # Bulk lane: wait for the next Batch API flush instead of calling now
+            response = await self.deferred_batcher.complete(params)
+        else:
+            response = await self._retry_with_backoff_async(
+                lambda: self._create_completion(params),
+                max_retries=max_retries,
+                initial_delay=initial_delay,
+                model=model
+            )
+        
+        if isinstance(response, ChatCompletion) and response.choices and response.choices[0].finish_reason == "stop":
+            await self.response_cache.set(cache_key, response.model_dump_json(), cache_namespace)
+        
+        return response
+    
+    async def stream_chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_completion_tokens: int,
+        response_format: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        initial_delay: float = 2.0
+    ) -> AsyncIterator[Any]:
+        """
+        Create a token-streaming chat completion on the pooled async client
+        
+        429/500 errors are retried while opening the stream; once chunks start
+        arriving, errors propagate to the caller. Streams bypass the response cache.
+        
+        Args:
+            model: Model to use
+            messages: Groq API (OpenAI-compatible) message dicts
+            temperature: Sampling temperature
+            max_completion_tokens: Completion token cap
+            response_format: Optional response format (e.g. {"type": "json_object"})
+            max_retries: Maximum retry attempts for 429/500 errors
+            initial_delay: Initial backoff delay in seconds
+        
+        Yields:
+            ChatCompletionChunk objects
+        """
+        params = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_completion_tokens": max_completion_tokens,
+            "stream": True
+        }
+        if response_format is not None:
+            params["response_format"] = response_format
+        
+        stream = await self._retry_with_backoff_async(
+            lambda: self._create_completion(params),
+            max_retries=max_retries,
+            initial_delay=initial_delay,
+            model=model
+        )
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            # Release the model guard now if the caller stops early
+            await stream.aclose()
+    
+    async def stream_json_items(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_completion_tokens: int,
+        response_format: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        initial_delay: float = 2.0,
+        prefix: str = ""
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a JSON completion, yielding each categories[].items[] element as it closes
+        
+        Args:
+            model: Model to use
+            messages: Groq API (OpenAI-compatible) message dicts
+            temperature: Sampling temperature
+            max_completion_tokens: Completion token cap
+            response_format: Optional response format (e.g. {"type": "json_object"})
+            max_retries: Maximum retry attempts for 429/500 errors
+            initial_delay: Initial backoff delay in seconds
+            prefix: Text the completion continues; its items are not yielded again
+        
+        Yields:
+            {"type": "item", "category", "category_index", "item"} events, then one
+            {"type": "done", "content", "finish_reason"} event with the full text
+            (prefix included)
+        """
+        extractor = CategoryItemExtractor()
+        extractor.feed(prefix)
+        finish_reason = None
+        
+        async for chunk in self.stream_chat_completion(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_completion_tokens=max_completion_tokens,
+            response_format=response_format,
+            max_retries=max_retries,
+            initial_delay=initial_delay
+        ):
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta is not None and choice.delta.content:
+                for event in extractor.feed(choice.delta.content):
+                    yield {"type": "item", **event}
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+        
+        yield {"type": "done", "content": extractor.buffer, "finish_reason": finish_reason}
+    
+    async def resume_truncated_json(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        partial: str,
+        temperature: float,
+        max_completion_tokens: int,
+        on_item: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Resume a JSON completion cut off at max_completion_tokens instead of regenerating it
+        
+        The partial output is sent back as a trailing assistant message, which
+        the model continues from its last character. Continuations run without
+        JSON mode (a fragment is not a JSON object on its own) and repeat, up to
+        GROQ_MAX_CONTINUATIONS times, while they are cut off too. The fragments
+        are joined with stitch_json; the output discarded along the way is
+        recorded per truncated response in groq_truncation_wasted_tokens.
+        
+        Args:
+            model: Model that produced `partial`
+            messages: Messages of the truncated request
+            partial: Truncated response text
+            temperature: Sampling temperature
+            max_completion_tokens: Completion token cap per continuation
+            on_item: Optional callback; when given, continuations are streamed and
+                each categories[].items[] element they complete is reported
+        
+        Returns:
+            Parsed stitched JSON, or None if the fragments could not be stitched
+            and the caller should regenerate
+        """
+        text = partial
+        stitched = None
+        # Characters of restated overlap dropped while joining
+        overlap = 0
+        for _ in range(self.max_continuations):
+            prefill = messages + [{"role": "assistant", "content": text}]
+            if on_item is None:
+                response = await self.chat_completion(
+                    model=model,
+                    messages=prefill,
+                    temperature=temperature,
+                    max_completion_tokens=max_completion_tokens
+                )
+                piece = response.choices[0].message.content or ""
+                finish_reason = response.choices[0].finish_reason
+            else:
+                async for event in self.stream_json_items(
+                    model=model,
+                    messages=prefill,
+                    temperature=temperature,
+                    max_completion_tokens=max_completion_tokens,
+                    prefix=text
+                ):
+                    if event["type"] == "done":
+                        piece = event["content"][len(text):]
+                        finish_reason = event["finish_reason"]
+                    else:
+                        await on_item({key: value for key, value in event.items() if key != "type"})
+            
+            joined = stitch_json(text, piece)
+            if joined is None:
+                text += piece
+                stitched = None
+                break
+            # The next round resumes from the overlap-trimmed join, not the raw fragments
+            stitched, joined_text = joined
+            overlap += len(text) + len(piece) - len(joined_text)
+            text = joined_text
+            if finish_reason != "length":
+                break
+        
+        if stitched is None:
+            print(f"⚠️  Could not stitch continuation of truncated {model} response, regenerating")
+            metrics.observe_truncation_waste(model, "regenerated", len(text) // CHARS_PER_TOKEN)
+            return None
+        
+        print(f"✅ Resumed truncated {model} response ({len(partial)} + {len(text) - len(partial)} chars)")
+        # Only a repeated overlap or a cut-off tail is thrown away
+        metrics.observe_truncation_waste(
+            model, "continued", (overlap + max(0, len(text) - len(stitched))) // CHARS_PER_TOKEN
+        )
+        return self._parse_json_response(stitched)
+    
+    async def _create_completion(self, params: Dict[str, Any]) -> Any:
+        """
+        Issue one completion request within the model's rate-limit budget
+        
+        Reserves estimated tokens before the call, then recalibrates the
+        limiter from the x-ratelimit-* headers and reported usage. The call
+        itself runs inside the model guard, which fails fast while the model's
+        circuit is open and caps concurrent calls to the model. A stream keeps
+        its guard until it is exhausted, fails or is closed.
+        
+        Raises:
+            CircuitOpenError: If the model's circuit breaker is open
+            RateLimitExceeded: If the model's queue wait would exceed the limit
+        """
+        model = params["model"]
+        # Fail before reserving budget or queueing for a model that is down
+        self.model_guard.check(model)
+        reserved = await self.rate_limiter.acquire(
+            model, estimate_tokens(params["messages"], params["max_completion_tokens"])
+        )
+        # Tokens billed: none unless the call is answered (streams keep the estimate, no usage yet)
+        used: Optional[int] = 0
+        try:
+            async with AsyncExitStack() as guard:
+                call = await guard.enter_async_context(self.model_guard.guard(model))
+                start = time.perf_counter()
+                try:
+                    raw = await self.async_client.chat.completions.with_raw_response.create(**params)
+                except Exception as e:
+                    metrics.observe_llm_call(model, time.perf_counter() - start, type(e).__name__)
+                    # Hand the reservation back first so Groq's headers have the last word
+                    self.rate_limiter.settle(model, reserved, 0)
+                    reserved = 0
+                    error_response = getattr(e, "response", None)
+                    if error_response is not None:
+                        self.rate_limiter.calibrate(
+                            model, error_response.headers, rate_limited=error_response.status_code == 429
+                        )
+                    raise
+                
+                self.rate_limiter.calibrate(model, raw.headers)
+                response = await raw.parse()
+                # For streams this measures time to the first byte of the response
+                metrics.observe_llm_call(model, time.perf_counter() - start, "ok")
+                usage = getattr(response, "usage", None)
+                used = getattr(usage, "total_tokens", None)
+                call.tokens = getattr(usage, "completion_tokens", None)
+                if params.get("stream"):
+                    # The guard's slot and outcome cover the whole stream, not just its first byte
+                    response = self._guarded_stream(response, guard.pop_all(), call)
+        finally:
+            # Failed and shed calls hand their reservation back instead of starving healthy callers
+            self.rate_limiter.settle(model, reserved, used)
+        metrics.observe_usage(model, usage)
+        return response
+    
+    @staticmethod
+    async def _guarded_stream(stream: Any, guard: AsyncExitStack, call: Any) -> AsyncIterator[Any]:
+        """Yield a stream's chunks, releasing its model guard when the stream ends"""
+        async with guard:
+            chunks = 0
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks += 1
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None)
+                # Groq reports usage on the last chunk; otherwise each content chunk is about one token
+                call.tokens = getattr(usage, "completion_tokens", None) or chunks
+                yield chunk
+    
     def _retry_with_backoff(self, func: Callable, max_retries: int = 3, initial_delay: float = 2.0) -> Any:
         """
         Retry a function with exponential backoff, handling rate limit errors (429)
@@ -205,18 +580,34 @@ class GroqService:
             raise last_exception
         raise Exception("Retry logic failed unexpectedly")
     
-    async def _retry_with_backoff_async(self, func: Callable, max_retries: int = 3, initial_delay: float = 2.0) -> Any:
+    async def _retry_with_backoff_async(
+        self,
+        func: Callable,
+        max_retries: int = 3,
+        initial_delay: float = 2.0,
+        model: str = "unknown"
+    ) -> Any:
         """
         Async version of retry with exponential backoff
+        
+        Accepts either a plain callable or one returning an awaitable (e.g. a
+        call on the async client); backoff sleeps never block the event loop.
+        Retries are counted per cause under `model` in the metrics.
         """
-        import asyncio
         last_exception = None
         
         for attempt in range(max_retries):
             try:
-                return func()
+                result = func()
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            except (RateLimitExceeded, CircuitOpenError):
+                # Shed by the limiter or the breaker: retrying would only hit the same wall
+                raise
             except Exception as e:
                 error_str = str(e)
+                error_type = type(e).__name__
                 last_exception = e
                 
                 is_rate_limit = (
@@ -232,6 +623,7 @@ class GroqService:
                         jitter = random.uniform(0, base_delay * 0.2)
                         delay = base_delay + jitter
                         print(f"⚠️  Rate limit hit (429). Retrying in {delay:.1f} seconds... (attempt {attempt + 1}/{max_retries})")
+                        metrics.record_retry(model, "rate_limit")
                         await asyncio.sleep(delay)
                         continue
                     else:
@@ -241,15 +633,19 @@ class GroqService:
                     is_server_error = (
                         "500" in error_str or 
                         "Internal Server Error" in error_str or
-                        "internal_server_error" in error_str.lower()
+                        "internal_server_error" in error_str.lower() or
+                        error_type == "InternalServerError"
                     )
                     
                     if is_server_error and attempt < max_retries - 1:
+                        # This failure may have opened the circuit: don't sleep just to be rejected
+                        self.model_guard.check(model)
                         # Retry server errors with exponential backoff (longer delays for 500 errors)
                         base_delay = initial_delay * (2 ** attempt) * 1.5  # Longer delays for server errors
                         jitter = random.uniform(0, base_delay * 0.3)
                         delay = base_delay + jitter
                         print(f"⚠️  Server error (500). Retrying in {delay:.1f} seconds... (attempt {attempt + 1}/{max_retries})")
+                        metrics.record_retry(model, "server_error")
                         await asyncio.sleep(delay)
                         continue
                     elif is_server_error:
@@ -282,22 +678,21 @@ class GroqService:
             # Prepare images for Groq API
             # Groq accepts base64-encoded images or image URLs
             image_contents = []
+            preprocessor = self.image_preprocessor
             for img_data in images:
-                # Convert image to base64
-                image = Image.open(BytesIO(img_data["data"]))
-                # Convert to RGB if needed
-                if image.mode != "RGB":
-                    image = image.convert("RGB")
-                
-                # Convert to base64
-                buffered = BytesIO()
-                image.save(buffered, format="JPEG")
-                img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+                # Downscale (reduced decoding), orient and recompress before encoding
+                prepared = prepare_image(
+                    img_data["data"],
+                    preprocessor.max_dimension,
+                    preprocessor.quality,
+                    preprocessor.image_format
+                )
+                img_base64 = base64.b64encode(prepared["data"]).decode('utf-8')
                 
                 image_contents.append({
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{img_base64}"
+                        "url": f"data:{prepared['content_type']};base64,{img_base64}"
                     }
                 })
             
@@ -358,54 +753,18 @@ class GroqService:
     def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
         """
         Parse Groq's JSON response into structured data
-        Handles incomplete JSON responses by attempting to fix them
+        Handles incomplete JSON responses by recovering the longest valid prefix
         """
+        # Groq with json_object mode should return pure JSON, but handle markdown if present
+        text = response_text.strip()
+        
+        # Remove markdown code blocks if present
+        if "```json" in text:
+            text = text.split("```json")[1].split("```")[0].strip()
+        elif "```" in text:
+            text = text.split("```")[1].split("```")[0].strip()
+        
         try:
-            # Try to extract JSON from response
-            # Groq with json_object mode should return pure JSON, but handle markdown if present
-            text = response_text.strip()
-            
-            # Remove markdown code blocks if present
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0].strip()
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0].strip()
-            
-            # Check if JSON appears incomplete (common signs)
-            if not text.endswith('}') and not text.endswith(']'):
-                # Try to fix incomplete JSON by closing open structures
-                open_braces = text.count('{') - text.count('}')
-                open_brackets = text.count('[') - text.count(']')
-                
-                # Close incomplete JSON structures
-                if open_braces > 0:
-                    # Find the last incomplete object/array
-                    last_brace = text.rfind('{')
-                    last_bracket = text.rfind('[')
-                    last_pos = max(last_brace, last_bracket)
-                    
-                    if last_pos > 0:
-                        # Try to extract valid JSON up to the last complete structure
-                        # Find the matching opening brace/bracket
-                        depth = 0
-                        start_pos = last_pos
-                        for i in range(last_pos, -1, -1):
-                            if text[i] == '}':
-                                depth += 1
-                            elif text[i] == '{':
-                                depth -= 1
-                                if depth == 0:
-                                    start_pos = i
-                                    break
-                        
-                        # Extract the complete structure
-                        if start_pos < last_pos:
-                            text = text[:last_pos + 1] + '}' * open_braces + ']' * open_brackets
-                        else:
-                            # If we can't find a good cut point, try to close everything
-                            text = text + '}' * open_braces + ']' * open_brackets
-            
-            # Parse JSON
             parsed = json.loads(text)
             
             # Ensure required fields (only for BOM analysis responses)
@@ -429,94 +788,38 @@ class GroqService:
             print(f"Failed to parse Groq response as JSON: {e}")
             print(f"Response text (first 1000 chars): {response_text[:1000]}")
             print(f"Response text (last 500 chars): {response_text[-500:]}")
-            
-            # Try to extract partial data from incomplete/malformed JSON
-            try:
-                # Find the last complete JSON object/array
-                text = response_text.strip()
-                if "```json" in text:
-                    text = text.split("```json")[1].split("```")[0].strip()
-                elif "```" in text:
-                    text = text.split("```")[1].split("```")[0].strip()
-                
-                # First, try to extract categories array specifically
-                if '"categories"' in text:
-                    # Find categories key
-                    cat_key_pos = text.find('"categories"')
-                    if cat_key_pos != -1:
-                        # Find opening bracket
-                        bracket_pos = text.find('[', cat_key_pos)
-                        if bracket_pos != -1:
-                            # Extract categories array by finding matching brackets
-                            depth = 0
-                            in_string = False
-                            escape = False
-                            categories_start = bracket_pos
-                            
-                            for i in range(bracket_pos, len(text)):
-                                char = text[i]
-                                if escape:
-                                    escape = False
-                                    continue
-                                if char == '\\':
-                                    escape = True
-                                    continue
-                                if char == '"' and not escape:
-                                    in_string = not in_string
-                                    continue
-                                if not in_string:
-                                    if char == '[':
-                                        depth += 1
-                                    elif char == ']':
-                                        depth -= 1
-                                        if depth == 0:
-                                            # Found complete categories array
-                                            try:
-                                                categories_json = text[categories_start:i+1]
-                                                categories_list = json.loads(categories_json)
-                                                if isinstance(categories_list, list) and len(categories_list) > 0:
-                                                    print(f"✅ Successfully extracted {len(categories_list)} categories from malformed JSON")
-                                                    return {"categories": categories_list}
-                                            except Exception as cat_error:
-                                                print(f"Failed to parse extracted categories: {cat_error}")
-                                            break
-                
-                # Fallback: Try to find a valid JSON substring
-                for i in range(len(text), 0, -1):
-                    try:
-                        partial = text[:i]
-                        # Try to close it
-                        open_braces = partial.count('{') - partial.count('}')
-                        open_brackets = partial.count('[') - partial.count(']')
-                        if open_braces > 0 or open_brackets > 0:
-                            partial += '}' * open_braces + ']' * open_brackets
-                        parsed = json.loads(partial)
-                        print(f"⚠️  Successfully parsed partial JSON (truncated at position {i})")
-                        # Ensure required fields exist even if truncated
-                        if isinstance(parsed, dict):
-                            if "categories" not in parsed:
-                                parsed["categories"] = []
-                            if "materials_pricing" not in parsed:
-                                parsed["materials_pricing"] = []
-                        return parsed
-                    except:
-                        continue
-            except Exception as extract_error:
-                print(f"Error in partial JSON extraction: {extract_error}")
-                pass
-            
-            # If all else fails, return a minimal structure with categories
-            print("Warning: Returning minimal fallback structure due to JSON parse error")
-            return {
-                "error": "Failed to parse complete JSON response",
-                "raw_response_preview": response_text[:500],
-                "categories": [],  # Use new structure
-                "primary_materials": [],  # Legacy compatibility
-                "trims": [],
-                "notions": [],
-                "confidence": 0.5
-            }
+        
+        # Recover the longest valid prefix with open containers closed (single pass)
+        try:
+            repaired = repair_json(text)
+            if repaired is not None:
+                parsed = json.loads(repaired)
+                print(f"⚠️  Successfully parsed partial JSON (recovered {len(repaired)} of {len(text)} chars)")
+                metrics.record_json_repair("repaired")
+                # Ensure required fields exist even if truncated
+                if isinstance(parsed, dict):
+                    if "categories" not in parsed:
+                        parsed["categories"] = []
+                    if "materials_pricing" not in parsed:
+                        parsed["materials_pricing"] = []
+                return parsed
+        except Exception as extract_error:
+            print(f"Error in partial JSON extraction: {extract_error}")
+        
+        # If all else fails, return a minimal structure with categories
+        print("Warning: Returning minimal fallback structure due to JSON parse error")
+        metrics.record_json_repair("failed")
+        return {
+            "error": "Failed to parse complete JSON response",
+            "raw_response_preview": response_text[:500],
+            "categories": [],  # Use new structure
+            "primary_materials": [],  # Legacy compatibility
+            "trims": [],
+            "notions": [],
+            "confidence": 0.5
+        }
     
+    @coalesce("market_forecast")
     async def generate_market_demand_forecast(
         self,
         product_name: str,
@@ -543,6 +846,7 @@ class GroqService:
             target_markets=target_markets
         )
     
+    @coalesce("price_forecast")
     async def generate_material_price_forecast(
         self,
         material_name: str,
@@ -569,6 +873,28 @@ class GroqService:
             weeks=weeks
         )
     
+    @coalesce("price_forecast_batch")
+    async def generate_material_price_forecast_batch(
+        self,
+        materials: List[Dict[str, str]],
+        weeks: int = 8
+    ) -> Dict[str, Any]:
+        """
+        Generate price forecasts for many materials using Price Forecast Agent
+        
+        Args:
+            materials: Items with material_name, material_type and unit
+            weeks: Number of weeks to forecast (default 8)
+        
+        Returns:
+            Columnar material x week price matrix
+        """
+        return await self.price_forecast_agent.generate_forecasts_batch(
+            materials=materials,
+            weeks=weeks
+        )
+    
+    @coalesce("supplier_recommendations")
     async def generate_supplier_recommendations(
         self,
         material_name: str,
@@ -598,6 +924,30 @@ class GroqService:
             preferred_countries=preferred_countries
         )
     
+    async def generate_supplier_recommendations_bulk(
+        self,
+        materials: List[Dict[str, Any]],
+        on_result: Callable[[Dict[str, Any]], Any],
+        preferred_countries: List[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate supplier recommendations for many materials using Supplier Recommendations Agent
+        
+        Args:
+            materials: BOM items (material_name, material_type, quantity, unit, preferred_countries)
+            on_result: Async callback awaited with each material's result as it completes
+            preferred_countries: Default countries for items that don't set their own
+        
+        Returns:
+            Summary with input, unique, cached and pack counts
+        """
+        return await self.supplier_recommendations_agent.find_suppliers_bulk(
+            materials=materials,
+            on_result=on_result,
+            preferred_countries=preferred_countries
+        )
+    
+    @coalesce("supplier_contact")
     async def fetch_supplier_contact_info(
         self,
         supplier_name: str,
@@ -657,58 +1007,17 @@ class GroqService:
             # Use Groq's compound model which has built-in web search
             # Web search happens automatically - no need for separate tool calls
             def _search():
-                return self.client.chat.completions.create(
-                    model="groq/compound-mini",  # Use compound-mini for web search (free tier friendly)
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": f"Search the web and provide current information about: {query}. Include relevant details, pricing, trends, and market data. Provide a comprehensive summary with key facts."
-                        }
-                    ],
-                    temperature=0.5,
-                    max_completion_tokens=1024
-                )
+                return self.client.chat.completions.create(**self._search_params(query))
             
             response = self._retry_with_backoff(_search)
-            
-            # Extract the final output (which includes web search results)
-            result_text = response.choices[0].message.content
-            
-            # Extract search results if available in executed_tools
-            search_results = ""
-            if hasattr(response.choices[0].message, 'executed_tools') and response.choices[0].message.executed_tools:
-                # Try to get search results from executed tools
-                for tool in response.choices[0].message.executed_tools:
-                    if hasattr(tool, 'search_results'):
-                        search_results = str(tool.search_results)
-            
-            # Combine final output with search results for more context
-            combined_results = result_text
-            if search_results:
-                combined_results = f"{result_text}\n\nSearch Sources: {search_results}"
-            
-            return {
-                "query": query,
-                "results": combined_results,
-                "timestamp": time.time()
-            }
+            return self._build_search_result(query, response)
             
         except Exception as e:
             print(f"Error performing web search (falling back to AI synthesis): {str(e)}")
             # Fallback: Use AI to synthesize information based on knowledge
             try:
                 def _synthesize():
-                    return self.client.chat.completions.create(
-                        model=self.text_model,
-                        messages=[
-                            {
-                                "role": "user",
-                                "content": f"Based on your knowledge, provide current market information about: {query}. Focus on pricing, trends, and market data as of 2024."
-                            }
-                        ],
-                        temperature=0.5,
-                        max_completion_tokens=512
-                    )
+                    return self.client.chat.completions.create(**self._synthesis_params(query))
                 
                 response = self._retry_with_backoff(_synthesize)
                 result_text = response.choices[0].message.content
@@ -726,6 +1035,93 @@ class GroqService:
                     "timestamp": time.time()
                 }
     
+    @coalesce("web_search")
+    async def search_web_async(self, query: str) -> Dict[str, Any]:
+        """
+        Async version of search_web on the pooled async client
+        
+        Args:
+            query: Search query string
+        
+        Returns:
+            Dictionary with search results
+        """
+        try:
+            response = await self.chat_completion(**self._search_params(query), cache_namespace="web_search")
+            return self._build_search_result(query, response)
+            
+        except Exception as e:
+            print(f"Error performing web search (falling back to AI synthesis): {str(e)}")
+            try:
+                response = await self.chat_completion(**self._synthesis_params(query), cache_namespace="web_search")
+                result_text = response.choices[0].message.content
+                
+                return {
+                    "query": query,
+                    "results": result_text,
+                    "timestamp": time.time()
+                }
+            except Exception as e2:
+                print(f"Error in fallback synthesis: {str(e2)}")
+                return {
+                    "query": query,
+                    "results": "",
+                    "timestamp": time.time()
+                }
+    
+    def _search_params(self, query: str) -> Dict[str, Any]:
+        """Completion parameters for a compound-mini web search"""
+        return {
+            "model": "groq/compound-mini",  # Use compound-mini for web search (free tier friendly)
+            "messages": [
+                {
+                    "role": "user",
+                    "content": f"Search the web and provide current information about: {query}. Include relevant details, pricing, trends, and market data. Provide a comprehensive summary with key facts."
+                }
+            ],
+            "temperature": 0.5,
+            "max_completion_tokens": 1024
+        }
+    
+    def _synthesis_params(self, query: str) -> Dict[str, Any]:
+        """Completion parameters for the knowledge-based search fallback"""
+        return {
+            "model": self.text_model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": f"Based on your knowledge, provide current market information about: {query}. Focus on pricing, trends, and market data as of 2024."
+                }
+            ],
+            "temperature": 0.5,
+            "max_completion_tokens": 512
+        }
+    
+    def _build_search_result(self, query: str, response: Any) -> Dict[str, Any]:
+        """Combine a compound model's answer with any executed search results"""
+        # Extract the final output (which includes web search results)
+        result_text = response.choices[0].message.content
+        
+        # Extract search results if available in executed_tools
+        search_results = ""
+        if hasattr(response.choices[0].message, 'executed_tools') and response.choices[0].message.executed_tools:
+            # Try to get search results from executed tools
+            for tool in response.choices[0].message.executed_tools:
+                if hasattr(tool, 'search_results'):
+                    search_results = str(tool.search_results)
+        
+        # Combine final output with search results for more context
+        combined_results = result_text
+        if search_results:
+            combined_results = f"{result_text}\n\nSearch Sources: {search_results}"
+        
+        return {
+            "query": query,
+            "results": combined_results,
+            "timestamp": time.time()
+        }
+    
+    @coalesce("revenue_projection")
     async def generate_revenue_projection(
         self,
         product_name: str,
@@ -798,6 +1194,7 @@ class GroqService:
         
         return {"projections": months}
     
+    @coalesce("product_performance")
     async def generate_product_performance(
         self,
         products: List[Dict[str, Any]]
@@ -828,6 +1225,7 @@ class GroqService:
                 ]
             }
     
+    @coalesce("marketing_campaigns")
     async def generate_marketing_campaigns(
         self,
         product_name: str,
@@ -0,0 +1,201 @@
+"""
+Image Preprocessor - Prepares product uploads for vision model calls
+Downscales with reduced decoding, applies EXIF orientation, recompresses
+and drops near-duplicate shots before images are base64-encoded
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import List, Dict, Any, Optional
+
+from PIL import Image, ImageOps
+
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64-bit difference hash (dHash) of an image
+
+    Args:
+        image: PIL image
+
+    Returns:
+        Hash as an integer; near-identical images differ in only a few bits
+    """
+    gray = image.convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+
+def prepare_image(
+    data: bytes,
+    max_dimension: int = 1536,
+    quality: int = 85,
+    image_format: str = "JPEG"
+) -> Dict[str, Any]:
+    """
+    Decode, orient, downscale and recompress a single image
+
+    Runs in a worker process, so it only takes and returns picklable values.
+
+    Args:
+        data: Raw upload bytes
+        max_dimension: Longest side of the output in pixels
+        quality: Encoder quality (1-100)
+        image_format: "JPEG" or "WEBP"
+
+    Returns:
+        Dictionary with encoded data, content_type, width, height and phash
+    """
+    image = Image.open(BytesIO(data))
+    scale = min(1.0, max_dimension / max(image.size))
+    target = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+    # For JPEGs, draft mode decodes straight to a 1/2, 1/4 or 1/8 scale from
+    # the DCT coefficients, so a 12 MP photo never materializes at full size
+    image.draft("RGB", target)
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    # Orient after downscaling so the transpose works on the small image
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    buffered = BytesIO()
+    image.save(buffered, format=image_format, quality=quality, optimize=True)
+
+    return {
+        "data": buffered.getvalue(),
+        "content_type": MIME_TYPES[image_format],
+        "width": image.width,
+        "height": image.height,
+        "phash": perceptual_hash(image)
+    }
+
+
+class ImagePreprocessor:
+    """
+    Prepares uploaded images for vision calls in a process pool
+
+    Decoding large photos is CPU-bound, so it runs outside the event loop.
+    """
+
+    def __init__(
+        self,
+        max_dimension: int = 1536,
+        quality: int = 85,
+        image_format: str = "JPEG",
+        dedup_distance: int = 4,
+        max_workers: Optional[int] = None
+    ):
+        """
+        Args:
+            max_dimension: Longest side of prepared images in pixels
+            quality: JPEG/WebP encoder quality
+            image_format: "JPEG" or "WEBP"
+            dedup_distance: Max dHash bit distance treated as a duplicate (negative disables)
+            max_workers: Process pool size (defaults to min(2, CPU count))
+        """
+        image_format = image_format.upper()
+        if image_format not in MIME_TYPES:
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.image_format = image_format
+        self.dedup_distance = dedup_distance
+        self.max_workers = max_workers or min(2, os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> "ImagePreprocessor":
+        """Create a preprocessor configured from IMAGE_* environment variables"""
+        return cls(
+            max_dimension=int(os.getenv("IMAGE_MAX_DIMENSION", "1536")),
+            quality=int(os.getenv("IMAGE_QUALITY", "85")),
+            image_format=os.getenv("IMAGE_FORMAT", "JPEG"),
+            dedup_distance=int(os.getenv("IMAGE_DEDUP_DISTANCE", "4")),
+            max_workers=int(os.getenv("IMAGE_WORKERS", "0")) or None
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Lazily start the process pool on first use"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def prepare(self, images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Prepare a batch of images for a vision call
+
+        URL images pass through untouched; undecodable uploads are kept as-is.
+
+        Args:
+            images: Image dictionaries with 'url' or 'data' (+ optional content_type)
+
+        Returns:
+            Prepared image dictionaries, near-duplicates removed
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        async def _prepare_one(img: Dict[str, Any]) -> Dict[str, Any]:
+            if not img.get("data"):
+                return img
+            try:
+                prepared = await loop.run_in_executor(
+                    executor,
+                    prepare_image,
+                    img["data"],
+                    self.max_dimension,
+                    self.quality,
+                    self.image_format
+                )
+            except Exception as e:
+                print(f"⚠️  Image preprocessing failed for {img.get('filename', 'upload')}: {str(e)}")
+                return img
+            return {
+                **img,
+                **prepared,
+                "original_bytes": len(img["data"])
+            }
+
+        prepared_images = await asyncio.gather(*[_prepare_one(img) for img in images])
+        return self._deduplicate(list(prepared_images))
+
+    def _deduplicate(self, images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop images whose perceptual hash is within dedup_distance of an earlier one"""
+        if self.dedup_distance < 0:
+            return images
+
+        kept = []
+        kept_hashes = []
+        for img in images:
+            phash = img.get("phash")
+            if phash is not None and any(
+                hamming_distance(phash, other) <= self.dedup_distance for other in kept_hashes
+            ):
+                print(f"🧹 Skipping near-duplicate image {img.get('filename', '')}".rstrip())
+                continue
+            if phash is not None:
+                kept_hashes.append(phash)
+            kept.append(img)
+        return kept
+
+    def shutdown(self) -> None:
+        """Stop the process pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,276 @@
+"""
+BOM Job Queue - Runs BOM generation in the background behind job IDs
+A bounded worker pool drains an in-process queue and records progress in a JobStore
+"""
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.services.circuit_breaker import find_circuit_open
+from app.services.deferred_batcher import deferred_priority
+from app.services.job_store import JobStore, QUEUED, RUNNING, SUCCEEDED, FAILED
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+def _job_error(error: Exception, action: str = "BOM generation") -> Dict[str, Any]:
+    """Describe a pipeline failure the way /generate-bom reports it"""
+    circuit_open = find_circuit_open(error)
+    if circuit_open is not None:
+        return {"status_code": 503, "detail": str(circuit_open)}
+    error_str = str(error)
+    if "429" in error_str or "rate limit" in error_str.lower() or "quota" in error_str.lower():
+        return {
+            "status_code": 429,
+            "detail": "Groq API rate limit exceeded. Please wait a few minutes and try again."
+        }
+    return {"status_code": 500, "detail": f"{action} failed: {error_str}"}
+
+
+class BOMJobQueue:
+    """
+    Background execution of BOMGenerator.generate
+
+    Job records (status, per-stage progress, result or error) live in the
+    store so they survive restarts; uploaded images stay in memory with the
+    queued work item, so jobs interrupted by a restart are marked failed.
+    With a leasing store the queue renews its jobs' leases and sweeps for
+    jobs orphaned by other replicas every lease_ttl / 3 seconds.
+    """
+
+    def __init__(
+        self,
+        bom_generator: Any,
+        store: JobStore,
+        concurrency: int = 2,
+        max_pending: int = 100,
+        max_deferred: int = 1000
+    ):
+        """
+        Args:
+            bom_generator: BOMGenerator used to run each job
+            store: Job persistence backend
+            concurrency: Number of jobs run at the same time
+            max_pending: Queued (not yet running) jobs accepted before rejecting new ones
+            max_deferred: Unfinished deferred jobs accepted before rejecting new ones
+        """
+        self.bom_generator = bom_generator
+        self.store = store
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.max_deferred = max_deferred
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+        self._deferred: set = set()
+        self._submit_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls, bom_generator: Any, store: JobStore) -> "BOMJobQueue":
+        """Create a queue configured from JOB_* environment variables"""
+        return cls(
+            bom_generator,
+            store,
+            concurrency=int(os.getenv("JOB_CONCURRENCY", "2")),
+            max_pending=int(os.getenv("JOB_MAX_PENDING", "100")),
+            max_deferred=int(os.getenv("DEFERRED_MAX_PENDING", "1000"))
+        )
+
+    async def start(self) -> None:
+        """Fail jobs orphaned by a previous process and start the workers"""
+        await self._fail_orphans()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        if self.store.lease_ttl:
+            self._lease_task = asyncio.create_task(self._renew_leases(self.store.lease_ttl / 3))
+        print(f"✅ BOM job queue started ({self.concurrency} workers)")
+
+    async def stop(self) -> None:
+        """Cancel the workers and deferred tasks (running jobs are failed on next start)"""
+        tasks = [*self._workers, *self._deferred]
+        if self._lease_task is not None:
+            tasks.append(self._lease_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._lease_task = None
+        self._deferred = set()
+        await self.store.close()
+
+    async def _fail_orphans(self) -> None:
+        orphaned = await self.store.fail_unfinished("Job interrupted by a service restart; please resubmit")
+        if orphaned:
+            print(f"⚠️  Marked {orphaned} interrupted BOM job(s) as failed")
+
+    async def _renew_leases(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.store.renew()
+                await self._fail_orphans()
+            except Exception as e:
+                print(f"⚠️  Job lease renewal failed: {str(e)}")
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def submit(
+        self,
+        images: List[Dict[str, Any]],
+        description: str = "",
+        yield_buffer: float = 10.0,
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a BOM job
+
+        Args:
+            images: Image dictionaries as read from the upload
+            description: Product description
+            yield_buffer: Material waste buffer percentage
+            idempotency_key: Optional client key; resubmitting it returns the original job
+
+        Returns:
+            Job record (the existing one when the idempotency key was seen before)
+
+        Raises:
+            QueueFullError: If max_pending jobs are already waiting
+        """
+        async with self._submit_lock:
+            if self._queue.qsize() >= self.max_pending:
+                raise QueueFullError(f"BOM job queue is full ({self.max_pending} pending jobs)")
+
+            now = time.time()
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "idempotency_key": idempotency_key,
+                "status": QUEUED,
+                "created_at": now,
+                "updated_at": now,
+                "description": description,
+                "yield_buffer": yield_buffer,
+                "image_count": len(images),
+                "progress": {"completed_stages": [], "stage_timings": {}},
+                "result": None,
+                "error": None
+            }
+            stored = await self.store.create(job)
+            if stored["job_id"] == job["job_id"]:
+                self._queue.put_nowait((job["job_id"], images, description, yield_buffer))
+                print(f"📥 Queued BOM job {job['job_id']} ({self._queue.qsize()} pending)")
+            return stored
+
+    async def submit_deferred(self, kind: str, generate: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        """
+        Run a deferred-priority generation in the background behind a job ID
+
+        The call runs inside `deferred_priority()`, so its completions wait for
+        the next Groq Batch API flush; poll the job for the result.
+
+        Args:
+            kind: Endpoint name recorded on the job (e.g. "market_forecast")
+            generate: Zero-argument coroutine function producing the result
+
+        Returns:
+            Job record
+
+        Raises:
+            QueueFullError: If max_deferred deferred jobs are still unfinished
+        """
+        async with self._submit_lock:
+            if len(self._deferred) >= self.max_deferred:
+                raise QueueFullError(f"Deferred job queue is full ({self.max_deferred} pending jobs)")
+
+            now = time.time()
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "idempotency_key": None,
+                "kind": kind,
+                "priority": "deferred",
+                "status": RUNNING,
+                "created_at": now,
+                "updated_at": now,
+                "progress": {},
+                "result": None,
+                "error": None
+            }
+            await self.store.create(job)
+
+        async def _run() -> None:
+            try:
+                with deferred_priority():
+                    result = await generate()
+            except Exception as e:
+                print(f"❌ Deferred {kind} job {job['job_id']} failed: {str(e)}")
+                await self._record(
+                    job["job_id"], status=FAILED, error=_job_error(e, f"Deferred {kind}"), finished_at=time.time()
+                )
+                return
+            if await self._record(job["job_id"], status=SUCCEEDED, result=result, finished_at=time.time()):
+                print(f"✅ Deferred {kind} job {job['job_id']} completed in {time.time() - now:.0f}s")
+
+        task = asyncio.create_task(_run())
+        self._deferred.add(task)
+        task.add_done_callback(self._deferred.discard)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job record"""
+        return await self.store.get(job_id)
+
+    async def _record(self, job_id: str, **fields: Any) -> bool:
+        """Write job fields, logging (not raising) store errors; returns whether the write succeeded"""
+        try:
+            await self.store.update(job_id, **fields)
+            return True
+        except Exception as e:
+            print(f"⚠️  Could not record BOM job {job_id}: {str(e)}")
+            return False
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, images, description, yield_buffer = await self._queue.get()
+            try:
+                await self._run(job_id, images, description, yield_buffer)
+            except Exception as e:
+                # One job's failure must not take the worker down with it
+                print(f"❌ BOM job {job_id} failed: {str(e)}")
+                await self._record(job_id, status=FAILED, error=_job_error(e), finished_at=time.time())
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, images: List[Dict[str, Any]], description: str, yield_buffer: float) -> None:
+        start_time = time.time()
+        await self.store.update(job_id, status=RUNNING, started_at=start_time)
+        progress = {"completed_stages": [], "stage_timings": {}}
+
+        async def on_stage_complete(stage_name: str, stage_time: float, partial_bom: Dict[str, Any]) -> None:
+            progress["completed_stages"].append(stage_name)
+            progress["stage_timings"][stage_name] = stage_time
+            # Progress is best effort; a failed write shouldn't abort the pipeline
+            await self._record(job_id, progress=progress)
+
+        result = await self.bom_generator.generate(
+            images=images,
+            description=description,
+            yield_buffer=yield_buffer,
+            on_stage_complete=on_stage_complete
+        )
+
+        await self.store.update(
+            job_id,
+            status=SUCCEEDED,
+            finished_at=time.time(),
+            result={
+                "bom": result["bom"],
+                "confidence": result["confidence"],
+                "processing_time": round(time.time() - start_time, 2),
+                "stage_timings": result.get("stage_timings", {})
+            }
+        )
+        print(f"✅ BOM job {job_id} completed in {time.time() - start_time:.2f}s")
@@ -0,0 +1,269 @@
+"""
+Job Store - Persistent records for asynchronous BOM jobs
+SQLite store for local runs and a Redis store for shared deployments
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Set
+
+
+# Job lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class JobStore(ABC):
+    """
+    Interface for job persistence
+
+    Jobs are plain dictionaries with at least job_id, status, created_at,
+    updated_at and an optional idempotency_key. Stores shared between
+    processes hold a lease on each unfinished job, which the owning process
+    renews every lease_ttl / 3 seconds; jobs whose lease lapses are orphans.
+    """
+
+    # Lease length in seconds, or None when orphans are only recovered at start
+    lease_ttl: Optional[float] = None
+
+    @abstractmethod
+    async def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a job unless its idempotency key is already taken
+
+        Returns:
+            The stored job: `job` itself, or the existing job with the same key
+        """
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job by ID"""
+
+    @abstractmethod
+    async def update(self, job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Merge fields into a job and bump updated_at; returns the updated job"""
+
+    @abstractmethod
+    async def fail_unfinished(self, reason: str) -> int:
+        """Mark queued/running jobs no live process holds as failed; returns the count"""
+
+    async def renew(self) -> None:
+        """Extend the leases on unfinished jobs this process created"""
+
+    async def close(self) -> None:
+        """Release the underlying connection"""
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store backed by a local SQLite file
+
+    The file belongs to one process, so every unfinished job this store did
+    not create is an orphan.
+    """
+
+    def __init__(self, db_path: str):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bom_jobs ("
+            "job_id TEXT PRIMARY KEY, idempotency_key TEXT UNIQUE, status TEXT, "
+            "created_at REAL, updated_at REAL, data TEXT)"
+        )
+        self._db.commit()
+        self._lock = asyncio.Lock()
+        self._held: Set[str] = set()
+
+    async def _call(self, func: Any) -> Any:
+        """Run a SQLite operation off the event loop (one at a time)"""
+        async with self._lock:
+            return await asyncio.to_thread(func)
+
+    def _select(self, column: str, value: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(f"SELECT data FROM bom_jobs WHERE {column} = ?", (value,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        def _create():
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO bom_jobs (job_id, idempotency_key, status, created_at, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job["job_id"], job.get("idempotency_key"), job["status"],
+                 job["created_at"], job["updated_at"], json.dumps(job))
+            )
+            self._db.commit()
+            if cursor.rowcount == 0:
+                return self._select("idempotency_key", job["idempotency_key"])
+            self._held.add(job["job_id"])
+            return job
+
+        return await self._call(_create)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(lambda: self._select("job_id", job_id))
+
+    async def update(self, job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        def _update():
+            job = self._select("job_id", job_id)
+            if job is None:
+                return None
+            job.update(fields, updated_at=time.time())
+            self._db.execute(
+                "UPDATE bom_jobs SET status = ?, updated_at = ?, data = ? WHERE job_id = ?",
+                (job["status"], job["updated_at"], json.dumps(job), job_id)
+            )
+            self._db.commit()
+            if job["status"] in FINISHED_STATES:
+                self._held.discard(job_id)
+            return job
+
+        return await self._call(_update)
+
+    async def fail_unfinished(self, reason: str) -> int:
+        def _fail():
+            rows = self._db.execute(
+                "SELECT job_id FROM bom_jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            return [row[0] for row in rows if row[0] not in self._held]
+
+        job_ids = await self._call(_fail)
+        for job_id in job_ids:
+            await self.update(job_id, status=FAILED, error={"status_code": 500, "detail": reason})
+        return len(job_ids)
+
+    async def close(self) -> None:
+        self._db.close()
+
+
+class RedisJobStore(JobStore):
+    """
+    Job store backed by Redis (or any Redis-protocol server)
+
+    Unfinished jobs sit in a sorted set scored by lease expiry. Each replica
+    renews the leases on the jobs it created, so a replica that dies (or is
+    rescheduled under a new hostname) leaves jobs whose leases lapse, and
+    whichever replica sweeps next fails them.
+
+    Requires the optional `redis` package (pip install redis).
+    """
+
+    # Claims an idempotency key and inserts the job in one step, or returns
+    # the job that already holds the key
+    CREATE_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    local data = redis.call('GET', ARGV[4] .. existing)
+    if data then
+        return data
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[1])
+return false
+"""
+
+    def __init__(
+        self,
+        url: str,
+        prefix: str = "bom_job",
+        ttl: int = 7 * 24 * 3600,
+        lease_ttl: Optional[float] = None
+    ):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise ImportError("RedisJobStore requires the 'redis' package: pip install redis") from e
+
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.ttl = ttl
+        if lease_ttl is None:
+            lease_ttl = float(os.getenv("JOB_LEASE_TTL", "60"))
+        self.lease_ttl = lease_ttl
+        self._leases = f"{prefix}:leases"
+        self._held: Set[str] = set()
+        self._create = self._redis.register_script(self.CREATE_SCRIPT)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:{job_id}"
+
+    def _idempotency_key(self, key: str) -> str:
+        return f"{self.prefix}:idempotency:{key}"
+
+    async def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        lease = time.time() + self.lease_ttl
+        key = job.get("idempotency_key")
+        if key:
+            existing = await self._create(
+                keys=[self._idempotency_key(key), self._job_key(job["job_id"]), self._leases],
+                args=[job["job_id"], json.dumps(job), self.ttl, f"{self.prefix}:", lease]
+            )
+            if existing:
+                return json.loads(existing)
+        else:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.set(self._job_key(job["job_id"]), json.dumps(job), ex=self.ttl)
+                pipe.zadd(self._leases, {job["job_id"]: lease})
+                await pipe.execute()
+        self._held.add(job["job_id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = await self._redis.get(self._job_key(job_id))
+        return json.loads(data) if data else None
+
+    async def update(self, job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields, updated_at=time.time())
+        await self._redis.set(self._job_key(job_id), json.dumps(job), ex=self.ttl)
+        if job["status"] in FINISHED_STATES:
+            await self._redis.zrem(self._leases, job_id)
+            self._held.discard(job_id)
+        return job
+
+    async def renew(self) -> None:
+        if self._held:
+            lease = time.time() + self.lease_ttl
+            # xx: never resurrect a lease another replica already swept
+            await self._redis.zadd(self._leases, {job_id: lease for job_id in self._held}, xx=True)
+
+    async def fail_unfinished(self, reason: str) -> int:
+        job_ids = await self._redis.zrangebyscore(self._leases, "-inf", time.time())
+        failed = 0
+        for job_id in job_ids:
+            # Only the replica that removes the lease fails the job
+            if await self._redis.zrem(self._leases, job_id):
+                await self.update(job_id, status=FAILED, error={"status_code": 500, "detail": reason})
+                failed += 1
+        return failed
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_job_store(url: Optional[str] = None) -> JobStore:
+    """
+    Create a job store from a URL
+
+    Args:
+        url: "redis://..."/"rediss://..." for Redis, otherwise a SQLite file path
+            (defaults to JOB_STORE_URL, then ./bom_jobs.db)
+
+    Returns:
+        JobStore instance
+    """
+    url = url or os.getenv("JOB_STORE_URL") or "./bom_jobs.db"
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobStore(url)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteJobStore(url)
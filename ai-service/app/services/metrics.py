@@ -0,0 +1,137 @@
+"""
+Metrics - Prometheus instrumentation for LLM calls and API routes
+Series are labeled by the agent class making the call and the Groq model
+"""
+import functools
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# Agent class name for the LLM calls made in the current task (inherited by child tasks)
+_current_agent: ContextVar[str] = ContextVar("current_agent", default="none")
+
+LLM_LATENCY = Histogram(
+    "groq_llm_call_duration_seconds",
+    "Latency of Groq completion requests",
+    ["agent", "model", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+)
+LLM_TOKENS = Histogram(
+    "groq_llm_tokens",
+    "Tokens per completion, from response.usage",
+    ["agent", "model", "kind"],
+    buckets=(64, 256, 1024, 2048, 4096, 8192, 16384, 32768)
+)
+LLM_RETRIES = Counter(
+    "groq_llm_retries_total",
+    "Completion retries by cause (rate_limit, server_error, truncated)",
+    ["agent", "model", "cause"]
+)
+TRUNCATION_WASTE = Histogram(
+    "groq_truncation_wasted_tokens",
+    "Completion tokens discarded per truncated response, by recovery (continued, regenerated)",
+    ["agent", "model", "recovery"],
+    buckets=(0, 16, 64, 256, 1024, 4096, 8192, 16384, 32768)
+)
+JSON_REPAIR_FALLBACKS = Counter(
+    "groq_json_repair_fallbacks_total",
+    "Responses that needed JSON repair, by outcome (repaired, failed)",
+    ["agent", "outcome"]
+)
+RATE_LIMIT_WAIT = Histogram(
+    "groq_rate_limit_queue_wait_seconds",
+    "Time calls spent queued in the per-model rate limiter",
+    ["model"],
+    buckets=(0, 0.1, 0.5, 1, 2, 5, 10, 20, 30, 60)
+)
+COALESCED_CALLS = Counter(
+    "groq_coalesced_calls_total",
+    "Callers that joined an identical in-flight request instead of starting their own",
+    ["operation"]
+)
+CIRCUIT_STATE = Gauge(
+    "groq_circuit_state",
+    "Circuit breaker state per model (0 closed, 1 half-open, 2 open)",
+    ["model"]
+)
+CONCURRENCY_LIMIT = Gauge(
+    "groq_concurrency_limit",
+    "Adaptive concurrency limit per model",
+    ["model"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route",
+    ["method", "route", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120)
+)
+
+
+def current_agent() -> str:
+    """Agent label for calls made in the current context"""
+    return _current_agent.get()
+
+
+def track_agent(func: Callable) -> Callable:
+    """Label LLM metrics emitted inside an agent method with the agent's class name"""
+    @functools.wraps(func)
+    async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        token = _current_agent.set(type(self).__name__)
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            _current_agent.reset(token)
+    return wrapper
+
+
+def observe_llm_call(model: str, seconds: float, outcome: str) -> None:
+    """Record one completion request's latency (outcome: ok or the error type)"""
+    LLM_LATENCY.labels(current_agent(), model, outcome).observe(seconds)
+
+
+def observe_usage(model: str, usage: Optional[Any]) -> None:
+    """Record prompt/completion token counts from a response's usage block"""
+    if usage is None:
+        return
+    agent = current_agent()
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if value is not None:
+            LLM_TOKENS.labels(agent, model, kind.replace("_tokens", "")).observe(value)
+
+
+def record_retry(model: str, cause: str) -> None:
+    """Count a retried completion (cause: rate_limit, server_error or truncated)"""
+    LLM_RETRIES.labels(current_agent(), model, cause).inc()
+
+
+def observe_truncation_waste(model: str, recovery: str, tokens: int) -> None:
+    """Record the output discarded recovering one truncated response (recovery: continued or regenerated)"""
+    TRUNCATION_WASTE.labels(current_agent(), model, recovery).observe(tokens)
+
+
+def record_json_repair(outcome: str) -> None:
+    """Count a JSON-repair fallback (outcome: repaired or failed)"""
+    JSON_REPAIR_FALLBACKS.labels(current_agent(), outcome).inc()
+
+
+def record_coalesced(operation: str) -> None:
+    """Count a caller served by an identical request already in flight"""
+    COALESCED_CALLS.labels(operation).inc()
+
+
+def set_circuit_state(model: str, state: str) -> None:
+    """Publish a model's circuit breaker state (closed, half_open or open)"""
+    CIRCUIT_STATE.labels(model).set({"closed": 0, "half_open": 1, "open": 2}[state])
+
+
+def set_concurrency_limit(model: str, limit: int) -> None:
+    """Publish a model's current adaptive concurrency limit"""
+    CONCURRENCY_LIMIT.labels(model).set(limit)
+
+
+def observe_queue_wait(model: str, seconds: float) -> None:
+    """Record time spent waiting for rate-limit budget"""
+    RATE_LIMIT_WAIT.labels(model).observe(seconds)
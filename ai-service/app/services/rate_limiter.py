@@ -0,0 +1,332 @@
+"""
+Rate Limiter - Proactive per-model request/token budgets for Groq calls
+Token buckets for requests-per-minute and tokens-per-minute, calibrated from
+Groq's x-ratelimit-* response headers, that queue callers before a 429 happens
+"""
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.services.metrics import observe_queue_wait
+
+
+# Free-tier limits per model as (requests per minute, tokens per minute).
+# Response headers recalibrate the token budget at runtime.
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "default": (30, 6000),
+    "meta-llama/llama-4-scout-17b-16e-instruct": (30, 30000),
+    "llama-3.3-70b-versatile": (30, 12000),
+    "llama-3.1-8b-instant": (30, 6000),
+    "groq/compound-mini": (30, 70000),
+}
+
+# Rough prompt-size heuristics used before the real usage is known
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1024
+COMPLETION_ESTIMATE = 1024
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than the limiter allows"""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse Groq reset durations such as "7.66s", "2m59.56s" or "120ms"
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds, or None if the value is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse a "model=rpm:tpm,model=rpm:tpm" override string
+
+    Args:
+        spec: Override string (e.g. "llama-3.1-8b-instant=30:6000")
+
+    Returns:
+        Mapping of model to (rpm, tpm)
+    """
+    limits: Dict[str, Tuple[int, int]] = {}
+    if not spec:
+        return limits
+    for part in spec.split(","):
+        if "=" not in part or ":" not in part:
+            continue
+        model, values = part.rsplit("=", 1)
+        rpm, tpm = values.split(":", 1)
+        limits[model.strip()] = (int(rpm), int(tpm))
+    return limits
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_completion_tokens: int) -> int:
+    """
+    Estimate the tokens a completion will consume (prompt + expected output)
+
+    Args:
+        messages: Groq API message dicts (text or multimodal content)
+        max_completion_tokens: Completion token cap
+
+    Returns:
+        Estimated total tokens
+    """
+    chars = 0
+    images = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    images += 1
+                else:
+                    chars += len(part.get("text", ""))
+    prompt_tokens = chars // CHARS_PER_TOKEN + images * IMAGE_TOKENS
+    return prompt_tokens + min(max_completion_tokens, COMPLETION_ESTIMATE)
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket that may go negative
+
+    Reservations are taken immediately and the caller sleeps off the deficit,
+    so waiters are served in arrival order without holding a lock.
+    """
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available, counting reservations ahead"""
+        self.refill(now)
+        deficit = amount - self.level
+        return max(0.0, deficit / self.rate) if self.rate > 0 else float("inf")
+
+    def resize(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = min(self.level, per_minute)
+
+
+class ModelLimiter:
+    """Request and token buckets for one model, plus queue-wait statistics"""
+
+    def __init__(self, model: str, rpm: int, tpm: int, window: int = 1000):
+        self.model = model
+        self.requests = TokenBucket(rpm, rpm)
+        self.tokens = TokenBucket(tpm, tpm)
+        self.blocked_until = 0.0
+
+        self.queued = 0
+        self.acquired = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+        self._recent_waits: deque = deque(maxlen=window)
+
+    async def acquire(self, tokens: int, max_wait: float) -> int:
+        """
+        Reserve one request and `tokens` tokens, sleeping until they are available
+
+        Args:
+            tokens: Estimated tokens for the call
+            max_wait: Longest queue wait (seconds) before the call is shed
+
+        Returns:
+            Tokens actually reserved (clamped to the bucket capacity)
+
+        Raises:
+            RateLimitExceeded: If the projected wait exceeds max_wait
+        """
+        tokens = int(min(tokens, self.tokens.capacity))
+        now = time.monotonic()
+        wait = max(
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+            self.blocked_until - now
+        )
+        if wait > max_wait:
+            self.shed += 1
+            raise RateLimitExceeded(
+                f"Groq API rate limit for {self.model} would require waiting {wait:.1f}s "
+                f"(limit {max_wait:.0f}s); request shed"
+            )
+
+        self.requests.level -= 1
+        self.tokens.level -= tokens
+        if wait > 0:
+            self.queued += 1
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Give the reservation back to the callers queued behind us
+                self.requests.level += 1
+                self.tokens.level += tokens
+                raise
+            finally:
+                self.queued -= 1
+
+        self.acquired += 1
+        observe_queue_wait(self.model, wait)
+        self.total_wait += wait
+        self.max_observed_wait = max(self.max_observed_wait, wait)
+        self._recent_waits.append(wait)
+        return tokens
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """Correct the token bucket once the real usage is known"""
+        self.tokens.level += reserved - actual
+
+    def calibrate(self, headers: Mapping[str, str], rate_limited: bool = False) -> None:
+        """
+        Align the buckets with Groq's view of our remaining budget
+
+        Args:
+            headers: Response headers (x-ratelimit-*, retry-after)
+            rate_limited: Whether the response was a 429
+        """
+        now = time.monotonic()
+
+        limit_tokens = headers.get("x-ratelimit-limit-tokens")
+        if limit_tokens and limit_tokens.isdigit() and int(limit_tokens) != self.tokens.capacity:
+            self.tokens.resize(int(limit_tokens))
+
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_tokens and remaining_tokens.isdigit():
+            self.tokens.refill(now)
+            self.tokens.level = min(self.tokens.level, int(remaining_tokens))
+
+        # Request headers describe the daily quota; only act once it is spent
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        if remaining_requests == "0":
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+        if rate_limited:
+            retry_after = parse_duration(headers.get("retry-after")) or parse_duration(
+                headers.get("x-ratelimit-reset-tokens")
+            )
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        waits = sorted(self._recent_waits)
+
+        def _percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+        return {
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "available_requests": round(self.requests.level, 2),
+            "available_tokens": round(self.tokens.level),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+            "queued": self.queued,
+            "acquired": self.acquired,
+            "shed": self.shed,
+            "queue_wait_seconds": {
+                "total": round(self.total_wait, 3),
+                "mean": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+                "p50": _percentile(0.5),
+                "p95": _percentile(0.95),
+                "max": round(self.max_observed_wait, 3)
+            }
+        }
+
+
+class RateLimiter:
+    """
+    Shared per-model limiter for all Groq calls made through GroqService
+
+    Callers queue (sleep) until their model has request and token budget;
+    callers whose projected wait exceeds `max_wait` are shed immediately.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        max_wait: float = 30.0,
+        enabled: bool = True
+    ):
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self._models: Dict[str, ModelLimiter] = {}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Create a limiter configured from GROQ_RATE_LIMIT* environment variables"""
+        return cls(
+            limits=parse_limits(os.getenv("GROQ_RATE_LIMITS")),
+            max_wait=float(os.getenv("GROQ_RATE_LIMIT_MAX_WAIT", "30")),
+            enabled=os.getenv("GROQ_RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+        )
+
+    def for_model(self, model: str) -> ModelLimiter:
+        limiter = self._models.get(model)
+        if limiter is None:
+            rpm, tpm = self.limits.get(model, self.limits["default"])
+            limiter = ModelLimiter(model, rpm, tpm)
+            self._models[model] = limiter
+        return limiter
+
+    async def acquire(self, model: str, tokens: int) -> int:
+        """Reserve budget for one call; returns the tokens reserved (0 when disabled)"""
+        if not self.enabled:
+            return 0
+        return await self.for_model(model).acquire(tokens, self.max_wait)
+
+    def settle(self, model: str, reserved: int, actual: Optional[int]) -> None:
+        """Reconcile a reservation with the call's reported token usage"""
+        if self.enabled and actual is not None:
+            self.for_model(model).settle(reserved, actual)
+
+    def calibrate(self, model: str, headers: Optional[Mapping[str, str]], rate_limited: bool = False) -> None:
+        """Feed response headers for `model` back into its buckets"""
+        if self.enabled and headers:
+            self.for_model(model).calibrate(headers, rate_limited=rate_limited)
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget and queue-wait metrics per model"""
+        return {
+            "enabled": self.enabled,
+            "max_wait": self.max_wait,
+            "models": {model: limiter.stats() for model, limiter in self._models.items()}
+        }
@@ -0,0 +1,266 @@
+"""
+Response Cache - Content-addressed cache for Groq chat completions
+Bounded in-memory LRU tier with an optional SQLite tier that survives restarts
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+# Default TTLs (seconds) per cache namespace; 0 disables caching for that namespace
+DEFAULT_TTLS: Dict[str, float] = {
+    "default": 3600,
+    "web_search": 6 * 3600,
+    "market_forecast": 24 * 3600,
+    "price_forecast": 6 * 3600,
+    "material_price": 24 * 3600,
+    "supplier_recommendations": 24 * 3600,
+    "supplier_contact": 7 * 24 * 3600,
+    "revenue_projection": 24 * 3600,
+    "product_performance": 3600,
+    "marketing_campaigns": 24 * 3600,
+}
+
+
+def make_cache_key(params: Dict[str, Any]) -> str:
+    """
+    Build a canonical hash of the completion parameters that determine the output
+
+    Args:
+        params: Completion parameters (model, messages, temperature, ...)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    canonical = {
+        "model": params.get("model"),
+        "messages": params.get("messages"),
+        "temperature": params.get("temperature"),
+        "response_format": params.get("response_format"),
+        "max_completion_tokens": params.get("max_completion_tokens"),
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_ttls(spec: Optional[str]) -> Dict[str, float]:
+    """
+    Parse a "namespace=seconds,namespace=seconds" TTL override string
+
+    Args:
+        spec: Override string (e.g. "price_forecast=600,default=0")
+
+    Returns:
+        Mapping of namespace to TTL in seconds
+    """
+    ttls: Dict[str, float] = {}
+    if not spec:
+        return ttls
+    for part in spec.split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        ttls[name.strip()] = float(value)
+    return ttls
+
+
+class ResponseCache:
+    """
+    Two-tier cache for serialized completion responses
+
+    Memory tier: OrderedDict LRU capped at `max_entries` and at `max_bytes` of
+    UTF-8 encoded values (values larger than `max_bytes` only go to disk).
+    Disk tier: optional SQLite table, consulted on memory misses and promoted
+    back into memory on hit, capped at `max_disk_entries` rows. Entries expire
+    per namespace TTL; expired rows are deleted when read, when the table is
+    opened and every `prune_every` stores, which also trims the table back to
+    its cap (soonest-expiring rows first).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        db_path: Optional[str] = None,
+        ttls: Optional[Dict[str, float]] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_disk_entries: int = 100_000,
+        prune_every: int = 256
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = prune_every
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        # key -> (expires_at, value, encoded size in bytes)
+        self._memory: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._stores_since_prune = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, namespace TEXT, expires_at REAL, value TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+            self._prune()
+        self._db_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Create a cache configured from GROQ_CACHE_* environment variables"""
+        ttls = parse_ttls(os.getenv("GROQ_CACHE_TTLS"))
+        if os.getenv("GROQ_CACHE_DEFAULT_TTL") is not None:
+            ttls["default"] = float(os.getenv("GROQ_CACHE_DEFAULT_TTL"))
+        return cls(
+            max_entries=int(os.getenv("GROQ_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("GROQ_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            max_disk_entries=int(os.getenv("GROQ_CACHE_MAX_DISK_ENTRIES", "100000")),
+            db_path=os.getenv("GROQ_CACHE_DB_PATH") or None,
+            ttls=ttls
+        )
+
+    def ttl_for(self, namespace: Optional[str]) -> float:
+        """TTL in seconds for a namespace (falls back to the default TTL)"""
+        return self.ttls.get(namespace or "default", self.ttls.get("default", 0))
+
+    def _count(self, namespace: Optional[str], field: str) -> None:
+        stats = self._stats.setdefault(
+            namespace or "default",
+            {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        )
+        stats[field] += 1
+
+    async def get(self, key: str, namespace: Optional[str] = None) -> Optional[str]:
+        """
+        Look up a cached value
+
+        Args:
+            key: Cache key from make_cache_key
+            namespace: Endpoint namespace used for TTL and counters
+
+        Returns:
+            Serialized response, or None on miss/expiry
+        """
+        if self.ttl_for(namespace) <= 0:
+            return None
+
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value, _ = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._count(namespace, "memory_hits")
+                return value
+            self._forget(key)
+
+        if self._db is not None:
+            row = await self._db_call(
+                "SELECT expires_at, value FROM responses WHERE key = ?", (key,), fetch=True
+            )
+            if row and row[0] > now:
+                self._remember(key, row[0], row[1])
+                self._count(namespace, "disk_hits")
+                return row[1]
+            if row:
+                await self._db_call("DELETE FROM responses WHERE key = ? AND expires_at <= ?", (key, now))
+
+        self._count(namespace, "misses")
+        return None
+
+    async def set(self, key: str, value: str, namespace: Optional[str] = None) -> None:
+        """
+        Store a serialized response under its namespace TTL
+
+        Args:
+            key: Cache key from make_cache_key
+            value: Serialized response
+            namespace: Endpoint namespace used for TTL and counters
+        """
+        ttl = self.ttl_for(namespace)
+        if ttl <= 0:
+            return
+
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, value)
+        self._count(namespace, "stores")
+
+        if self._db is not None:
+            await self._db_call(
+                "INSERT OR REPLACE INTO responses (key, namespace, expires_at, value) VALUES (?, ?, ?, ?)",
+                (key, namespace or "default", expires_at, value)
+            )
+            self._stores_since_prune += 1
+            if self._stores_since_prune >= self.prune_every:
+                self._stores_since_prune = 0
+                async with self._db_lock:
+                    await asyncio.to_thread(self._prune)
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        self._forget(key)
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._memory[key] = (expires_at, value, size)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+            _, (_, _, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted
+
+    def _forget(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    def _prune(self) -> None:
+        """Delete expired rows, then the soonest-expiring rows over max_disk_entries"""
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        excess = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY expires_at LIMIT ?)",
+                (excess,)
+            )
+        self._db.commit()
+
+    async def _db_call(self, sql: str, args: tuple, fetch: bool = False) -> Any:
+        """Run a SQLite statement off the event loop (one at a time)"""
+        def _execute():
+            cursor = self._db.execute(sql, args)
+            if fetch:
+                return cursor.fetchone()
+            self._db.commit()
+            return None
+
+        async with self._db_lock:
+            return await asyncio.to_thread(_execute)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per namespace plus memory tier size"""
+        return {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "memory_bytes": self._memory_bytes,
+            "max_bytes": self.max_bytes,
+            "disk_enabled": self._db is not None,
+            "max_disk_entries": self.max_disk_entries,
+            "namespaces": {name: dict(counts) for name, counts in self._stats.items()}
+        }
+
+    def close(self) -> None:
+        """Close the disk tier"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,125 @@
+"""
+Single Flight - Coalesces identical concurrent requests into one in-flight call
+Callers with the same request key share the result of the first one
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict
+
+from app.services import metrics
+from app.services.deferred_batcher import is_deferred
+
+
+def request_key(operation: str, arguments: Dict[str, Any]) -> str:
+    """
+    Build the coalescing key for a request
+
+    Arguments are hashed exactly as given, in the same canonical JSON form as
+    response cache keys: requests that differ only in case or spacing can
+    produce different prompts, so they never share a result.
+
+    Args:
+        operation: Name of the coalesced operation (e.g. "market_forecast")
+        arguments: Call arguments by parameter name
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {"operation": operation, "deferred": is_deferred(), "arguments": arguments},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    In-flight request table
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive with the same key before it finishes await that task instead of
+    starting another. The task is shielded from any one caller being
+    cancelled and is only cancelled once every caller has gone. All callers
+    receive the same result object, which they must treat as read-only.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled: When False every call runs on its own
+        """
+        self.enabled = enabled
+        self._flights: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    @classmethod
+    def from_env(cls) -> "SingleFlight":
+        """Create a table configured from GROQ_SINGLE_FLIGHT_ENABLED"""
+        return cls(enabled=os.getenv("GROQ_SINGLE_FLIGHT_ENABLED", "true").lower() not in ("0", "false", "no"))
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], operation: str = "default") -> Any:
+        """
+        Run `fn` once for all concurrent callers with the same key
+
+        Args:
+            key: Request key (see request_key)
+            fn: Zero-argument coroutine function doing the work
+            operation: Metric label for coalesced callers
+
+        Returns:
+            The shared result (exceptions are shared too)
+        """
+        if not self.enabled:
+            return await fn()
+
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.create_task(fn())
+            flight = self._flights[key] = {"task": task, "callers": 0}
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            metrics.record_coalesced(operation)
+
+        flight["callers"] += 1
+        try:
+            return await asyncio.shield(flight["task"])
+        except asyncio.CancelledError:
+            if not flight["task"].done() and flight["callers"] == 1:
+                flight["task"].cancel()
+            raise
+        finally:
+            flight["callers"] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests in flight, leader calls and coalesced callers"""
+        return {"enabled": self.enabled, "in_flight": len(self._flights), **self._stats}
+
+
+def coalesce(operation: str) -> Callable:
+    """
+    Route a GroqService method through its `single_flight` table
+
+    The key is built from the bound call arguments (defaults applied) plus whether
+    the call is deferred, so deferred and interactive callers never share.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {name: value for name, value in bound.arguments.items() if name != "self"}
+            return await self.single_flight.do(
+                request_key(operation, arguments),
+                lambda: func(self, *args, **kwargs),
+                operation
+            )
+        return wrapper
+    return decorator
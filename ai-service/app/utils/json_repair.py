@@ -0,0 +1,203 @@
+"""
+JSON Repair Utilities
+Single-pass recovery of truncated or trailing-garbage JSON from LLM responses
+"""
+import json
+import os
+import re
+from typing import Any, Optional, Tuple
+
+
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+_LITERALS = ("true", "false", "null")
+_WHITESPACE = " \t\n\r"
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Shortest prefix/continuation overlap stitch_json treats as restated text
+MIN_RESTATED_OVERLAP = 8
+
+# Container parser states
+_KEY_OR_END = "key_or_end"      # just after '{'
+_KEY = "key"                    # after ',' in an object
+_COLON = "colon"                # after an object key
+_VALUE_OR_END = "value_or_end"  # just after '['
+_VALUE = "value"                # after ':' or after ',' in an array
+_COMMA_OR_END = "comma_or_end"  # after a complete member/element
+
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Return the longest valid JSON prefix of `text` with open containers closed
+
+    Scans the text once with an explicit container stack, remembering the
+    last position where the document could be cut and closed validly (after
+    a complete value). Strings are matched with a regex, so escapes and
+    braces inside strings never confuse the bracket tracking.
+
+    Args:
+        text: Raw (possibly truncated) JSON text; anything before the first
+            '{' or '[' is ignored
+
+    Returns:
+        Repaired JSON text, or None if no valid prefix exists
+    """
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos != -1]
+    if not starts:
+        return None
+    start = min(starts)
+
+    stack = []   # open container characters
+    states = []  # parser state per open container
+    safe_end = None
+    safe_closers = ""
+
+    i = start
+    n = len(text)
+    while i < n:
+        char = text[i]
+
+        if char in _WHITESPACE:
+            i += 1
+            continue
+
+        state = states[-1] if states else _VALUE
+        expecting_value = state in (_VALUE, _VALUE_OR_END)
+
+        if char in "{[":
+            if not expecting_value:
+                break
+            # Keep an empty container as a value for object members and the
+            # root, but drop array elements that never received any content
+            record = not stack or stack[-1] == "{"
+            stack.append(char)
+            states.append(_KEY_OR_END if char == "{" else _VALUE_OR_END)
+            i += 1
+            if record:
+                safe_end = i
+                safe_closers = "".join(_CLOSERS[c] for c in reversed(stack))
+            continue
+
+        if char in "}]":
+            if not stack or _CLOSERS[stack[-1]] != char or state not in (_KEY_OR_END, _VALUE_OR_END, _COMMA_OR_END):
+                break
+            stack.pop()
+            states.pop()
+            i += 1
+        elif char == '"':
+            match = _STRING.match(text, i)
+            if not match:
+                break  # truncated inside a string
+            i = match.end()
+            if state in (_KEY_OR_END, _KEY):
+                states[-1] = _COLON
+                continue
+            if not expecting_value:
+                break
+        elif char == ":":
+            if state != _COLON:
+                break
+            states[-1] = _VALUE
+            i += 1
+            continue
+        elif char == ",":
+            if state != _COMMA_OR_END:
+                break
+            states[-1] = _KEY if stack[-1] == "{" else _VALUE
+            i += 1
+            continue
+        elif expecting_value:
+            literal = next((lit for lit in _LITERALS if text.startswith(lit, i)), None)
+            if literal:
+                i += len(literal)
+            else:
+                match = _NUMBER.match(text, i)
+                # A number running into the end of the text may itself be cut off
+                if not match or match.end() >= n:
+                    break
+                i = match.end()
+        else:
+            break
+
+        # A value just completed
+        if not stack:
+            return text[start:i]
+        states[-1] = _COMMA_OR_END
+        safe_end = i
+        safe_closers = "".join(_CLOSERS[c] for c in reversed(stack))
+
+    if safe_end is None:
+        return None
+    return text[start:safe_end] + safe_closers
+
+
+def parse_json_prefix(text: str) -> Any:
+    """
+    Parse `text` as JSON, falling back to its longest repairable prefix
+
+    Args:
+        text: Raw (possibly truncated) JSON text
+
+    Returns:
+        Parsed JSON value
+
+    Raises:
+        ValueError: If no valid JSON prefix can be recovered
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    repaired = repair_json(text)
+    if repaired is None:
+        raise ValueError("No valid JSON prefix found")
+    return json.loads(repaired)
+
+
+def stitch_json(prefix: str, continuation: str, max_overlap: int = 256) -> Optional[Tuple[str, str]]:
+    """
+    Join a truncated JSON document with the model's continuation of it
+
+    Candidate joins are the plain join and joins that drop a repeated overlap
+    (the continuation restating the end of the prefix, longest overlap first).
+    The first candidate that parses wins. If none does, e.g. because the
+    continuation was itself cut off, the candidate whose repair cuts the
+    least off its continuation is used, provided it keeps the whole prefix; on a
+    tie an overlap of at least MIN_RESTATED_OVERLAP characters is taken to be
+    a restatement, a shorter one a coincidence.
+
+    Args:
+        prefix: Truncated JSON text
+        continuation: Text generated to resume `prefix` from its cut point
+        max_overlap: Longest repeated overlap to look for, in characters
+
+    Returns:
+        (valid JSON text, the raw join it came from without repair closers, to
+        resume from if the continuation was cut off), or None if the fragments
+        don't fit together
+    """
+    joins = [(0, prefix + continuation)]
+    for size in range(min(max_overlap, len(prefix), len(continuation)), 0, -1):
+        if prefix.endswith(continuation[:size]):
+            joins.append((size, prefix + continuation[size:]))
+    for _, joined in joins:
+        try:
+            json.loads(joined)
+            return joined, joined
+        except json.JSONDecodeError:
+            continue
+
+    start = min(pos for pos in (prefix.find("{"), prefix.find("["), len(prefix)) if pos != -1)
+    best = None
+    best_score = None
+    for size, joined in joins:
+        repaired = repair_json(joined)
+        if repaired is None or not repaired.startswith(prefix[start:]):
+            continue
+        # Characters the repair had to cut off the end of the join
+        lost = len(joined) - start - len(os.path.commonprefix([repaired, joined[start:]]))
+        score = (-lost, size if size >= MIN_RESTATED_OVERLAP else 0)
+        if best_score is None or score > best_score:
+            best, best_score = (repaired, joined), score
+    return best
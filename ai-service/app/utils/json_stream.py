@@ -0,0 +1,148 @@
+"""
+Incremental JSON Extraction
+Pulls finished categories[].items[] elements out of a JSON document while it is still streaming
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+
+
+class _Frame:
+    """An open JSON container while scanning"""
+
+    __slots__ = ("kind", "key", "index", "expect_key")
+
+    def __init__(self, kind: str):
+        self.kind = kind          # "{" or "["
+        self.key = None           # current member name (objects)
+        self.index = 0            # current element index (arrays)
+        self.expect_key = kind == "{"
+
+
+class CategoryItemExtractor:
+    """
+    Incrementally scans streamed JSON and returns each element of
+    `<container_key>[].<item_key>[]` as soon as its closing brace arrives
+
+    Only structural characters are tracked (brackets, strings, commas), so
+    each character is visited once regardless of how the text is chunked.
+    Scanning works on a window that starts at the open item (or the scan
+    position), so each chunk only copies text that is still needed; the full
+    document is kept as a list of chunks and joined on demand.
+    """
+
+    def __init__(self, container_key: str = "categories", item_key: str = "items"):
+        self.container_key = container_key
+        self.item_key = item_key
+        self._chunks: List[str] = []
+        self._window = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._item_start: Optional[int] = None
+        self._category_names: Dict[int, str] = {}
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Add streamed text and collect any items it completed
+
+        Args:
+            chunk: Next piece of the JSON document
+
+        Returns:
+            List of {"category", "category_index", "item"} dictionaries
+        """
+        self._chunks.append(chunk)
+        # Drop the scanned text no open item still needs
+        keep = self._pos if self._item_start is None else self._item_start
+        buffer = self._window[keep:] + chunk
+        if self._item_start is not None:
+            self._item_start -= keep
+        stack = self._stack
+        completed = []
+
+        i = self._pos - keep
+        n = len(buffer)
+        while i < n:
+            char = buffer[i]
+
+            if char == '"':
+                match = _STRING.match(buffer, i)
+                if not match:
+                    break  # string continues in a later chunk
+                frame = stack[-1] if stack else None
+                if frame is not None and frame.kind == "{" and frame.expect_key:
+                    frame.key = json.loads(match.group())
+                    frame.expect_key = False
+                elif self._at_category_name():
+                    self._category_names[stack[1].index] = json.loads(match.group())
+                i = match.end()
+                continue
+
+            if char == "{" or char == "[":
+                if char == "{" and self._in_items_array():
+                    self._item_start = i
+                stack.append(_Frame(char))
+            elif char == "}" or char == "]":
+                if stack:
+                    stack.pop()
+                if char == "}" and self._item_start is not None and self._in_items_array():
+                    item = self._decode(buffer[self._item_start:i + 1])
+                    if item is not None:
+                        category_index = stack[1].index
+                        completed.append({
+                            "category": self._category_names.get(category_index),
+                            "category_index": category_index,
+                            "item": item
+                        })
+                    self._item_start = None
+            elif char == "," and stack:
+                frame = stack[-1]
+                if frame.kind == "{":
+                    frame.expect_key = True
+                    frame.key = None
+                else:
+                    frame.index += 1
+            i += 1
+
+        self._window = buffer
+        self._pos = i
+        return completed
+
+    @property
+    def buffer(self) -> str:
+        """Everything fed so far"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def _in_items_array(self) -> bool:
+        """True when the innermost open container is a category's items array"""
+        stack = self._stack
+        return (
+            len(stack) == 4
+            and stack[0].kind == "{" and stack[0].key == self.container_key
+            and stack[1].kind == "["
+            and stack[2].kind == "{" and stack[2].key == self.item_key
+            and stack[3].kind == "["
+        )
+
+    def _at_category_name(self) -> bool:
+        """True when the next string is a category object's "category" value"""
+        stack = self._stack
+        return (
+            len(stack) == 3
+            and stack[0].kind == "{" and stack[0].key == self.container_key
+            and stack[1].kind == "["
+            and stack[2].kind == "{" and stack[2].key == "category" and not stack[2].expect_key
+        )
+
+    @staticmethod
+    def _decode(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
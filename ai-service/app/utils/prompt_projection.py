@@ -0,0 +1,72 @@
+"""
+Prompt Projection - Compact serialization of upstream agent results for prompts
+Each agent declares the fields it reads; everything else is dropped before the result is inlined
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+
+# A field spec maps each kept key to True (keep the value as is) or to a
+# nested spec, applied to a dict value or to every dict in a list value
+FieldSpec = Dict[str, Any]
+
+
+def project(value: Any, fields: FieldSpec) -> Any:
+    """
+    Keep only the declared fields of an agent result
+
+    Missing keys are skipped; list elements that are not dicts (e.g. a
+    component given as a plain string) are kept unchanged.
+
+    Args:
+        value: Upstream agent result (dict, or list of dicts)
+        fields: Field spec (see FieldSpec)
+
+    Returns:
+        The projected copy
+    """
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for key, spec in fields.items():
+        if key in value and value[key] not in (None, "", [], {}):
+            projected[key] = value[key] if spec is True else project(value[key], spec)
+    return projected
+
+
+def to_prompt_json(value: Any) -> str:
+    """Minified JSON for inlining into a prompt (no indentation, no ASCII escaping)"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def item_table(categories: Optional[List[Dict[str, Any]]], columns: List[str]) -> Dict[str, Any]:
+    """
+    Tabular form of a categories[].items[] material list
+
+    Item keys are listed once in "item_columns"; each item becomes a row of
+    values in that order (None where an item lacks the field).
+
+    Args:
+        categories: Material analysis categories
+        columns: Item fields to keep, in row order
+
+    Returns:
+        {"item_columns": [...], "categories": [{"category", "items": [[...], ...]}]}
+    """
+    return {
+        "item_columns": columns,
+        "categories": [
+            {
+                "category": category.get("category"),
+                "items": [
+                    [item.get(column) for column in columns]
+                    for item in category.get("items") or []
+                    if isinstance(item, dict)
+                ]
+            }
+            for category in categories or []
+            if isinstance(category, dict)
+        ]
+    }
@@ -0,0 +1,82 @@
+"""
+Async Client Benchmark
+Compares requests/second of the pooled async completion path against the
+legacy thread-offload path (asyncio.to_thread + sync client)
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_async_client --requests 400 --concurrency 16 64 128
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.mock_groq import run_mock_server
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+async def _run(call, total: int, concurrency: int) -> float:
+    """Issue `total` calls with at most `concurrency` in flight; return req/s"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one():
+        async with semaphore:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_one() for _ in range(total)])
+    return total / (time.perf_counter() - start)
+
+
+async def main(total: int, levels: list) -> None:
+    from app.services.groq_service import GroqService
+
+    service = GroqService()
+
+    def thread_offload():
+        return asyncio.to_thread(
+            service._retry_with_backoff,
+            lambda: service.client.chat.completions.create(
+                model=service.text_model,
+                messages=MESSAGES,
+                temperature=0.0,
+                max_completion_tokens=16
+            )
+        )
+
+    def native_async():
+        return service.chat_completion(
+            model=service.text_model,
+            messages=MESSAGES,
+            temperature=0.0,
+            max_completion_tokens=16
+        )
+
+    # Warm both connection pools
+    await thread_offload()
+    await native_async()
+
+    print(f"{'concurrency':>12} {'thread-offload req/s':>22} {'async req/s':>14} {'speedup':>8}")
+    for level in levels:
+        legacy = await _run(thread_offload, total, level)
+        pooled = await _run(native_async, total, level)
+        print(f"{level:>12} {legacy:>22.1f} {pooled:>14.1f} {pooled / legacy:>7.2f}x")
+
+    await service.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 128])
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock server response delay in seconds")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Measure the client path itself, not the free-tier request budget or
+    # the response cache (every request here is identical)
+    os.environ.setdefault("GROQ_RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("GROQ_CACHE_DEFAULT_TTL", "0")
+    with run_mock_server(args.port, latency=args.latency, items=1):
+        asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,85 @@
+"""
+Batch Results Benchmark
+Compares peak Python memory of reading a batch output file whole (the previous
+read/decode/split/list path) with BatchService.iter_batch_results_async, which
+parses one line at a time, for output files of increasing size
+
+The file is served over real HTTP by the mock Groq subprocess, so the numbers
+reflect what the service holds rather than what the transport buffers.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_batch_results --lines 10000 50000
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from app.services.batch_service import BatchService
+from benchmarks.mock_groq import run_mock_server
+
+
+def output_file(lines: int) -> bytes:
+    """A batch output file with one chat completion per line"""
+    content = json.dumps({"materials": [{"name": "Nylon 420D", "unit_cost": 4.2, "unit": "meter"}] * 4})
+    return "".join(
+        json.dumps({
+            "id": f"batch_req_{i}",
+            "custom_id": f"request-{i}",
+            "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}},
+            "error": None
+        }) + "\n"
+        for i in range(lines)
+    ).encode("utf-8")
+
+
+async def legacy_read(service: BatchService, file_id: str) -> int:
+    """The previous get_batch_results: whole body, decoded, split and listed"""
+    response = await service.async_client.files.content(file_id)
+    content = (await response.read()).decode("utf-8")
+    results = [json.loads(line) for line in content.strip().split("\n") if line]
+    return len(results)
+
+
+async def streamed_read(service: BatchService, file_id: str) -> int:
+    count = 0
+    async for _ in service.iter_batch_results_async(file_id):
+        count += 1
+    return count
+
+
+async def measure(fn, service: BatchService, file_id: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = await fn(service, file_id)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+async def main(sizes) -> None:
+    service = BatchService()
+    print(f"{'lines':>8} {'file MB':>8} {'legacy peak MB':>15} {'legacy s':>9} {'stream peak MB':>15} {'stream s':>9}")
+    for lines in sizes:
+        data = output_file(lines)
+        uploaded = await service.async_client.files.create(file=("output.jsonl", data), purpose="batch")
+        legacy_count, legacy_time, legacy_peak = await measure(legacy_read, service, uploaded.id)
+        stream_count, stream_time, stream_peak = await measure(streamed_read, service, uploaded.id)
+        assert legacy_count == stream_count == lines
+        print(
+            f"{lines:>8} {len(data) / 2**20:>8.1f} {legacy_peak / 2**20:>15.1f} {legacy_time:>9.2f}"
+            f" {stream_peak / 2**20:>15.2f} {stream_time:>9.2f}"
+        )
+    await service.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with run_mock_server(args.port, latency=0):
+        asyncio.run(main(args.lines))
@@ -0,0 +1,102 @@
+"""
+Batch Upload Benchmark
+Compares the previous temp-file upload path (json.dumps per line into a
+mkstemp file, reopened for upload and left behind by /batch/create) with
+BatchService.serialize_batch_requests, which builds the JSONL in memory
+(spilling to an unnamed temp file above BATCH_SPOOL_THRESHOLD_BYTES) and
+streams it to the Files API
+
+Uploads go over real HTTP to the mock Groq subprocess. The temp dir is
+listed before and after each run to show whether files were left behind.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_batch_upload --requests 10000 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from app.services.batch_service import BatchService
+from benchmarks.mock_groq import run_mock_server
+
+
+def batch_requests(service: BatchService, count: int):
+    """Chat completion batch requests shaped like a supplier catalog run"""
+    return service.create_chat_completion_batch_requests(
+        messages_list=[
+            [
+                {"role": "system", "content": "You are a sourcing analyst. Return JSON."},
+                {"role": "user", "content": f"Recommend suppliers for material #{i}: Nylon 420D, 1200 meter, waterproof"}
+            ]
+            for i in range(count)
+        ],
+        model="llama-3.1-8b-instant",
+        params_list=[{"temperature": 0.3, "max_completion_tokens": 700}] * count
+    )
+
+
+def legacy_create_batch_file(requests) -> str:
+    """The previous create_batch_file"""
+    fd, file_path = tempfile.mkstemp(suffix='.jsonl', prefix='batch_')
+    os.close(fd)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for req in requests:
+            f.write(json.dumps(req) + '\n')
+    return file_path
+
+
+async def legacy_upload(service: BatchService, requests):
+    start = time.perf_counter()
+    file_path = legacy_create_batch_file(requests)
+    serialized = time.perf_counter() - start
+    with open(file_path, 'rb') as f:
+        await service.async_client.files.create(file=f, purpose="batch")
+    return serialized, time.perf_counter() - start, os.path.getsize(file_path), file_path
+
+
+async def buffered_upload(service: BatchService, requests):
+    start = time.perf_counter()
+    buffer = service.serialize_batch_requests(requests)
+    serialized = time.perf_counter() - start
+    size = buffer.seek(0, os.SEEK_END)
+    buffer.seek(0)
+    try:
+        await service.upload_batch_file_async(buffer)
+    finally:
+        buffer.close()
+    return serialized, time.perf_counter() - start, size
+
+
+async def main(sizes) -> None:
+    service = BatchService()
+    temp_dir = tempfile.gettempdir()
+    print(f"{'requests':>9} {'path':>8} {'MB':>6} {'serialize s':>12} {'total s':>8} {'temp files left':>16}")
+    for count in sizes:
+        requests = batch_requests(service, count)
+
+        before = set(os.listdir(temp_dir))
+        serialized, total, size, leaked = await legacy_upload(service, requests)
+        left = len(set(os.listdir(temp_dir)) - before)
+        os.remove(leaked)
+        print(f"{count:>9} {'legacy':>8} {size / 2**20:>6.1f} {serialized:>12.3f} {total:>8.3f} {left:>16}")
+
+        for label, threshold in (("memory", 2**31), ("spilled", 0)):
+            service.spool_threshold = threshold
+            before = set(os.listdir(temp_dir))
+            serialized, total, size = await buffered_upload(service, requests)
+            left = len(set(os.listdir(temp_dir)) - before)
+            print(f"{count:>9} {label:>8} {size / 2**20:>6.1f} {serialized:>12.3f} {total:>8.3f} {left:>16}")
+    await service.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    with run_mock_server(args.port, latency=0):
+        asyncio.run(main(args.requests))
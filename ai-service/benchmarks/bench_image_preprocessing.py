@@ -0,0 +1,87 @@
+"""
+Image Preprocessing Benchmark
+Compares vision payload size and preparation latency for:
+- raw: base64 of the untouched upload (previous ProductAnalyzerAgent path)
+- full re-encode: full PIL decode + default JPEG save (previous analyze_product_images path)
+- prepared: draft-mode decode, EXIF transpose, downscale and recompress
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_image_preprocessing --width 4032 --height 3024 --images 4
+"""
+import argparse
+import asyncio
+import base64
+import os
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from app.services.image_preprocessor import ImagePreprocessor, prepare_image
+
+
+def make_photo(width: int, height: int, seed: int = 0) -> bytes:
+    """Synthesize a noisy, photo-like JPEG at high quality"""
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    photo = Image.blend(gradient, noise, 0.25 + seed * 0.01)
+    buffered = BytesIO()
+    photo.save(buffered, format="JPEG", quality=95)
+    return buffered.getvalue()
+
+
+def raw_path(data: bytes) -> int:
+    return len(f"data:image/jpeg;base64,{base64.b64encode(data).decode('utf-8')}")
+
+
+def full_reencode_path(data: bytes) -> int:
+    image = Image.open(BytesIO(data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG")
+    return len(f"data:image/jpeg;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}")
+
+
+def prepared_path(data: bytes) -> int:
+    prepared = prepare_image(data)
+    return len(f"data:{prepared['content_type']};base64,{base64.b64encode(prepared['data']).decode('utf-8')}")
+
+
+def measure(fn, uploads) -> tuple:
+    start = time.perf_counter()
+    payload = sum(fn(data) for data in uploads)
+    return payload, time.perf_counter() - start
+
+
+async def measure_pool(uploads, workers: int) -> tuple:
+    preprocessor = ImagePreprocessor(max_workers=workers, dedup_distance=-1)
+    images = [{"data": data, "filename": f"img{i}.jpg"} for i, data in enumerate(uploads)]
+    await preprocessor.prepare(images[:1])  # start worker processes outside the timing
+    start = time.perf_counter()
+    prepared = await preprocessor.prepare(images)
+    elapsed = time.perf_counter() - start
+    preprocessor.shutdown()
+    payload = sum(len(base64.b64encode(img["data"])) + 23 for img in prepared)
+    return payload, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    uploads = [make_photo(args.width, args.height, seed=i) for i in range(args.images)]
+    upload_mb = sum(len(data) for data in uploads) / 1e6
+    print(f"{args.images} uploads of {args.width}x{args.height}, {upload_mb:.1f} MB total\n")
+
+    print(f"{'path':<28} {'payload MB':>11} {'latency s':>10}")
+    for name, fn in [("raw base64", raw_path), ("full decode + re-encode", full_reencode_path), ("prepared (in-process)", prepared_path)]:
+        payload, elapsed = measure(fn, uploads)
+        print(f"{name:<28} {payload / 1e6:>11.2f} {elapsed:>10.3f}")
+
+    payload, elapsed = asyncio.run(measure_pool(uploads, args.workers))
+    print(f"{'prepared (process pool)':<28} {payload / 1e6:>11.2f} {elapsed:>10.3f}")
@@ -0,0 +1,88 @@
+"""
+JSON Repair Benchmark
+Compares the single-pass repairer (app.utils.json_repair) with the previous
+prefix-scanning fallback of GroqService._parse_json_response on truncated
+BOM-style LLM outputs of increasing size
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_json_repair --sizes 1000 10000 30000 100000 --legacy-max 30000
+"""
+import argparse
+import json
+import random
+import time
+
+from app.utils.json_repair import repair_json
+
+
+def legacy_repair(text: str):
+    """The previous fallback: try text[:i] for every i, closing braces then brackets"""
+    for i in range(len(text), 0, -1):
+        try:
+            partial = text[:i]
+            open_braces = partial.count('{') - partial.count('}')
+            open_brackets = partial.count('[') - partial.count(']')
+            if open_braces > 0 or open_brackets > 0:
+                partial += '}' * open_braces + ']' * open_brackets
+            return json.loads(partial)
+        except Exception:
+            continue
+    return None
+
+
+def truncated_bom(target_size: int, seed: int = 0) -> str:
+    """Pretty-printed material analysis cut off mid-item at roughly target_size chars"""
+    rng = random.Random(seed)
+    categories = []
+    text = ""
+    while len(text) < target_size * 1.2:
+        categories.append({
+            "category": f"Category {len(categories)}",
+            "items": [
+                {
+                    "name": f"Material {len(categories)}-{i} {{grade {rng.randint(1, 9)}}}",
+                    "type": rng.choice(["FABRIC", "HARDWARE", "NOTION"]),
+                    "specifications": {"details": "100% Cotton, \"Indigo\" dyed, [14oz]"},
+                    "estimated_quantity": round(rng.uniform(0.1, 20), 2),
+                    "unit": "meter",
+                    "unit_cost": round(rng.uniform(0.05, 30), 2),
+                }
+                for i in range(8)
+            ],
+        })
+        text = json.dumps({"categories": categories}, indent=2)
+    return text[:target_size]
+
+
+def count_items(parsed) -> int:
+    if not isinstance(parsed, dict):
+        return 0
+    return sum(len(c.get("items", [])) for c in parsed.get("categories", []) if isinstance(c, dict))
+
+
+def timed(fn, text):
+    start = time.perf_counter()
+    result = fn(text)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 30000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=30000, help="Skip the legacy path above this size")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'legacy ms':>10} {'legacy items':>13} {'single-pass ms':>15} {'items':>6}")
+    for size in args.sizes:
+        text = truncated_bom(size)
+
+        repaired, new_time = timed(repair_json, text)
+        new_items = count_items(json.loads(repaired)) if repaired else 0
+
+        if size <= args.legacy_max:
+            legacy, legacy_time = timed(legacy_repair, text)
+            legacy_cols = f"{legacy_time * 1000:>10.1f} {count_items(legacy):>13}"
+        else:
+            legacy_cols = f"{'skipped':>10} {'-':>13}"
+
+        print(f"{size:>8} {legacy_cols} {new_time * 1000:>15.2f} {new_items:>6}")
@@ -0,0 +1,135 @@
+"""
+Prompt Rendering Benchmark
+Per-call cost of building an agent's Groq messages with the prompt registry
+(app.agents.prompts.registry) versus the previous LangChain path
+(ChatPromptTemplate.format_messages, then converting message objects to
+{"role", "content"} dicts), plus the import time of each in a fresh interpreter
+
+The LangChain side is rebuilt from the registered template strings and needs
+langchain-core installed; without it only the registry is measured.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_prompt_render --calls 20000 --imports 5
+"""
+import argparse
+import importlib
+import os
+import pkgutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import app.agents.prompts as prompts_package
+from app.agents.prompts.registry import PROMPTS, ChatPrompt
+
+
+# The agents no longer import langchain_core, so its import time is what startup saves
+IMPORT_SNIPPETS = {
+    "langchain_core.prompts": "import langchain_core.prompts",
+    "app.agents (all agents + prompts)": "import app.agents"
+}
+
+
+def load_all_prompts() -> None:
+    for module in pkgutil.iter_modules(prompts_package.__path__):
+        importlib.import_module(f"{prompts_package.__name__}.{module.name}")
+
+
+def sample_values(prompt: ChatPrompt) -> Dict[str, Any]:
+    """Representative field values (numbers where a format spec needs one)"""
+    values: Dict[str, Any] = {}
+    for name in prompt.input_variables:
+        if name in ("bom_cost",):
+            values[name] = 42.5
+        elif name in ("weeks", "product_count", "quantity"):
+            values[name] = 12
+        else:
+            values[name] = f"sample {name} " * 20
+    return values
+
+
+def langchain_renderer(prompt: ChatPrompt) -> Optional[Callable[..., List[Dict[str, str]]]]:
+    try:
+        from langchain_core.prompts import (
+            ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+        )
+    except ImportError:
+        return None
+    template = ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(prompt.system.template),
+        HumanMessagePromptTemplate.from_template(prompt.human.template)
+    ])
+
+    def render(**values: Any) -> List[Dict[str, str]]:
+        messages = []
+        for msg in template.format_messages(**values):
+            if msg.type == "system":
+                messages.append({"role": "system", "content": msg.content})
+            elif msg.type == "human":
+                messages.append({"role": "user", "content": msg.content})
+        return messages
+
+    return render
+
+
+def per_call_us(render: Callable[..., Any], values: Dict[str, Any], calls: int) -> float:
+    render(**values)
+    start = time.perf_counter()
+    for _ in range(calls):
+        render(**values)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def import_seconds(snippet: str, runs: int) -> float:
+    """Median wall time of running `snippet` in a fresh interpreter"""
+    code = f"import time\nt = time.perf_counter()\n{snippet}\nprint(time.perf_counter() - t)"
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    timings = [
+        float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env).stdout)
+        for _ in range(runs)
+    ]
+    return statistics.median(timings)
+
+
+def main(args: argparse.Namespace) -> None:
+    load_all_prompts()
+    print(f"{'prompt':<30} {'langchain us':>13} {'registry us':>12} {'speedup':>8}")
+    totals = [0.0, 0.0]
+    for name, prompt in sorted(PROMPTS.items()):
+        values = sample_values(prompt)
+        registry_us = per_call_us(prompt.render, values, args.calls)
+        legacy = langchain_renderer(prompt)
+        if legacy is None:
+            print(f"{name:<30} {'-':>13} {registry_us:>12.2f} {'-':>8}")
+            continue
+        assert legacy(**values) == prompt.render(**values), name
+        legacy_us = per_call_us(legacy, values, args.calls // 10 or 1)
+        totals[0] += legacy_us
+        totals[1] += registry_us
+        print(f"{name:<30} {legacy_us:>13.2f} {registry_us:>12.2f} {legacy_us / registry_us:>7.0f}x")
+    if totals[1]:
+        print(f"{'all prompts (sum)':<30} {totals[0]:>13.2f} {totals[1]:>12.2f} {totals[0] / totals[1]:>7.0f}x")
+
+    start = time.perf_counter()
+    for prompt in PROMPTS.values():
+        ChatPrompt(prompt.name, prompt.system.template, prompt.human.template)
+    print(f"Compiling all {len(PROMPTS)} prompts: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    print()
+    print(f"{'import (fresh interpreter)':<34} {'median ms':>10}")
+    for label, snippet in IMPORT_SNIPPETS.items():
+        try:
+            seconds = import_seconds(snippet, args.imports)
+        except subprocess.CalledProcessError:
+            print(f"{label:<34} {'not installed':>10}")
+            continue
+        print(f"{label:<34} {seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000, help="Registry renders per prompt (LangChain runs a tenth)")
+    parser.add_argument("--imports", type=int, default=5, help="Fresh-interpreter import runs (median is reported)")
+    main(parser.parse_args())
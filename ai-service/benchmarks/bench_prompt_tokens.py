@@ -0,0 +1,152 @@
+"""
+Prompt Token Benchmark
+Measures the prompt size of the material, manufacturing and pricing stages
+when upstream results are inlined as pretty-printed JSON (the previous
+json.dumps(..., indent=2) of the whole result) versus the agents' compact
+per-stage projections, on recorded agent outputs. Compact pricing counts the
+prompts of all its item batches.
+
+Fixtures are benchmarks/fixtures/*.json files with "product_analysis" and
+"material_analysis" keys, plus the mock server's default response ("mock").
+Tokens are counted with tiktoken's cl100k_base when it is installed (close to
+the Llama 3 tokenizer), otherwise estimated from word/punctuation pieces.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_prompt_tokens
+    python -m benchmarks.bench_prompt_tokens --json prompt_tokens.json
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from app.agents.manufacturing_analyzer import ManufacturingAnalyzerAgent
+from app.agents.material_analyzer import MaterialAnalyzerAgent
+from app.agents.pricing_analyzer import PricingAnalyzerAgent
+from app.agents.prompts.manufacturing_analysis import manufacturing_analysis_prompt
+from app.agents.prompts.material_analysis import material_analysis_prompt
+from app.agents.prompts.pricing_analysis import pricing_analysis_prompt
+from app.services.response_cache import ResponseCache
+from benchmarks.mock_groq import default_content
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Approximates a BPE pre-tokenizer: words with their leading space, short digit runs, punctuation runs
+_PIECES = re.compile(r" ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]+|\s+")
+
+
+def _token_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken
+    except ImportError:
+        return lambda text: len(_PIECES.findall(text))
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
+
+class CapturingGroqService:
+    """GroqService stand-in that records each prompt and answers with an empty analysis"""
+
+    text_model = "llama-3.3-70b-versatile"
+
+    def __init__(self):
+        self.messages: List[Dict[str, Any]] = []
+        self.calls: List[List[Dict[str, Any]]] = []
+        # No material price index: every pricing batch builds its prompt
+        self.response_cache = ResponseCache(ttls={"material_price": 0})
+
+    async def chat_completion(self, messages, **kwargs):
+        self.messages = messages
+        self.calls.append(messages)
+        content = json.dumps({"categories": [{"category": "Captured", "items": []}]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")])
+
+    def _parse_json_response(self, response_text):
+        return json.loads(response_text)
+
+
+def load_fixtures() -> Dict[str, Dict[str, Any]]:
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            fixtures[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    mock = json.loads(default_content())
+    fixtures["mock"] = {"product_analysis": mock, "material_analysis": {"categories": mock["categories"]}}
+    return fixtures
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(message["content"] for message in messages)
+
+
+async def compact_prompts(product: Dict[str, Any], material: Dict[str, Any]) -> Dict[str, str]:
+    """Prompts exactly as the agents now build them"""
+    service = CapturingGroqService()
+    prompts = {}
+    # Keep the agents' progress prints out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        await MaterialAnalyzerAgent(service).analyze_materials(product, [])
+        prompts["material_analysis"] = _prompt_text(service.messages)
+        await ManufacturingAnalyzerAgent(service).analyze_manufacturing(product, material)
+        prompts["manufacturing_analysis"] = _prompt_text(service.messages)
+        calls = len(service.calls)
+        await PricingAnalyzerAgent(service).analyze_pricing(material)
+        # Pricing runs one call per item batch; count every batch's prompt
+        prompts["pricing_analysis"] = "\n".join(_prompt_text(messages) for messages in service.calls[calls:])
+    return prompts
+
+
+def pretty_prompts(product: Dict[str, Any], material: Dict[str, Any]) -> Dict[str, str]:
+    """The same prompts with whole upstream results pretty-printed"""
+    return {
+        "material_analysis": _prompt_text(material_analysis_prompt.render(
+            product_analysis=json.dumps(product, indent=2)
+        )),
+        "manufacturing_analysis": _prompt_text(manufacturing_analysis_prompt.render(
+            product_analysis=json.dumps(product, indent=2),
+            material_analysis=json.dumps(material, indent=2)
+        )),
+        "pricing_analysis": _prompt_text(pricing_analysis_prompt.render(
+            material_analysis=json.dumps(material, indent=2)
+        ))
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    count = _token_counter()
+    results = []
+    print(f"{'fixture':<14} {'stage':<24} {'pretty tok':>11} {'compact tok':>12} {'saved':>7} {'pretty chars':>13} {'compact chars':>14}")
+    for name, fixture in load_fixtures().items():
+        before = pretty_prompts(fixture["product_analysis"], fixture["material_analysis"])
+        after = await compact_prompts(fixture["product_analysis"], fixture["material_analysis"])
+        for stage in before:
+            row = {
+                "fixture": name,
+                "stage": stage,
+                "pretty_tokens": count(before[stage]),
+                "compact_tokens": count(after[stage]),
+                "pretty_chars": len(before[stage]),
+                "compact_chars": len(after[stage])
+            }
+            row["saved"] = round(1 - row["compact_tokens"] / row["pretty_tokens"], 3)
+            results.append(row)
+            print(f"{name:<14} {stage:<24} {row['pretty_tokens']:>11} {row['compact_tokens']:>12} {row['saved']:>7.1%} "
+                  f"{row['pretty_chars']:>13} {row['compact_chars']:>14}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="Write results to this file")
+    asyncio.run(main(parser.parse_args()))
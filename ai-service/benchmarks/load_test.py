@@ -0,0 +1,241 @@
+"""
+End-to-End Load Test
+Drives the AI service's HTTP endpoints against the mock Groq server at fixed
+concurrency levels and reports throughput, latency percentiles and event-loop lag
+
+The service runs in-process (ASGI transport, full lifespan) so event-loop lag
+is measured on the loop that serves requests; Groq calls go over real HTTP to
+the mock subprocess. Rate limiting and the response cache are disabled unless
+requested, so every request exercises the full pipeline.
+
+Usage (from ai-service/):
+    python -m benchmarks.load_test --scenarios bom market_forecast price_forecast batch \\
+        --concurrency 1 8 32 --requests 64 --latency 0.2 --latency-dist lognormal --rate-429 0.02
+    python -m benchmarks.load_test --json results.json   # save for regression comparison
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from io import BytesIO
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.mock_groq import add_mock_arguments, mock_options, run_mock_server
+
+LAG_INTERVAL = 0.01
+
+
+def _sample_image() -> bytes:
+    """A small synthetic product photo"""
+    from PIL import Image
+
+    image = Image.new("RGB", (1024, 768))
+    image.putdata([((x * 7) % 256, (y * 3) % 256, 128) for y in range(768) for x in range(1024)])
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG", quality=85)
+    return buffered.getvalue()
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a LAG_INTERVAL sleep"""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.samples.append(max(0.0, loop.time() - start - LAG_INTERVAL))
+
+    def start(self) -> None:
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> List[float]:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        return self.samples
+
+
+def build_scenarios(client: Any, image: bytes) -> Dict[str, Callable[[int], Awaitable[Any]]]:
+    """One coroutine factory per scenario; each call is a single measured operation"""
+
+    async def bom(i: int):
+        return await client.post(
+            "/api/v1/ai/generate-bom",
+            files={"images": (f"product-{i}.jpg", image, "image/jpeg")},
+            params={"description": f"Load test backpack #{i}"}
+        )
+
+    async def market_forecast(i: int):
+        return await client.post("/api/v1/ai/generate-market-forecast", json={
+            "product_name": f"Load test backpack #{i}",
+            "product_description": "Everyday nylon backpack",
+            "bom_materials": ["Nylon 420D", "YKK zipper", "Polyester webbing"]
+        })
+
+    async def dashboard(i: int):
+        # Every caller asks for the same product, as when several users open one dashboard
+        return await client.post("/api/v1/ai/generate-market-forecast", json={
+            "product_name": "Load test backpack",
+            "product_description": "Everyday nylon backpack",
+            "bom_materials": ["Nylon 420D", "YKK zipper", "Polyester webbing"]
+        })
+
+    async def price_forecast(i: int):
+        return await client.post("/api/v1/ai/generate-price-forecast", json={
+            "material_name": f"Nylon 420D lot {i}",
+            "material_type": "fabric",
+            "unit": "meter"
+        })
+
+    async def price_forecast_batch(i: int):
+        return await client.post("/api/v1/ai/generate-price-forecast/batch", json={"materials": [
+            {"material_name": f"{name} lot {i}", "material_type": material_type, "unit": unit}
+            for name, material_type, unit in (
+                ("Nylon 420D", "FABRIC", "meter"), ("Polyester lining", "FABRIC", "meter"),
+                ("Polyester webbing", "FABRIC", "meter"), ("YKK zipper", "HARDWARE", "piece"),
+                ("Side-release buckle", "HARDWARE", "piece"), ("Woven label", "TRIM", "piece")
+            )
+        ]})
+
+    async def batch(i: int):
+        requests = [
+            {
+                "custom_id": f"load-{i}-{n}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": "llama-3.1-8b-instant", "messages": [{"role": "user", "content": f"price {i}-{n}"}]}
+            }
+            for n in range(20)
+        ]
+        created = await client.post("/api/v1/batch/create", json=requests)
+        if created.status_code != 200:
+            return created
+        status = await client.get(f"/api/v1/batch/status/{created.json()['batch_id']}")
+        if status.status_code != 200 or not status.json().get("output_file_id"):
+            return status
+        return await client.get(f"/api/v1/batch/results/{status.json()['output_file_id']}")
+
+    return {
+        "bom": bom,
+        "market_forecast": market_forecast,
+        "dashboard": dashboard,
+        "price_forecast": price_forecast,
+        "price_forecast_batch": price_forecast_batch,
+        "batch": batch,
+    }
+
+
+async def run_level(operation: Callable[[int], Awaitable[Any]], total: int, concurrency: int) -> Dict[str, Any]:
+    """Run `total` operations with `concurrency` in flight and summarize them"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def _one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await operation(i)
+                ok = response.status_code < 400
+                outcome = str(response.status_code)
+            except Exception as e:
+                ok = False
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*[_one(i) for i in range(total)])
+    elapsed = time.perf_counter() - start
+    lag = await monitor.stop()
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput": round(total / elapsed, 2),
+        "p50": round(_percentile(latencies, 0.50), 4),
+        "p95": round(_percentile(latencies, 0.95), 4),
+        "p99": round(_percentile(latencies, 0.99), 4),
+        "mean": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+        "loop_lag_p99": round(_percentile(lag, 0.99), 4),
+        "loop_lag_max": round(max(lag), 4) if lag else 0.0,
+    }
+
+
+async def main(scenarios: List[str], levels: List[int], total: int) -> List[Dict[str, Any]]:
+    import httpx
+
+    from app.api.app import create_app
+
+    app = create_app()
+    image = _sample_image()
+    results = []
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://service", timeout=600) as client:
+            operations = build_scenarios(client, image)
+            # Warm up connection pools and lazy agents once per scenario
+            for name in scenarios:
+                await operations[name](-1)
+
+            print(f"{'scenario':<20} {'conc':>5} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} "
+                  f"{'lag p99 ms':>11} {'lag max ms':>11}  errors")
+            for name in scenarios:
+                for level in levels:
+                    summary = await run_level(operations[name], total, level)
+                    summary["scenario"] = name
+                    results.append(summary)
+                    print(f"{name:<20} {level:>5} {summary['throughput']:>8.2f} {summary['p50']:>8.3f} "
+                          f"{summary['p95']:>8.3f} {summary['p99']:>8.3f} {summary['loop_lag_p99'] * 1000:>11.1f} "
+                          f"{summary['loop_lag_max'] * 1000:>11.1f}  {summary['errors'] or '-'}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["bom", "market_forecast", "price_forecast", "batch"],
+                        choices=["bom", "market_forecast", "dashboard", "price_forecast", "price_forecast_batch", "batch"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="Operations per scenario and concurrency level")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the per-model rate limiter enabled")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--json", help="Write results to this file")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.rate_limit:
+        os.environ["GROQ_RATE_LIMIT_ENABLED"] = "false"
+    if not args.cache:
+        from app.services.response_cache import DEFAULT_TTLS
+        os.environ["GROQ_CACHE_TTLS"] = ",".join(f"{namespace}=0" for namespace in DEFAULT_TTLS)
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    os.environ.setdefault("JOB_STORE_URL", os.path.join(workdir, "jobs.db"))
+
+    with run_mock_server(args.port, **mock_options(args)):
+        results = asyncio.run(main(args.scenarios, args.concurrency, args.requests))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"mock": mock_options(args), "results": results}, f, indent=2)
+        print(f"Saved results to {args.json}")
@@ -0,0 +1,492 @@
+"""
+Mock Groq Endpoint
+Deterministic OpenAI/Groq-compatible stand-in for offline tests and benchmarks
+
+Serves chat completions (plain and streamed) plus the Files/Batches API
+subset used by BatchService. Latency follows a configurable distribution,
+and 429/500 errors and truncated JSON are injected at configurable rates.
+A request ending in an assistant message (prefill) gets the rest of the
+content after it, so truncated responses can be resumed.
+Every draw comes from an RNG seeded by (seed, request body, times that body
+was seen), so a run's outcomes do not depend on how requests interleave.
+
+Usage (from ai-service/):
+    python -m benchmarks.mock_groq --port 8765 --latency 0.2 --latency-dist lognormal \\
+        --rate-429 0.05 --rate-500 0.01 --truncate-rate 0.05 --seed 7
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# Size of each chunk when serving file content
+FILE_CHUNK_BYTES = 64 * 1024
+
+
+def default_content(items_per_category: int = 4) -> str:
+    """
+    One JSON document that satisfies every agent's response schema
+
+    Args:
+        items_per_category: Material items per BOM category (controls output size)
+
+    Returns:
+        JSON text
+    """
+    categories = []
+    for c, name in enumerate(("Shell Fabrication", "Trims & Hardware", "Labels & Packaging")):
+        categories.append({
+            "category": name,
+            "items": [
+                {
+                    "name": f"{name.split()[0]} material {i + 1}",
+                    "type": "MATERIAL",
+                    "estimated_quantity": 1 + i * 0.5,
+                    "unit": "piece",
+                    "unit_cost": round(0.75 + c + i * 0.25, 2),
+                    "specifications": {"grade": "A", "color": "black"},
+                    "source": "mock"
+                }
+                for i in range(items_per_category)
+            ]
+        })
+    payload = {
+        "product_category": "Backpack",
+        "product_name": "Mock Backpack",
+        "detected_components": ["main body", "straps", "zipper", "lining"],
+        "confidence": 0.9,
+        "categories": categories,
+        "manufacturing_processes": [{"process": "Cutting"}, {"process": "Sewing"}],
+        "assembly_steps": ["Cut panels", "Sew body", "Attach straps"],
+        "manufacturing_complexity": "medium",
+        "forecasts": [
+            {"country": country, "demand": 60 + i, "competition": 50, "price": 55, "growth": 52, "trend": "up"}
+            for i, country in enumerate(("United States", "Germany", "Japan", "India"))
+        ],
+        "suppliers": [
+            {"name": f"Mock Supplier {i + 1}", "country": "Vietnam", "rating": 4.5 - i * 0.1, "reliability": 90, "unitPrice": 2.5 + i}
+            for i in range(3)
+        ],
+        "weeks": [{"week": w + 1, "price": 10 + w * 0.1} for w in range(12)],
+        "campaigns": [{"name": "Launch", "channel": "social"}],
+        "projections": [{"month": m + 1, "revenue": 1000 * (m + 1)} for m in range(6)]
+    }
+    return json.dumps(payload, indent=2)
+
+
+class MockBehavior:
+    """Latency, fault and payload settings for the mock server"""
+
+    def __init__(
+        self,
+        latency: float = 0.1,
+        latency_dist: str = "fixed",
+        latency_spread: float = 0.5,
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        truncate_rate: float = 0.0,
+        retry_after: float = 1.0,
+        stream_chunk_chars: int = 24,
+        stream_chunk_delay: float = 0.0,
+        batch_delay: float = 0.0,
+        content: Optional[str] = None,
+        seed: int = 0
+    ):
+        """
+        Args:
+            latency: Fixed delay, or the distribution's mean (median for lognormal), in seconds
+            latency_dist: fixed, uniform (latency ± spread*latency), exponential or lognormal (sigma=spread)
+            latency_spread: Distribution width parameter
+            rate_429: Probability of answering 429 rate_limit_exceeded
+            rate_500: Probability of answering 500 internal_server_error
+            truncate_rate: Probability of cutting the JSON in half with finish_reason="length"
+            retry_after: retry-after header (seconds) sent with 429s
+            stream_chunk_chars: Characters per streamed delta
+            stream_chunk_delay: Delay between streamed deltas in seconds
+            batch_delay: Seconds a batch stays in_progress before completing
+            content: Assistant message content (defaults to default_content())
+            seed: RNG seed
+        """
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_dist}")
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.latency_spread = latency_spread
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.truncate_rate = truncate_rate
+        self.retry_after = retry_after
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_chunk_delay = stream_chunk_delay
+        self.batch_delay = batch_delay
+        self.content = content if content is not None else default_content()
+        self.seed = seed
+
+    def sample_latency(self, rng: random.Random) -> float:
+        if self.latency <= 0 or self.latency_dist == "fixed":
+            return max(0.0, self.latency)
+        if self.latency_dist == "uniform":
+            spread = self.latency * self.latency_spread
+            return max(0.0, rng.uniform(self.latency - spread, self.latency + spread))
+        if self.latency_dist == "exponential":
+            return rng.expovariate(1.0 / self.latency)
+        return rng.lognormvariate(math.log(self.latency), self.latency_spread)
+
+
+def _completion(model: str, content: str, finish_reason: str, prompt_chars: int) -> Dict[str, Any]:
+    prompt_tokens = max(1, prompt_chars // 4)
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": finish_reason
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def _error(status: int, message: str, error_type: str, code: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": error_type, "code": code}},
+        headers=headers
+    )
+
+
+def create_mock_app(latency: float = 0.1, content: Optional[str] = None, **options: Any) -> FastAPI:
+    """
+    Create the mock Groq app
+
+    Args:
+        latency: Response delay in seconds (see MockBehavior)
+        content: Assistant message content (defaults to default_content())
+        **options: Remaining MockBehavior settings
+
+    Returns:
+        FastAPI application (GET /stats reports per-outcome counters)
+    """
+    behavior = MockBehavior(latency=latency, content=content, **options)
+    app = FastAPI()
+    app.state.behavior = behavior
+    stats: Counter = Counter()
+    seen: Counter = Counter()
+    files: Dict[str, bytes] = {}
+    batches: Dict[str, Dict[str, Any]] = {}
+
+    def _rng_for(body: bytes) -> random.Random:
+        digest = hashlib.sha256(body).hexdigest()
+        seen[digest] += 1
+        return random.Random(f"{behavior.seed}:{digest}:{seen[digest]}")
+
+    def _ratelimit_headers() -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": "1000000",
+            "x-ratelimit-remaining-requests": "999999",
+            "x-ratelimit-limit-tokens": "10000000",
+            "x-ratelimit-remaining-tokens": "9999999",
+        }
+
+    def _prompt_chars(body: Dict[str, Any]) -> int:
+        return len(json.dumps(body.get("messages", [])))
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        raw = await request.body()
+        body = json.loads(raw)
+        rng = _rng_for(raw)
+        model = body.get("model", "mock")
+
+        # Draw every random decision up front so outcomes stay reproducible
+        delay = behavior.sample_latency(rng)
+        fault = rng.random()
+        truncate = rng.random() < behavior.truncate_rate
+        await asyncio.sleep(delay)
+
+        if fault < behavior.rate_429:
+            stats["rate_limited"] += 1
+            return _error(
+                429,
+                f"Rate limit reached for model `{model}` on tokens per minute (TPM). Please try again in {behavior.retry_after}s.",
+                "tokens", "rate_limit_exceeded",
+                headers={"retry-after": str(behavior.retry_after), "x-ratelimit-reset-tokens": f"{behavior.retry_after}s"}
+            )
+        if fault < behavior.rate_429 + behavior.rate_500:
+            stats["server_error"] += 1
+            return _error(500, "Internal Server Error", "internal_server_error", "internal_server_error")
+
+        content = behavior.content
+        messages = body.get("messages") or []
+        if messages and messages[-1].get("role") == "assistant":
+            prefill = messages[-1].get("content") or ""
+            if content.startswith(prefill):
+                content = content[len(prefill):]
+                stats["continued"] += 1
+        finish_reason = "stop"
+        if truncate:
+            content = content[:len(content) // 2]
+            finish_reason = "length"
+            stats["truncated"] += 1
+
+        if body.get("stream"):
+            stats["streamed"] += 1
+            return StreamingResponse(
+                _stream_chunks(model, content, finish_reason),
+                media_type="text/event-stream",
+                headers=_ratelimit_headers()
+            )
+
+        stats["ok"] += 1
+        return JSONResponse(_completion(model, content, finish_reason, _prompt_chars(body)), headers=_ratelimit_headers())
+
+    async def _stream_chunks(model: str, content: str, finish_reason: str):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def _chunk(delta: Dict[str, Any], reason: Optional[str]) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": reason}]
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        yield _chunk({"role": "assistant", "content": ""}, None)
+        step = max(1, behavior.stream_chunk_chars)
+        for start in range(0, len(content), step):
+            if behavior.stream_chunk_delay:
+                await asyncio.sleep(behavior.stream_chunk_delay)
+            yield _chunk({"content": content[start:start + step]}, None)
+        yield _chunk({}, finish_reason)
+        yield "data: [DONE]\n\n"
+
+    # --- Files / Batches API (subset used by BatchService) ---
+
+    @app.post("/openai/v1/files")
+    async def upload_file(file: UploadFile = File(...), purpose: str = Form("batch")):
+        data = await file.read()
+        file_id = f"file_{uuid.uuid4().hex}"
+        files[file_id] = data
+        stats["files_uploaded"] += 1
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": file.filename,
+            "purpose": purpose
+        }
+
+    @app.get("/openai/v1/files/{file_id}/content")
+    async def file_content(file_id: str):
+        if file_id not in files:
+            return _error(404, f"File {file_id} not found", "invalid_request_error", "not_found")
+        data = files[file_id]
+        # Chunked like the real Files API, so clients that stream can be measured
+        chunks = (data[start:start + FILE_CHUNK_BYTES] for start in range(0, len(data), FILE_CHUNK_BYTES))
+        return StreamingResponse(chunks, media_type="application/octet-stream")
+
+    def _run_batch(input_file_id: str) -> Dict[str, Any]:
+        """Answer every request line of a batch input file"""
+        output_lines: List[str] = []
+        error_lines: List[str] = []
+        for line in files.get(input_file_id, b"").decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request_line = json.loads(line)
+            raw = json.dumps(request_line.get("body", {}), sort_keys=True).encode("utf-8")
+            rng = _rng_for(raw)
+            rng.random()  # latency draw (batches do not sleep per request)
+            result = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request_line.get("custom_id")}
+            if rng.random() < behavior.rate_500:
+                result.update(response=None, error={"code": "internal_server_error", "message": "Internal Server Error"})
+                error_lines.append(json.dumps(result))
+                continue
+            body = request_line.get("body", {})
+            result.update(
+                response={
+                    "status_code": 200,
+                    "request_id": uuid.uuid4().hex,
+                    "body": _completion(body.get("model", "mock"), behavior.content, "stop", _prompt_chars(body))
+                },
+                error=None
+            )
+            output_lines.append(json.dumps(result))
+
+        counts = {"total": len(output_lines) + len(error_lines), "completed": len(output_lines), "failed": len(error_lines)}
+        output_file_id = f"file_{uuid.uuid4().hex}"
+        files[output_file_id] = ("\n".join(output_lines) + "\n").encode("utf-8") if output_lines else b""
+        error_file_id = None
+        if error_lines:
+            error_file_id = f"file_{uuid.uuid4().hex}"
+            files[error_file_id] = ("\n".join(error_lines) + "\n").encode("utf-8")
+        return {"output_file_id": output_file_id, "error_file_id": error_file_id, "request_counts": counts}
+
+    def _batch_view(batch: Dict[str, Any]) -> Dict[str, Any]:
+        view = dict(batch)
+        if time.time() >= batch["ready_at"]:
+            view.update(status="completed", completed_at=int(batch["ready_at"]), **batch["outcome"])
+        del view["ready_at"], view["outcome"]
+        return view
+
+    @app.post("/openai/v1/batches")
+    async def create_batch(body: Dict[str, Any]):
+        now = time.time()
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "errors": None,
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(now),
+            "in_progress_at": int(now),
+            "expires_at": int(now + 24 * 3600),
+            "completed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+            "ready_at": now + behavior.batch_delay,
+            "outcome": _run_batch(body["input_file_id"])
+        }
+        stats["batches_created"] += 1
+        return _batch_view(batches[batch_id])
+
+    @app.get("/openai/v1/batches/{batch_id}")
+    async def retrieve_batch(batch_id: str):
+        if batch_id not in batches:
+            return _error(404, f"Batch {batch_id} not found", "invalid_request_error", "not_found")
+        return _batch_view(batches[batch_id])
+
+    return app
+
+
+def wait_for_server(url: str, timeout: float = 15.0) -> None:
+    """Block until the mock server answers its health check"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/health")
+            return
+        except Exception:
+            time.sleep(0.1)
+    raise RuntimeError(f"Mock server at {url} did not start")
+
+
+@contextmanager
+def run_mock_server(port: int = 8765, **options: Any) -> Iterator[str]:
+    """
+    Run the mock in a subprocess and point GROQ_BASE_URL at it
+
+    Args:
+        port: Port to listen on
+        **options: CLI options (e.g. latency=0.2, rate_429=0.05)
+
+    Yields:
+        Base URL of the running server
+    """
+    command = [sys.executable, "-m", "benchmarks.mock_groq", "--port", str(port)]
+    for name, value in options.items():
+        if value is not None:
+            command += [f"--{name.replace('_', '-')}", str(value)]
+    server = subprocess.Popen(command)
+    base_url = f"http://127.0.0.1:{port}"
+    previous = os.environ.get("GROQ_BASE_URL")
+    try:
+        wait_for_server(base_url)
+        os.environ["GROQ_BASE_URL"] = base_url
+        os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait()
+        if previous is None:
+            os.environ.pop("GROQ_BASE_URL", None)
+        else:
+            os.environ["GROQ_BASE_URL"] = previous
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the mock behavior options to a CLI parser"""
+    parser.add_argument("--latency", type=float, default=0.1, help="Mean response delay in seconds")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-spread", type=float, default=0.5, help="Uniform half-width (fraction) or lognormal sigma")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of completions answered with 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Fraction of completions answered with 500")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Fraction of completions truncated (finish_reason=length)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--stream-chunk-chars", type=int, default=24)
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.0)
+    parser.add_argument("--batch-delay", type=float, default=0.0)
+    parser.add_argument("--items", type=int, default=4, help="Material items per category in the canned response")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def mock_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Collect parsed mock options as create_mock_app/run_mock_server keyword arguments"""
+    return {
+        "latency": args.latency,
+        "latency_dist": args.latency_dist,
+        "latency_spread": args.latency_spread,
+        "rate_429": args.rate_429,
+        "rate_500": args.rate_500,
+        "truncate_rate": args.truncate_rate,
+        "retry_after": args.retry_after,
+        "stream_chunk_chars": args.stream_chunk_chars,
+        "stream_chunk_delay": args.stream_chunk_delay,
+        "batch_delay": args.batch_delay,
+        "items": args.items,
+        "seed": args.seed
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    options = mock_options(args)
+    items = options.pop("items")
+    app = create_mock_app(content=default_content(items), **options)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,145 @@
+"""
+Batch manager tests
+"""
+import asyncio
+import io
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routers import batch as batch_router
+from app.services.batch_manager import BatchManager
+
+
+class ScriptedBatchService:
+    """BatchService stand-in whose batches walk through a scripted list of states"""
+
+    def __init__(self, states):
+        self.states = list(states)
+        self.retrieves = 0
+
+    def serialize_batch_requests(self, requests):
+        return io.BytesIO(b"".join(json.dumps(request).encode() + b"\n" for request in requests))
+
+    async def upload_batch_file_async(self, file):
+        return SimpleNamespace(id="file_in")
+
+    async def create_batch_job_async(self, input_file_id, endpoint="/v1/chat/completions", completion_window="24h"):
+        return self._batch("validating", {"total": 2, "completed": 0, "failed": 0})
+
+    async def get_batch_status_async(self, batch_id):
+        self.retrieves += 1
+        status, counts = self.states.pop(0) if len(self.states) > 1 else self.states[0]
+        return self._batch(status, counts)
+
+    async def get_batch_results_async(self, file_id):
+        return [{"custom_id": "request-1", "response": {"status_code": 200, "body": {}}}]
+
+    def _batch(self, status, counts):
+        return SimpleNamespace(
+            id="batch_1",
+            status=status,
+            endpoint="/v1/chat/completions",
+            input_file_id="file_in",
+            completion_window="24h",
+            output_file_id="file_out" if status == "completed" else None,
+            error_file_id=None,
+            created_at=0,
+            expires_at=86400,
+            completed_at=1 if status == "completed" else None,
+            request_counts=SimpleNamespace(model_dump=lambda: dict(counts)),
+            errors=None
+        )
+
+
+IDLE = ("in_progress", {"total": 2, "completed": 0, "failed": 0})
+HALF = ("in_progress", {"total": 2, "completed": 1, "failed": 0})
+DONE = ("completed", {"total": 2, "completed": 2, "failed": 0})
+
+
+@pytest.mark.asyncio
+async def test_interval_backs_off_while_idle_and_resets_on_progress():
+    service = ScriptedBatchService([IDLE, IDLE, IDLE, HALF])
+    manager = BatchManager(service, min_interval=1, max_interval=3, backoff=2)
+    record = await manager.submit([{"custom_id": "request-1"}])
+    watch = manager._watch[record["batch_id"]]
+
+    intervals = []
+    for _ in range(4):
+        await manager._poll(record["batch_id"])
+        intervals.append(watch["interval"])
+
+    # validating -> in_progress is progress; then idle doubles up to the cap
+    assert intervals == [1, 2, 3, 1]
+    assert record["request_counts"] == {"total": 2, "completed": 1, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_completion_runs_handlers_callback_and_waiters():
+    posted = []
+
+    def receive(request):
+        posted.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    service = ScriptedBatchService([IDLE, DONE])
+    manager = BatchManager(
+        service, min_interval=0.01, http_client=httpx.AsyncClient(transport=httpx.MockTransport(receive))
+    )
+    seen = []
+    manager.add_handler(lambda record: seen.append(("global", record["status"])))
+
+    async def on_complete(record):
+        seen.append(("own", record["status"]))
+
+    await manager.start()
+    record = await manager.submit([{"custom_id": "request-1"}], callback_url="http://hooks/batch", on_complete=on_complete)
+    finished = await asyncio.wait_for(manager.wait(record["batch_id"]), timeout=2)
+    for _ in range(100):
+        if posted:
+            break
+        await asyncio.sleep(0.01)
+
+    assert finished["status"] == "completed"
+    assert finished["output_file_id"] == "file_out"
+    assert seen == [("own", "completed"), ("global", "completed")]
+    assert posted[0]["event"] == "batch.completed"
+    assert posted[0]["batch"]["batch_id"] == "batch_1"
+    assert manager.stats()["polling"] == 0
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_process_batch_returns_results():
+    manager = BatchManager(ScriptedBatchService([DONE]), min_interval=0.01)
+    await manager.start()
+
+    result = await manager.process_batch([{"custom_id": "request-1"}], max_wait_time=2)
+
+    assert result["status"] == "completed"
+    assert result["results"][0]["custom_id"] == "request-1"
+    assert result["request_counts"]["completed"] == 2
+    await manager.stop()
+
+
+def test_status_route_is_served_from_the_registry(monkeypatch):
+    service = ScriptedBatchService([IDLE])
+    manager = BatchManager(service, min_interval=60)
+    monkeypatch.setattr(batch_router, "batch_manager", manager)
+    app = FastAPI()
+    app.include_router(batch_router.router)
+    client = TestClient(app)
+
+    created = client.post("/api/v1/batch/create", json=[{"custom_id": "request-1"}]).json()
+    first = client.get(f"/api/v1/batch/status/{created['batch_id']}").json()
+    second = client.get(f"/api/v1/batch/status/{created['batch_id']}").json()
+    refreshed = client.get(f"/api/v1/batch/status/{created['batch_id']}?refresh=true").json()
+
+    assert first["status"] == second["status"] == "validating"
+    assert refreshed["status"] == "in_progress"
+    assert service.retrieves == 1
+    assert client.get("/api/v1/batch/tracked").json()["stats"]["tracked"] == 1
@@ -0,0 +1,119 @@
+"""
+BatchService upload buffer and result streaming tests
+"""
+import io
+import json
+import os
+import tempfile
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from groq import AsyncGroq, DefaultAsyncHttpxClient, DefaultHttpxClient, Groq
+
+from app.api.routers import batch as batch_router
+from app.services.batch_service import BatchService
+from benchmarks.mock_groq import create_mock_app
+
+
+def _lines(count):
+    return [{"custom_id": f"request-{i}", "response": {"status_code": 200, "body": {"n": i}}} for i in range(count)]
+
+
+def _jsonl(lines):
+    return "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+
+
+def _service(monkeypatch, mock_app):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    service = BatchService()
+    service.async_client = AsyncGroq(
+        api_key="test-key",
+        base_url="http://mock-groq",
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(transport=httpx.ASGITransport(app=mock_app))
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_iter_results_filters_and_pages_across_chunks(monkeypatch):
+    service = _service(monkeypatch, create_mock_app(latency=0.0))
+    # Large enough to span several 64 KiB chunks of the mock's file stream
+    uploaded = await service.async_client.files.create(file=("out.jsonl", _jsonl(_lines(3000))), purpose="batch")
+
+    everything = [line async for line in service.iter_batch_results_async(uploaded.id)]
+    page = [line["custom_id"] async for line in service.iter_batch_results_async(uploaded.id, offset=1500, limit=3)]
+    picked = [
+        line["response"]["body"]["n"]
+        async for line in service.iter_batch_results_async(uploaded.id, custom_ids=["request-2999", "request-7"])
+    ]
+
+    assert len(everything) == 3000
+    assert everything[-1]["custom_id"] == "request-2999"
+    assert page == ["request-1500", "request-1501", "request-1502"]
+    assert picked == [7, 2999]
+    await service.aclose()
+
+
+def test_sync_results_stream_with_window(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    service = BatchService()
+    body = _jsonl(_lines(5)) + b"\n"
+    service.client = Groq(
+        api_key="test-key",
+        base_url="http://mock-groq",
+        http_client=DefaultHttpxClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)))
+    )
+
+    assert len(service.get_batch_results("file_out")) == 5
+    assert [line["custom_id"] for line in service.iter_batch_results("file_out", offset=3)] == ["request-3", "request-4"]
+    assert list(service.iter_batch_results("file_out", limit=0)) == []
+
+
+def test_results_route_streams_ndjson(monkeypatch):
+    mock_app = create_mock_app(latency=0.0)
+    service = _service(monkeypatch, mock_app)
+    monkeypatch.setattr(batch_router, "batch_service", service)
+    app = FastAPI()
+    app.include_router(batch_router.router)
+    client = TestClient(app)
+    mock_client = TestClient(mock_app)
+    file_id = mock_client.post(
+        "/openai/v1/files", files={"file": ("out.jsonl", _jsonl(_lines(10)))}, data={"purpose": "batch"}
+    ).json()["id"]
+
+    response = client.get(f"/api/v1/batch/results/{file_id}", params={"offset": 2, "limit": 2})
+    filtered = client.get(f"/api/v1/batch/results/{file_id}", params={"custom_id": ["request-9", "request-0"]})
+    missing = client.get("/api/v1/batch/results/file_missing")
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["custom_id"] for line in response.text.splitlines()] == ["request-2", "request-3"]
+    assert [json.loads(line)["custom_id"] for line in filtered.text.splitlines()] == ["request-0", "request-9"]
+    assert missing.status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_upload_buffer_spills_without_leaving_temp_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    service = _service(monkeypatch, create_mock_app(latency=0.0))
+    requests = service.create_chat_completion_batch_requests(
+        [[{"role": "user", "content": f"price {i}"}] for i in range(500)], model="llama-3.1-8b-instant"
+    )
+
+    in_memory = service.serialize_batch_requests(requests)
+    service.spool_threshold = 1024
+    spilled = service.serialize_batch_requests(requests)
+    assert isinstance(in_memory, io.BytesIO)
+    assert not isinstance(spilled, io.BytesIO)
+    assert os.listdir(tmp_path) == []
+
+    uploaded = await service.upload_batch_file_async(spilled)
+    spilled.close()
+    content = await (await service.async_client.files.content(uploaded.id)).read()
+
+    assert content == in_memory.getvalue()
+    assert json.loads(content.splitlines()[-1])["custom_id"] == "request-500"
+    assert os.listdir(tmp_path) == []
+    await service.aclose()
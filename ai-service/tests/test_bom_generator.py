@@ -1,47 +1,123 @@
 """
 AI Service tests
+End-to-end BOM generation through the real agents against the mock Groq server
 """
+import asyncio
+import time
+from io import BytesIO
+
+import httpx
 import pytest
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from app.agents.material_analyzer import MaterialAnalyzerAgent
 from app.models.bom_generator import BOMGenerator
-from app.services.vision_processor import VisionProcessor
-from app.services.material_classifier import MaterialClassifier
-from app.services.dimensional_analyzer import DimensionalAnalyzer
+from app.services.groq_service import GroqService
+from benchmarks.mock_groq import create_mock_app
 
 
-@pytest.fixture
-def bom_generator():
-    vision_processor = VisionProcessor()
-    material_classifier = MaterialClassifier()
-    dimensional_analyzer = DimensionalAnalyzer()
-    return BOMGenerator(
-        vision_processor=vision_processor,
-        material_classifier=material_classifier,
-        dimensional_analyzer=dimensional_analyzer
+def _jpeg() -> bytes:
+    buffered = BytesIO()
+    Image.new("RGB", (640, 480), (120, 80, 40)).save(buffered, format="JPEG")
+    return buffered.getvalue()
+
+
+def _generator(monkeypatch, mock_app) -> BOMGenerator:
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.setenv("GROQ_RATE_LIMIT_ENABLED", "false")
+    groq_service = GroqService()
+    groq_service.async_client = AsyncGroq(
+        api_key="test-key",
+        base_url="http://mock-groq",
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(transport=httpx.ASGITransport(app=mock_app))
     )
+    return BOMGenerator(groq_service)
+
 
+@pytest.fixture
+def images():
+    return [{"data": _jpeg(), "filename": "test.jpg", "content_type": "image/jpeg"}]
 
-def test_bom_generation(bom_generator):
+
+@pytest.mark.asyncio
+async def test_bom_generation(monkeypatch, images):
     """Test BOM generation"""
-    # Mock image data
-    images = [{
-        "data": b"fake_image_data",
-        "filename": "test.jpg",
-        "content_type": "image/jpeg"
-    }]
-    
-    # This would need proper mocking in production
-    # result = await bom_generator.generate(images, "denim jacket", 10.0)
-    # assert result["confidence"] > 0
-    # assert "bom" in result
-    pass
-
-
-def test_processing_time(bom_generator):
+    bom_generator = _generator(monkeypatch, create_mock_app(latency=0.0))
+
+    result = await bom_generator.generate(images, "denim jacket", 10.0)
+
+    assert result["confidence"] > 0
+    assert [c["category"] for c in result["bom"]["categories"]] == [
+        "Shell Fabrication", "Trims & Hardware", "Labels & Packaging"
+    ]
+    assert result["bom"]["total_cost"] > 0
+    assert set(result["stage_timings"]) == {
+        "product_analysis", "material_analysis", "manufacturing_analysis", "pricing_analysis"
+    }
+    await bom_generator.groq_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_processing_time(monkeypatch, images):
     """Test that BOM generation completes in <5 seconds"""
-    import time
+    bom_generator = _generator(monkeypatch, create_mock_app(latency=0.05))
+
     start = time.time()
-    # result = await bom_generator.generate(...)
-    # elapsed = time.time() - start
-    # assert elapsed < 5.0
-    pass
+    result = await bom_generator.generate(images, "denim jacket", 10.0)
+    elapsed = time.time() - start
+
+    assert result["bom"]["categories"]
+    assert elapsed < 5.0
+    await bom_generator.groq_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_bom_generation_survives_injected_faults(monkeypatch, images):
+    """Transient 500s are retried and truncated JSON still yields a BOM"""
+    real_sleep = asyncio.sleep
+
+    async def no_backoff(delay, *args, **kwargs):
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", no_backoff)
+    mock_app = create_mock_app(latency=0.0, rate_500=0.3, truncate_rate=0.3, seed=3)
+    bom_generator = _generator(monkeypatch, mock_app)
+
+    result = await bom_generator.generate(images, "denim jacket", 10.0)
+
+    assert result["bom"]["categories"]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app), base_url="http://mock-groq") as client:
+        stats = (await client.get("/stats")).json()
+    assert stats.get("server_error", 0) + stats.get("truncated", 0) > 0
+    await bom_generator.groq_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_truncated_material_analysis_is_resumed_not_regenerated(monkeypatch):
+    """Truncated output is continued from its cut point and stitched"""
+    mock_app = create_mock_app(latency=0.0, truncate_rate=1.0)
+    groq_service = _generator(monkeypatch, mock_app).groq_service
+    streamed = []
+    waste = {"agent": "MaterialAnalyzerAgent", "model": "llama-3.3-70b-versatile", "recovery": "continued"}
+    before = REGISTRY.get_sample_value("groq_truncation_wasted_tokens_count", waste) or 0
+
+    async def on_item(event):
+        streamed.append(event)
+
+    result = await MaterialAnalyzerAgent(groq_service).analyze_materials(
+        {"product_name": "Denim Jacket"}, [], on_item=on_item
+    )
 
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app), base_url="http://mock-groq") as client:
+        stats = (await client.get("/stats")).json()
+    # One request plus two continuations, each cut off in turn; nothing regenerated
+    assert stats["streamed"] == 3 and stats["continued"] == 2
+    items = [item["name"] for category in result["categories"] for item in category["items"]]
+    assert len(items) > 4
+    assert [event["item"]["name"] for event in streamed] == items
+    assert {event["attempt"] for event in streamed} == {1}
+    assert REGISTRY.get_sample_value("groq_truncation_wasted_tokens_count", waste) == before + 1
+    await groq_service.aclose()
@@ -0,0 +1,140 @@
+"""
+Circuit breaker and adaptive concurrency limiter tests
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+from app.api.routers import inference
+from app.services.circuit_breaker import (
+    CLOSED, FAILURE, HALF_OPEN, OK, OPEN, OVERLOAD,
+    CircuitBreaker, CircuitOpenError, ConcurrencyLimiter, ModelGuard
+)
+from app.services.groq_service import GroqService
+from benchmarks.mock_groq import create_mock_app
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.services.circuit_breaker.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("model-a", consecutive_failures=3, open_seconds=10, max_open_seconds=30)
+
+    for outcome in (FAILURE, OK, FAILURE, FAILURE):
+        breaker.before_call()
+        breaker.record(outcome)
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.record(FAILURE)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.check()
+    assert rejected.value.retry_after == 10
+
+    # One probe after the open period; a failed probe doubles the wait
+    now[0] += 10
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(FAILURE)
+    assert breaker.state == OPEN and breaker.retry_after() == 20
+
+    now[0] += 20
+    breaker.before_call()
+    breaker.record(OK)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["opened"] == 2
+
+
+def test_breaker_opens_on_failure_ratio_but_not_on_overload():
+    breaker = CircuitBreaker("model-a", failure_ratio=0.5, min_calls=6, consecutive_failures=100)
+
+    for _ in range(10):
+        breaker.before_call()
+        breaker.record(OVERLOAD)
+    assert breaker.state == CLOSED
+
+    for outcome in (FAILURE, OK) * 3:
+        breaker.before_call()
+        breaker.record(outcome)
+    assert breaker.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_limiter_backs_off_on_errors_and_queues_over_the_limit():
+    limiter = ConcurrencyLimiter("model-a", initial=4, min_limit=1, max_limit=8, cooldown=0)
+
+    await limiter.acquire()
+    limiter.release(0.5, OVERLOAD)
+    assert limiter.stats()["limit"] == 2
+
+    await limiter.acquire()
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done() and limiter.stats()["waiting"] == 1
+
+    limiter.release(0.5, OK, tokens=100)
+    await asyncio.wait_for(waiter, timeout=1)
+    assert limiter.stats()["in_flight"] == 2
+
+    # Much slower per token than the baseline counts as congestion
+    limiter.release(5.0, OK, tokens=100)
+    assert limiter.stats()["limit"] == 1
+    limiter.release(0.5, None)
+    assert limiter.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_upstream_and_uses_fallbacks(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def no_backoff(delay, *args, **kwargs):
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", no_backoff)
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.setenv("GROQ_RATE_LIMIT_ENABLED", "false")
+    mock_app = create_mock_app(latency=0.0, rate_500=1.0)
+    groq_service = GroqService()
+    groq_service.async_client = AsyncGroq(
+        api_key="test-key",
+        base_url="http://mock-groq",
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(transport=httpx.ASGITransport(app=mock_app))
+    )
+    groq_service.model_guard = ModelGuard(breaker_options={"consecutive_failures": 3, "open_seconds": 60})
+    messages = [{"role": "user", "content": "price"}]
+
+    async def server_errors():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app), base_url="http://mock-groq") as client:
+            return (await client.get("/stats")).json().get("server_error", 0)
+
+    # Retries stop as soon as the third failure opens the circuit
+    with pytest.raises(CircuitOpenError):
+        await groq_service.chat_completion("groq/compound-mini", messages, 0.2, 256, max_retries=5)
+    assert await server_errors() == 3
+
+    # Web search falls back to synthesis on the text model, which trips that circuit too
+    projection = await groq_service.generate_revenue_projection("Jacket", "Denim jacket", 20.0, ["USA"])
+    assert projection == groq_service._generate_fallback_revenue_projection(20.0)
+    assert await server_errors() == 6
+
+    monkeypatch.setattr(inference, "groq_service", groq_service)
+    app = FastAPI()
+    app.include_router(inference.router)
+    client = TestClient(app)
+    response = client.post("/api/v1/ai/generate-price-forecast", json={
+        "material_name": "Cotton", "material_type": "fabric", "unit": "kg"
+    })
+    health = client.get("/api/v1/ai/model-health").json()["data"]
+
+    assert response.status_code == 503
+    assert 0 < int(response.headers["Retry-After"]) <= 60
+    assert {model["circuit"]["state"] for model in health["models"].values()} == {OPEN}
+    assert await server_errors() == 6
+    await groq_service.aclose()
@@ -0,0 +1,198 @@
+"""
+Deferred Batch API lane tests
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.batch_manager import BatchManager
+from app.services.batch_service import BatchService
+from app.services.deferred_batcher import DeferredBatcher, DeferredBatchError, deferred_priority, is_deferred
+from app.services.groq_service import GroqService
+from app.services.job_queue import BOMJobQueue, QueueFullError
+from app.services.job_store import SQLiteJobStore
+
+
+def _completion(content):
+    return {
+        "id": "chatcmpl-batch",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "llama-3.1-8b-instant",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]
+    }
+
+
+class FakeBatchService:
+    """BatchService stand-in: batches complete on the second status check"""
+
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.batches = {}
+        self.files = {}
+        self.spool_threshold = 1 << 20
+
+    create_chat_completion_batch_requests = BatchService.create_chat_completion_batch_requests
+    serialize_batch_requests = BatchService.serialize_batch_requests
+
+    async def upload_batch_file_async(self, file):
+        file_id = f"file_{len(self.files)}"
+        self.files[file_id] = [json.loads(line) for line in file.read().splitlines()]
+        return SimpleNamespace(id=file_id)
+
+    async def create_batch_job_async(self, input_file_id, endpoint="/v1/chat/completions", completion_window="24h"):
+        batch_id = f"batch_{len(self.batches)}"
+        self.batches[batch_id] = {"requests": self.files[input_file_id], "checks": 0}
+        return SimpleNamespace(id=batch_id, status="validating")
+
+    async def get_batch_status_async(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["checks"] += 1
+        done = batch["checks"] >= 2
+        return SimpleNamespace(
+            id=batch_id,
+            status="completed" if done else "in_progress",
+            output_file_id=f"{batch_id}/out" if done else None,
+            error_file_id=f"{batch_id}/err" if done else None
+        )
+
+    async def iter_batch_results_async(self, file_id):
+        batch_id, kind = file_id.split("/")
+        lines = []
+        for request in self.batches[batch_id]["requests"]:
+            failed = request["custom_id"] in self.fail_ids or request["body"]["messages"][0]["content"] == "fail"
+            if failed != (kind == "err"):
+                continue
+            if failed:
+                lines.append({"custom_id": request["custom_id"], "response": {"status_code": 400, "body": {}},
+                              "error": {"message": "invalid request"}})
+            else:
+                echo = json.dumps({"echo": request["body"]["messages"][0]["content"], "temperature": request["body"]["temperature"]})
+                lines.append({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": _completion(echo)}})
+        for line in lines:
+            yield line
+
+
+def _batcher(service, **options):
+    manager = BatchManager(service, min_interval=0.01)
+    return manager, DeferredBatcher(manager, **options)
+
+
+def _params(content, model="llama-3.1-8b-instant"):
+    return {"model": model, "messages": [{"role": "user", "content": content}], "temperature": 0.3, "max_completion_tokens": 64}
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_flushes_one_batch_and_routes_by_custom_id():
+    service = FakeBatchService()
+    manager, batcher = _batcher(service, max_batch_size=3, max_wait=60)
+    await manager.start()
+
+    results = await asyncio.gather(*[batcher.complete(_params(f"req {i}")) for i in range(3)])
+
+    assert len(service.batches) == 1
+    assert [json.loads(r.choices[0].message.content)["echo"] for r in results] == ["req 0", "req 1", "req 2"]
+    assert json.loads(results[0].choices[0].message.content)["temperature"] == 0.3
+    assert batcher.stats()["completed"] == 3
+    await batcher.stop()
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_time_window_flushes_per_model_and_fails_errored_requests():
+    service = FakeBatchService()
+    manager, batcher = _batcher(service, max_batch_size=100, max_wait=0.05)
+    await manager.start()
+
+    ok, failed, other_model = await asyncio.gather(
+        batcher.complete(_params("fine")),
+        batcher.complete(_params("fail")),
+        batcher.complete(_params("70b", model="llama-3.3-70b-versatile")),
+        return_exceptions=True
+    )
+
+    assert len(service.batches) == 2
+    assert json.loads(ok.choices[0].message.content)["echo"] == "fine"
+    assert isinstance(failed, DeferredBatchError)
+    assert json.loads(other_model.choices[0].message.content)["echo"] == "70b"
+    await batcher.stop()
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_fails_buffered_callers():
+    _, batcher = _batcher(FakeBatchService(), max_wait=60)
+    waiting = asyncio.create_task(batcher.complete(_params("later")))
+    await asyncio.sleep(0)
+
+    await batcher.stop()
+
+    with pytest.raises(DeferredBatchError):
+        await waiting
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_takes_batch_lane_only_when_deferred(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    groq_service = GroqService()
+    manager, groq_service.deferred_batcher = _batcher(FakeBatchService(), max_batch_size=1)
+    await manager.start()
+
+    async def direct(params):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"echo": "direct"}'), finish_reason="stop")])
+
+    monkeypatch.setattr(groq_service, "_create_completion", direct)
+
+    interactive = await groq_service.chat_completion(**_params("now"))
+    with deferred_priority():
+        deferred = await groq_service.chat_completion(**_params("later"))
+
+    assert json.loads(interactive.choices[0].message.content)["echo"] == "direct"
+    assert json.loads(deferred.choices[0].message.content)["echo"] == "later"
+    await groq_service.deferred_batcher.stop()
+    await manager.stop()
+    await groq_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_deferred_job_records_result(tmp_path):
+    queue = BOMJobQueue(bom_generator=None, store=SQLiteJobStore(str(tmp_path / "jobs.db")))
+    seen = []
+
+    async def generate():
+        seen.append(is_deferred())
+        return {"forecasts": []}
+
+    job = await queue.submit_deferred("market_forecast", generate)
+    for _ in range(100):
+        stored = await queue.get(job["job_id"])
+        if stored["status"] == "succeeded":
+            break
+        await asyncio.sleep(0.01)
+
+    assert stored["kind"] == "market_forecast"
+    assert stored["result"] == {"forecasts": []}
+    assert seen == [True]
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_deferred_jobs_are_capped(tmp_path):
+    queue = BOMJobQueue(bom_generator=None, store=SQLiteJobStore(str(tmp_path / "jobs.db")), max_deferred=1)
+    release = asyncio.Event()
+
+    async def generate():
+        await release.wait()
+        return {"forecasts": []}
+
+    await queue.submit_deferred("market_forecast", generate)
+    with pytest.raises(QueueFullError):
+        await queue.submit_deferred("market_forecast", generate)
+
+    release.set()
+    await asyncio.sleep(0.05)
+    # A finished job frees its slot
+    await queue.submit_deferred("market_forecast", generate)
+    await queue.stop()
@@ -0,0 +1,277 @@
+"""
+GroqService tests
+"""
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+
+from app.services.groq_service import GroqService
+from app.services.rate_limiter import RateLimitExceeded
+
+
+class FakeCompletions:
+    """Async stand-in for client.chat.completions"""
+    
+    def __init__(self, failures=None):
+        self.failures = list(failures or [])
+        self.calls = []
+    
+    async def create(self, **params):
+        self.calls.append(params)
+        if self.failures:
+            raise self.failures.pop(0)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(
+                message=SimpleNamespace(content='{"ok": true}'),
+                finish_reason="stop"
+            )]
+        )
+
+
+@pytest.fixture
+def groq_service(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    return GroqService()
+
+
+class FakeRawResponse:
+    """Mimics the SDK's with_raw_response wrapper (headers + async parse)"""
+    
+    def __init__(self, result, headers=None):
+        self.result = result
+        self.headers = headers or {}
+    
+    async def parse(self):
+        return self.result
+
+
+def _use_fake_completions(service, completions, headers=None):
+    async def create_raw(**params):
+        return FakeRawResponse(await completions.create(**params), headers)
+    
+    completions.with_raw_response = SimpleNamespace(create=create_raw)
+    service.async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_uses_async_client(groq_service):
+    completions = FakeCompletions()
+    _use_fake_completions(groq_service, completions)
+    
+    response = await groq_service.chat_completion(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "user", "content": "hi"}],
+        temperature=0.3,
+        max_completion_tokens=64,
+        response_format={"type": "json_object"}
+    )
+    
+    assert response.choices[0].message.content == '{"ok": true}'
+    assert completions.calls[0]["model"] == "llama-3.1-8b-instant"
+    assert completions.calls[0]["response_format"] == {"type": "json_object"}
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_retries_rate_limit_without_blocking(groq_service, monkeypatch):
+    completions = FakeCompletions(failures=[Exception("Error code: 429 - rate limit")])
+    _use_fake_completions(groq_service, completions)
+    
+    sleeps = []
+    
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+    
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr("time.sleep", lambda _: pytest.fail("time.sleep called on the event loop"))
+    
+    response = await groq_service.chat_completion(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "user", "content": "hi"}],
+        temperature=0.3,
+        max_completion_tokens=64
+    )
+    
+    assert response.choices[0].finish_reason == "stop"
+    assert len(completions.calls) == 2
+    assert "response_format" not in completions.calls[0]
+    assert len(sleeps) == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_serves_repeats_from_cache(groq_service):
+    from groq.types.chat import ChatCompletion
+    
+    class CountingCompletions:
+        calls = 0
+        
+        async def create(self, **params):
+            CountingCompletions.calls += 1
+            return ChatCompletion.model_validate({
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": params["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": '{"ok": true}'},
+                    "finish_reason": "stop"
+                }]
+            })
+    
+    _use_fake_completions(groq_service, CountingCompletions())
+    kwargs = dict(
+        model="groq/compound-mini",
+        messages=[{"role": "user", "content": "Cotton"}],
+        temperature=0.6,
+        max_completion_tokens=1024,
+        cache_namespace="price_forecast"
+    )
+    
+    first = await groq_service.chat_completion(**kwargs)
+    second = await groq_service.chat_completion(**kwargs)
+    
+    assert CountingCompletions.calls == 1
+    assert second.choices[0].message.content == first.choices[0].message.content
+    assert groq_service.response_cache.stats()["namespaces"]["price_forecast"]["memory_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_json_items_yields_items_before_completion(groq_service):
+    content = json.dumps({"categories": [{"category": "Shell", "items": [{"name": "Nylon"}, {"name": "Mesh"}]}]})
+    pieces = [content[i:i + 7] for i in range(0, len(content), 7)]
+    
+    class StreamingCompletions:
+        params = None
+        
+        async def create(self, **params):
+            StreamingCompletions.params = params
+            
+            async def chunks():
+                for piece in pieces:
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")])
+            
+            return chunks()
+    
+    _use_fake_completions(groq_service, StreamingCompletions())
+    
+    events = [
+        event async for event in groq_service.stream_json_items(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": "materials"}],
+            temperature=0.3,
+            max_completion_tokens=1024,
+            response_format={"type": "json_object"}
+        )
+    ]
+    
+    assert StreamingCompletions.params["stream"] is True
+    assert [e["item"]["name"] for e in events if e["type"] == "item"] == ["Nylon", "Mesh"]
+    assert events[-1] == {"type": "done", "content": content, "finish_reason": "stop"}
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_calibrates_limiter_and_does_not_retry_shed_calls(groq_service):
+    completions = FakeCompletions()
+    _use_fake_completions(groq_service, completions, headers={"x-ratelimit-remaining-tokens": "0"})
+    kwargs = dict(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "user", "content": "hi"}],
+        temperature=0.3,
+        max_completion_tokens=64
+    )
+    groq_service.rate_limiter.max_wait = 0.1
+    
+    await groq_service.chat_completion(**kwargs)
+    with pytest.raises(RateLimitExceeded):
+        await groq_service.chat_completion(**{**kwargs, "messages": [{"role": "user", "content": "again"}]})
+    
+    assert len(completions.calls) == 1
+    assert groq_service.rate_limiter.stats()["models"]["llama-3.1-8b-instant"]["shed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_calls_return_their_token_reservation(groq_service):
+    completions = FakeCompletions(failures=[RuntimeError("boom")])
+    _use_fake_completions(groq_service, completions)
+    limiter = groq_service.rate_limiter.for_model("llama-3.1-8b-instant")
+    capacity = limiter.tokens.capacity
+    
+    with pytest.raises(RuntimeError):
+        await groq_service.chat_completion(
+            model="llama-3.1-8b-instant",
+            messages=[{"role": "user", "content": "hi"}],
+            temperature=0.3,
+            max_completion_tokens=4096
+        )
+    
+    assert limiter.tokens.level >= capacity
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_model_guard_until_it_fails_midway(groq_service):
+    import groq
+    import httpx
+    
+    class FailingStreamCompletions:
+        async def create(self, **params):
+            async def chunks():
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content='{"a"'), finish_reason=None)])
+                raise groq.APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+            
+            return chunks()
+    
+    _use_fake_completions(groq_service, FailingStreamCompletions())
+    model = "llama-3.3-70b-versatile"
+    stream = groq_service.stream_chat_completion(
+        model=model,
+        messages=[{"role": "user", "content": "materials"}],
+        temperature=0.3,
+        max_completion_tokens=1024
+    )
+    
+    await stream.__anext__()
+    # The concurrency slot is held while chunks are still arriving
+    assert groq_service.model_guard.limiter(model).stats()["in_flight"] == 1
+    assert groq_service.model_guard.breaker(model).stats()["window_calls"] == 0
+    
+    with pytest.raises(groq.APIConnectionError):
+        await stream.__anext__()
+    
+    assert groq_service.model_guard.limiter(model).stats()["in_flight"] == 0
+    assert groq_service.model_guard.breaker(model).stats()["window_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_carries_the_trimmed_join_into_the_next_continuation(groq_service):
+    full = json.dumps({"categories": [
+        {"category": f"Category {c}", "items": [{"name": f"Item {c}.{i}", "unit_cost": i + 0.5} for i in range(6)]}
+        for c in range(3)
+    ]})
+    first_cut, second_cut = len(full) // 3, 2 * len(full) // 3
+    # The first continuation restates the end of the partial and is cut off again
+    pieces = [(full[first_cut - 15:second_cut], "length"), (full[second_cut:], "stop")]
+    
+    class ContinuingCompletions:
+        calls = []
+        
+        async def create(self, **params):
+            ContinuingCompletions.calls.append(params["messages"][-1]["content"])
+            content, finish_reason = pieces.pop(0)
+            return SimpleNamespace(choices=[SimpleNamespace(
+                message=SimpleNamespace(content=content), finish_reason=finish_reason
+            )])
+    
+    _use_fake_completions(groq_service, ContinuingCompletions())
+    
+    result = await groq_service.resume_truncated_json(
+        model="llama-3.3-70b-versatile",
+        messages=[{"role": "user", "content": "materials"}],
+        partial=full[:first_cut],
+        temperature=0.3,
+        max_completion_tokens=1024
+    )
+    
+    assert ContinuingCompletions.calls == [full[:first_cut], full[:second_cut]]
+    assert result["categories"] == json.loads(full)["categories"]
@@ -0,0 +1,64 @@
+"""
+ImagePreprocessor tests
+"""
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.services.image_preprocessor import ImagePreprocessor, prepare_image
+
+
+def _jpeg(width, height, color=(200, 30, 30), orientation=None):
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    image.paste(color, (0, 0, width // 4, height // 4))
+    buffered = BytesIO()
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffered, format="JPEG", quality=95, exif=exif)
+    else:
+        image.save(buffered, format="JPEG", quality=95)
+    return buffered.getvalue()
+
+
+def test_prepare_image_downscales_and_recompresses():
+    data = _jpeg(4000, 3000)
+    prepared = prepare_image(data, max_dimension=1024, quality=80)
+    
+    assert max(prepared["width"], prepared["height"]) == 1024
+    assert prepared["content_type"] == "image/jpeg"
+    assert len(prepared["data"]) < len(data)
+
+
+def test_prepare_image_applies_exif_orientation():
+    # Orientation 6 = rotate 90° clockwise on display
+    prepared = prepare_image(_jpeg(800, 400, orientation=6), max_dimension=512)
+    assert (prepared["width"], prepared["height"]) == (256, 512)
+
+
+def test_prepare_image_webp():
+    prepared = prepare_image(_jpeg(600, 400), max_dimension=300, image_format="WEBP")
+    assert prepared["content_type"] == "image/webp"
+    assert Image.open(BytesIO(prepared["data"])).format == "WEBP"
+
+
+@pytest.mark.asyncio
+async def test_prepare_deduplicates_near_identical_shots():
+    preprocessor = ImagePreprocessor(max_dimension=256, max_workers=1)
+    try:
+        images = [
+            {"data": _jpeg(1200, 900), "filename": "front.jpg"},
+            {"data": _jpeg(1210, 905), "filename": "front-again.jpg"},
+            {"data": b"not an image", "filename": "broken.bin", "content_type": "image/heic"},
+            {"url": "https://example.com/back.jpg"},
+        ]
+        prepared = await preprocessor.prepare(images)
+    finally:
+        preprocessor.shutdown()
+    
+    filenames = [img.get("filename") for img in prepared]
+    assert filenames == ["front.jpg", "broken.bin", None]
+    assert prepared[0]["original_bytes"] > len(prepared[0]["data"])
+    # Undecodable uploads pass through untouched
+    assert prepared[1]["data"] == b"not an image"
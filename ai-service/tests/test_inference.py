@@ -0,0 +1,162 @@
+"""
+Inference router tests
+"""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routers import inference
+
+
+class FakeBOMGenerator:
+    """BOMGenerator stand-in that reports two stages then finishes"""
+    
+    def __init__(self, error=None):
+        self.error = error
+    
+    async def generate(self, images, description="", yield_buffer=10.0, on_stage_complete=None, on_material_item=None):
+        if on_stage_complete:
+            await on_stage_complete("product_analysis", 0.5, {"categories": [], "total_cost": 0})
+        if on_material_item:
+            await on_material_item({"category": "Shell", "category_index": 0, "item": {"name": "Nylon"}, "attempt": 1})
+            await on_stage_complete("material_analysis", 1.5, {"categories": [{"category": "Shell", "items": []}], "total_cost": 0})
+        if self.error:
+            raise self.error
+        return {
+            "bom": {"categories": [{"category": "Shell", "items": []}], "total_cost": 12.5},
+            "confidence": 0.9,
+            "stage_timings": {"product_analysis": 0.5, "material_analysis": 1.5}
+        }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app = FastAPI()
+    app.include_router(inference.router)
+    monkeypatch.setattr(inference, "bom_generator", FakeBOMGenerator())
+    return TestClient(app)
+
+
+def _events(body):
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        parsed.append((lines["event"], json.loads(lines["data"])))
+    return parsed
+
+
+def _upload():
+    return {"images": ("front.jpg", b"\xff\xd8fake", "image/jpeg")}
+
+
+def test_generate_bom_stream_emits_stage_and_final_events(client):
+    response = client.post("/api/v1/ai/generate-bom/stream", files=_upload())
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [name for name, _ in events] == ["stage", "item", "stage", "bom"]
+    assert events[1][1]["item"] == {"name": "Nylon"}
+    assert events[1][1]["category"] == "Shell"
+    assert events[2][1]["stage"] == "material_analysis"
+    assert events[2][1]["stage_time"] == 1.5
+    assert events[2][1]["bom"]["categories"][0]["category"] == "Shell"
+    assert events[3][1]["bom"]["total_cost"] == 12.5
+    assert events[3][1]["stage_timings"]["material_analysis"] == 1.5
+
+
+def test_generate_bom_stream_reports_errors_as_events(client, monkeypatch):
+    monkeypatch.setattr(inference, "bom_generator", FakeBOMGenerator(error=Exception("Error code: 429")))
+    
+    events = _events(client.post("/api/v1/ai/generate-bom/stream", files=_upload()).text)
+    
+    assert events[-1] == ("error", {
+        "status_code": 429,
+        "detail": "Groq API rate limit exceeded. Please wait a few minutes and try again."
+    })
+
+
+def test_generate_bom_rejects_non_images(client):
+    response = client.post(
+        "/api/v1/ai/generate-bom",
+        files={"images": ("notes.txt", b"hello", "text/plain")}
+    )
+    assert response.status_code == 400
+
+
+class FakeGroqService:
+    """GroqService stand-in for the bulk supplier and deferred-priority endpoints"""
+    
+    async def generate_supplier_recommendations_bulk(self, materials, on_result, preferred_countries=None):
+        for index, material in reversed(list(enumerate(materials))):
+            await on_result({"index": index, "material_name": material["material_name"], "success": True,
+                             "data": {"suppliers": []}, "cached": False})
+        return {"materials": len(materials), "unique_materials": len(materials), "cached": 0, "packs": 1}
+    
+    async def generate_material_price_forecast(self, **kwargs):
+        return {"forecasts": []}
+    
+    async def generate_market_demand_forecast(self, **kwargs):
+        return {"forecasts": []}
+
+
+def test_generate_suppliers_bulk_streams_ndjson(client, monkeypatch):
+    monkeypatch.setattr(inference, "groq_service", FakeGroqService())
+    materials = [
+        {"material_name": name, "material_type": "fabric", "quantity": 2, "unit": "m"}
+        for name in ("Nylon", "Polyester")
+    ]
+    
+    response = client.post("/api/v1/ai/generate-suppliers/bulk", json={"materials": materials})
+    
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["type"], line.get("index")) for line in lines] == [("material", 1), ("material", 0), ("done", None)]
+    assert lines[-1]["packs"] == 1
+    
+    # Bulk requests run interactively; a per-item priority is rejected, not dropped
+    materials[0]["priority"] = "deferred"
+    response = client.post("/api/v1/ai/generate-suppliers/bulk", json={"materials": materials})
+    assert response.status_code == 422
+
+
+class FakeJobQueue:
+    """Records deferred submissions without running them"""
+    
+    def __init__(self):
+        self.kinds = []
+    
+    async def submit_deferred(self, kind, generate):
+        self.kinds.append(kind)
+        return {"job_id": "job-1", "status": "running", "created_at": 0.0}
+
+
+def test_deferred_priority_returns_job_id(client, monkeypatch):
+    service = FakeGroqService()
+    service.deferred_batcher = object()
+    queue = FakeJobQueue()
+    monkeypatch.setattr(inference, "groq_service", service)
+    monkeypatch.setattr(inference, "job_queue", queue)
+    
+    response = client.post("/api/v1/ai/generate-price-forecast", json={
+        "material_name": "Cotton", "material_type": "FABRIC", "unit": "meter", "priority": "deferred"
+    })
+    
+    assert response.status_code == 202
+    assert response.json()["data"]["job_id"] == "job-1"
+    assert queue.kinds == ["price_forecast"]
+
+
+def test_deferred_priority_unavailable_without_batch_service(client, monkeypatch):
+    service = FakeGroqService()
+    service.deferred_batcher = None
+    monkeypatch.setattr(inference, "groq_service", service)
+    monkeypatch.setattr(inference, "job_queue", FakeJobQueue())
+    
+    response = client.post("/api/v1/ai/generate-market-forecast", json={
+        "product_name": "Bag", "bom_materials": ["Nylon"], "priority": "deferred"
+    })
+    
+    assert response.status_code == 503
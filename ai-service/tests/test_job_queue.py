@@ -0,0 +1,180 @@
+"""
+Background BOM job queue and job store tests
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routers import jobs
+from app.services.job_queue import BOMJobQueue, QueueFullError
+from app.services.job_store import SQLiteJobStore, create_job_store
+
+
+class FakeBOMGenerator:
+    """BOMGenerator stand-in gated on an event so tests control completion"""
+    
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+    
+    async def generate(self, images, description="", yield_buffer=10.0, on_stage_complete=None):
+        self.calls += 1
+        await on_stage_complete("product_analysis", 0.5, {})
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return {"bom": {"categories": [], "total_cost": 3.0}, "confidence": 0.9, "stage_timings": {"product_analysis": 0.5}}
+
+
+async def _wait_for(queue, job_id, status):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job never reached {status}: {job}")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteJobStore(str(tmp_path / "jobs.db"))
+
+
+@pytest.mark.asyncio
+async def test_job_runs_and_records_progress_and_result(store):
+    generator = FakeBOMGenerator()
+    queue = BOMJobQueue(generator, store, concurrency=1)
+    await queue.start()
+    
+    job = await queue.submit([{"data": b"img"}], description="mug")
+    assert job["status"] == "queued"
+    
+    running = await _wait_for(queue, job["job_id"], "running")
+    for _ in range(100):
+        if running["progress"]["completed_stages"]:
+            break
+        await asyncio.sleep(0.01)
+        running = await queue.get(job["job_id"])
+    assert running["progress"]["completed_stages"] == ["product_analysis"]
+    
+    generator.release.set()
+    done = await _wait_for(queue, job["job_id"], "succeeded")
+    assert done["result"]["bom"]["total_cost"] == 3.0
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_returns_original_job(store):
+    generator = FakeBOMGenerator()
+    queue = BOMJobQueue(generator, store, concurrency=1)
+    await queue.start()
+    
+    first = await queue.submit([{"data": b"img"}], idempotency_key="abc")
+    second = await queue.submit([{"data": b"img"}], idempotency_key="abc")
+    generator.release.set()
+    await _wait_for(queue, first["job_id"], "succeeded")
+    
+    assert second["job_id"] == first["job_id"]
+    assert generator.calls == 1
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_failures_keep_rate_limit_status(store):
+    generator = FakeBOMGenerator(error=Exception("Error code: 429"))
+    generator.release.set()
+    queue = BOMJobQueue(generator, store, concurrency=1)
+    await queue.start()
+    
+    job = await queue.submit([{"data": b"img"}])
+    failed = await _wait_for(queue, job["job_id"], "failed")
+    
+    assert failed["error"]["status_code"] == 429
+    await queue.stop()
+
+
+class FlakyJobStore(SQLiteJobStore):
+    """SQLite store whose next `failures` updates raise"""
+    
+    def __init__(self, db_path, failures=0):
+        super().__init__(db_path)
+        self.failures = failures
+    
+    async def update(self, job_id, **fields):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("store unavailable")
+        return await super().update(job_id, **fields)
+
+
+@pytest.mark.asyncio
+async def test_store_errors_fail_the_job_not_the_worker(tmp_path):
+    generator = FakeBOMGenerator()
+    generator.release.set()
+    store = FlakyJobStore(str(tmp_path / "jobs.db"), failures=1)
+    queue = BOMJobQueue(generator, store, concurrency=1)
+    await queue.start()
+    
+    # The first job's RUNNING write fails; the worker records the failure and moves on
+    first = await queue.submit([{"data": b"img"}])
+    failed = await _wait_for(queue, first["job_id"], "failed")
+    assert "store unavailable" in failed["error"]["detail"]
+    
+    second = await queue.submit([{"data": b"img"}])
+    await _wait_for(queue, second["job_id"], "succeeded")
+    assert generator.calls == 1
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_pending_limit_and_restart_recovery(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = BOMJobQueue(FakeBOMGenerator(), SQLiteJobStore(path), concurrency=1, max_pending=1)
+    # Workers not started, so the first job stays queued
+    job = await queue.submit([{"data": b"img"}])
+    with pytest.raises(QueueFullError):
+        await queue.submit([{"data": b"img"}])
+    await queue.stop()
+    
+    restarted = BOMJobQueue(FakeBOMGenerator(), create_job_store(path), concurrency=1)
+    await restarted.start()
+    orphan = await restarted.get(job["job_id"])
+    assert orphan["status"] == "failed"
+    assert "restart" in orphan["error"]["detail"]
+    await restarted.stop()
+
+
+def test_job_endpoints(tmp_path, monkeypatch):
+    app = FastAPI()
+    app.include_router(jobs.router)
+    
+    with TestClient(app) as client:
+        generator = FakeBOMGenerator()
+        queue = BOMJobQueue(generator, SQLiteJobStore(str(tmp_path / "jobs.db")), concurrency=1)
+        client.portal.call(queue.start)
+        monkeypatch.setattr(jobs, "job_queue", queue)
+        
+        response = client.post(
+            "/api/v1/ai/jobs/bom",
+            files={"images": ("front.jpg", b"\xff\xd8fake", "image/jpeg")},
+            headers={"Idempotency-Key": "req-1"}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["data"]["job_id"]
+        
+        assert client.get(f"/api/v1/ai/jobs/{job_id}/result").status_code == 409
+        assert client.get("/api/v1/ai/jobs/missing").status_code == 404
+        
+        client.portal.call(generator.release.set)
+        for _ in range(200):
+            if client.get(f"/api/v1/ai/jobs/{job_id}").json()["data"]["status"] == "succeeded":
+                break
+            time.sleep(0.01)
+        result = client.get(f"/api/v1/ai/jobs/{job_id}/result")
+        assert result.status_code == 200
+        assert result.json()["data"]["confidence"] == 0.9
+        client.portal.call(queue.stop)
@@ -0,0 +1,99 @@
+"""
+JSON repair tests, including a fuzz pass over truncated LLM-style outputs
+"""
+import json
+import random
+
+import pytest
+
+from app.utils.json_repair import repair_json, parse_json_prefix, stitch_json
+
+
+def _random_text(rng):
+    pieces = ["Denim", "14oz", "{brace}", "[bracket]", '"quoted"', "back\\slash", "ünïcødé", "a, b: c", "\n"]
+    return " ".join(rng.choice(pieces) for _ in range(rng.randint(1, 4)))
+
+
+def _random_bom(rng):
+    return {
+        "categories": [
+            {
+                "category": _random_text(rng),
+                "items": [
+                    {
+                        "name": _random_text(rng),
+                        "estimated_quantity": round(rng.uniform(0, 50), 2),
+                        "unit": rng.choice(["meter", "piece", "kg"]),
+                        "unit_cost": rng.choice([0, 1, -2.5e-3, 12345.678]),
+                        "specifications": {"details": _random_text(rng), "tags": [_random_text(rng)]},
+                        "in_stock": rng.choice([True, False, None]),
+                    }
+                    for _ in range(rng.randint(0, 4))
+                ],
+            }
+            for _ in range(rng.randint(1, 4))
+        ],
+        "confidence": rng.random(),
+    }
+
+
+def _strip_closers(repaired):
+    return repaired.rstrip("]}")
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fuzz_truncated_outputs(seed):
+    rng = random.Random(seed)
+    doc = _random_bom(rng)
+    text = json.dumps(doc, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+    
+    assert repair_json(text) == text
+    for cut in range(0, len(text), max(1, len(text) // 300)):
+        truncated = text[:cut]
+        repaired = repair_json(truncated)
+        if repaired is None:
+            continue
+        parsed = json.loads(repaired)
+        # The repaired document only ever adds closers to a prefix of the input
+        assert truncated.startswith(_strip_closers(repaired)[: len(truncated)])
+        assert isinstance(parsed, dict)
+
+
+def test_keeps_complete_items_and_drops_partial_ones():
+    text = '{"categories": [{"category": "A", "items": [{"name": "x", "unit_cost": 1.5}, {"na'
+    assert json.loads(repair_json(text)) == {
+        "categories": [{"category": "A", "items": [{"name": "x", "unit_cost": 1.5}]}]
+    }
+
+
+def test_ignores_braces_inside_strings_and_trailing_garbage():
+    assert repair_json('{"a": "}]{[", "b": [1, 2]} trailing text') == '{"a": "}]{[", "b": [1, 2]}'
+    assert repair_json('Sure! {"a": [true, null, "x\\"y"') == '{"a": [true, null, "x\\"y"]}'
+
+
+def test_number_cut_at_end_is_not_trusted():
+    assert repair_json('{"a": 1, "b": 12') == '{"a": 1}'
+
+
+def test_parse_json_prefix():
+    assert parse_json_prefix('{"a": [1, 2, ') == {"a": [1, 2]}
+    with pytest.raises(ValueError):
+        parse_json_prefix("no json here")
+
+
+def test_stitch_json_joins_continuations():
+    text = json.dumps(_random_bom(random.Random(7)))
+    cut = len(text) // 2
+
+    assert stitch_json(text[:cut], text[cut:]) == (text, text)
+    # A continuation that restates the end of the prefix
+    assert stitch_json(text[:cut], text[cut - 12:]) == (text, text)
+    # A continuation cut off again keeps the whole prefix
+    repaired, joined = stitch_json(text[:cut], text[cut:cut + 40])
+    assert json.loads(repaired)["categories"]
+    assert joined == text[:cut + 40]
+    # ... and its restated overlap is dropped from the join to resume from
+    assert stitch_json(text[:cut], text[cut - 12:cut + 40])[1] == text[:cut + 40]
+    # A continuation that does not fit the prefix
+    assert stitch_json(text[:cut], "I'm sorry, here is the full BOM:") is None
+
@@ -0,0 +1,86 @@
+"""
+Incremental categories[].items[] extraction tests
+"""
+import json
+import random
+
+from app.utils.json_stream import CategoryItemExtractor
+
+
+DOCUMENT = {
+    "product_name": "Backpack {v2}",
+    "categories": [
+        {
+            "category": "Shell \"outer\"",
+            "items": [
+                {"name": "Nylon", "specifications": {"denier": 420}, "tags": ["a", "]"]},
+                {"name": "Zipper", "quantity": 2}
+            ]
+        },
+        {"items": [{"name": "Foam"}], "category": "Padding"},
+        {"category": "Empty", "items": []}
+    ],
+    "items": [{"name": "not a category item"}]
+}
+
+
+def _feed_in_chunks(text, sizes):
+    extractor = CategoryItemExtractor()
+    events = []
+    pos = 0
+    for size in sizes:
+        events.extend(extractor.feed(text[pos:pos + size]))
+        pos += size
+    events.extend(extractor.feed(text[pos:]))
+    return extractor, events
+
+
+def test_extracts_items_with_category_names():
+    text = json.dumps(DOCUMENT, indent=2)
+    extractor, events = _feed_in_chunks(text, [len(text)])
+    
+    assert [(e["category"], e["category_index"], e["item"]["name"]) for e in events] == [
+        ('Shell "outer"', 0, "Nylon"),
+        ('Shell "outer"', 0, "Zipper"),
+        (None, 1, "Foam"),  # name arrives after the items array
+    ]
+    assert events[0]["item"]["tags"] == ["a", "]"]
+    assert extractor.buffer == text
+
+
+def test_chunking_does_not_change_results():
+    text = json.dumps(DOCUMENT)
+    _, expected = _feed_in_chunks(text, [len(text)])
+    
+    rng = random.Random(7)
+    for _ in range(50):
+        sizes = [rng.randint(1, 12) for _ in range(len(text))]
+        extractor, events = _feed_in_chunks(text, sizes)
+        assert events == expected
+        assert extractor.buffer == text
+
+
+def test_scan_window_holds_only_the_open_item():
+    document = {"categories": [{"category": "Bulk", "items": [{"name": f"item {n}", "qty": n} for n in range(2000)]}]}
+    text = json.dumps(document)
+    extractor = CategoryItemExtractor()
+    
+    widest = 0
+    events = []
+    for pos in range(0, len(text), 16):
+        events.extend(extractor.feed(text[pos:pos + 16]))
+        widest = max(widest, len(extractor._window))
+    
+    assert len(events) == 2000
+    assert widest < 64
+    assert extractor.buffer == text
+
+
+def test_items_are_reported_before_document_ends():
+    text = json.dumps(DOCUMENT)
+    cut = text.index('"Zipper"')
+    extractor = CategoryItemExtractor()
+    
+    events = extractor.feed(text[:cut])
+    
+    assert [e["item"]["name"] for e in events] == ["Nylon"]
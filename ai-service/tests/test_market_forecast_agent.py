@@ -0,0 +1,108 @@
+"""
+MarketForecastAgent tests
+"""
+import asyncio
+import json
+import re
+import pytest
+from types import SimpleNamespace
+
+from app.agents.market_forecast_agent import MarketForecastAgent, DEFAULT_MARKETS
+from app.services.response_cache import ResponseCache
+
+
+class FakeGroqService:
+    """Answers each shard with forecasts for the markets named in its prompt"""
+
+    def __init__(self, drop=None, fail_shards_with=None):
+        self.response_cache = ResponseCache()
+        self.drop = set(drop or [])
+        self.fail_shards_with = fail_shards_with
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_completion(self, **params):
+        markets = re.search(r"Target Markets: (.*)", params["messages"][-1]["content"]).group(1).split(", ")
+        self.calls.append(markets)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if self.fail_shards_with:
+            raise self.fail_shards_with
+        forecasts = [
+            {"country": market.upper(), "demand": "72", "competition": 40, "price": 60, "growth": "n/a"}
+            for market in markets if market not in self.drop
+        ]
+        forecasts.append({"country": "Atlantis", "demand": 99})
+        self.drop.clear()  # only the first attempt loses markets
+        content = json.dumps({"forecasts": forecasts, "summary": f"{len(markets)} markets"})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def _parse_json_response(self, text):
+        return json.loads(text)
+
+
+async def _forecast(agent, markets=None):
+    return await agent.generate_forecast("Backpack", "Nylon backpack", ["Nylon", "Zipper"], markets)
+
+
+@pytest.mark.asyncio
+async def test_default_markets_are_sharded_and_merged_in_order():
+    service = FakeGroqService()
+    agent = MarketForecastAgent(service, shard_size=6)
+
+    result = await _forecast(agent)
+
+    assert len(service.calls) == 4
+    assert service.max_in_flight == 4
+    assert [f["country"] for f in result["forecasts"]] == DEFAULT_MARKETS
+    assert result["missing_markets"] == []
+    assert result["forecasts"][0]["demand"] == 72.0
+    assert result["forecasts"][0]["growth"] == 50  # unparseable score falls back to default
+
+
+@pytest.mark.asyncio
+async def test_adding_a_market_only_requests_the_new_one():
+    service = FakeGroqService()
+    agent = MarketForecastAgent(service, shard_size=6)
+    await _forecast(agent, ["Japan", "Germany", "France"])
+
+    result = await _forecast(agent, ["Japan", "Germany", "France", "Kenya"])
+
+    assert service.calls[-1] == ["Kenya"]
+    assert len(service.calls) == 2
+    assert [f["country"] for f in result["forecasts"]] == ["Japan", "Germany", "France", "Kenya"]
+
+
+@pytest.mark.asyncio
+async def test_markets_missing_from_a_shard_are_retried_once():
+    service = FakeGroqService(drop={"Germany"})
+    agent = MarketForecastAgent(service, shard_size=2)
+
+    result = await _forecast(agent, ["Japan", "Germany", "France"])
+
+    assert service.calls[-1] == ["Germany"]
+    assert [f["country"] for f in result["forecasts"]] == ["Japan", "Germany", "France"]
+
+
+@pytest.mark.asyncio
+async def test_all_shards_failing_raises():
+    service = FakeGroqService(fail_shards_with=RuntimeError("boom"))
+    agent = MarketForecastAgent(service, shard_size=2)
+
+    with pytest.raises(RuntimeError):
+        await _forecast(agent, ["Japan", "Germany", "France"])
+
+
+@pytest.mark.asyncio
+async def test_single_shard_keeps_other_response_keys():
+    service = FakeGroqService()
+    agent = MarketForecastAgent(service, shard_size=0)
+
+    result = await _forecast(agent, ["Japan", "Germany", "France"])
+
+    assert service.calls == [["Japan", "Germany", "France"]]
+    assert result["summary"] == "3 markets"
+    assert [f["country"] for f in result["forecasts"]] == ["Japan", "Germany", "France"]
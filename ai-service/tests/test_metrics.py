@@ -0,0 +1,125 @@
+"""
+Prometheus instrumentation tests
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.api.middleware.metrics import MetricsMiddleware
+from app.api.routers import health, metrics as metrics_router
+from app.services.groq_service import GroqService
+from app.services.metrics import track_agent
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class UsageCompletions:
+    def __init__(self, failures=None):
+        self.failures = list(failures or [])
+    
+    async def create(self, **params):
+        if self.failures:
+            raise self.failures.pop(0)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="{}"), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30, total_tokens=150)
+        )
+
+
+class MetricsProbeAgent:
+    def __init__(self, groq_service):
+        self.groq_service = groq_service
+    
+    @track_agent
+    async def run(self):
+        await self.groq_service.chat_completion(
+            model="llama-3.1-8b-instant",
+            messages=[{"role": "user", "content": "probe"}],
+            temperature=0.0,
+            max_completion_tokens=32
+        )
+        return self.groq_service._parse_json_response('{"categories": [{"category": "A", "items": [')
+
+
+@pytest.fixture
+def groq_service(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    return GroqService()
+
+
+@pytest.mark.asyncio
+async def test_llm_metrics_are_labeled_by_agent_and_model(groq_service, monkeypatch):
+    async def no_sleep(delay):
+        pass
+    
+    monkeypatch.setattr("asyncio.sleep", no_sleep)
+    completions = UsageCompletions(failures=[Exception("Error code: 429 - rate limit")])
+    
+    async def create_raw(**params):
+        result = await completions.create(**params)
+        return SimpleNamespace(headers={}, parse=lambda: _resolved(result))
+    
+    async def _resolved(value):
+        return value
+    
+    groq_service.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        with_raw_response=SimpleNamespace(create=create_raw)
+    )))
+    labels = {"agent": "MetricsProbeAgent", "model": "llama-3.1-8b-instant"}
+    before = {
+        "calls": _sample("groq_llm_call_duration_seconds_count", outcome="ok", **labels),
+        "prompt": _sample("groq_llm_tokens_sum", kind="prompt", **labels),
+        "retries": _sample("groq_llm_retries_total", cause="rate_limit", **labels),
+        "repairs": _sample("groq_json_repair_fallbacks_total", agent="MetricsProbeAgent", outcome="repaired"),
+    }
+    
+    await MetricsProbeAgent(groq_service).run()
+    
+    assert _sample("groq_llm_call_duration_seconds_count", outcome="ok", **labels) == before["calls"] + 1
+    assert _sample("groq_llm_tokens_sum", kind="prompt", **labels) == before["prompt"] + 120
+    assert _sample("groq_llm_retries_total", cause="rate_limit", **labels) == before["retries"] + 1
+    assert _sample("groq_json_repair_fallbacks_total", agent="MetricsProbeAgent", outcome="repaired") == before["repairs"] + 1
+
+
+def test_metrics_endpoint_reports_route_latency():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(health.router)
+    app.include_router(metrics_router.router)
+    client = TestClient(app)
+    
+    client.get("/health")
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+
+
+def test_streaming_route_latency_covers_the_whole_body():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    
+    @app.get("/stream-probe")
+    async def stream_probe():
+        async def body():
+            for _ in range(3):
+                await asyncio.sleep(0.05)
+                yield b"chunk\n"
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+    
+    labels = dict(method="GET", route="/stream-probe", status="200")
+    before = _sample("http_request_duration_seconds_sum", **labels)
+    
+    response = TestClient(app).get("/stream-probe")
+    
+    assert response.text == "chunk\n" * 3
+    assert _sample("http_request_duration_seconds_count", **labels) == 1
+    assert _sample("http_request_duration_seconds_sum", **labels) - before >= 0.15
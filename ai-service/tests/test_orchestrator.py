@@ -0,0 +1,188 @@
+"""
+AnalysisOrchestrator tests
+"""
+import asyncio
+import time
+import pytest
+
+from app.agents.orchestrator import AnalysisOrchestrator
+
+
+MATERIAL_ANALYSIS = {
+    "categories": [
+        {
+            "category": "Shell Fabrication",
+            "items": [
+                {"name": "14oz Denim", "estimated_quantity": 2, "unit": "meter", "unit_cost": 5.0}
+            ]
+        }
+    ]
+}
+
+
+class FakeAgents:
+    """Agent stand-ins that record call order and simulate latency"""
+    
+    def __init__(self, delay=0.1, fail=None):
+        self.delay = delay
+        self.fail = fail or set()
+        self.events = []
+    
+    async def _step(self, name, result):
+        self.events.append(("start", name))
+        await asyncio.sleep(self.delay)
+        if name in self.fail:
+            raise Exception(f"{name} boom")
+        self.events.append(("end", name))
+        return result
+    
+    async def analyze(self, images, description=""):
+        return await self._step("product", {"product_category": "Apparel", "detected_components": ["shell"]})
+    
+    async def analyze_materials(self, product_analysis, images, on_item=None):
+        return await self._step("material", MATERIAL_ANALYSIS)
+    
+    async def analyze_manufacturing(self, product_analysis, material_analysis):
+        return await self._step("manufacturing", {"manufacturing_complexity": "low"})
+    
+    async def analyze_pricing(self, material_analysis):
+        return await self._step("pricing", MATERIAL_ANALYSIS)
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    from app.services.groq_service import GroqService
+    return AnalysisOrchestrator(GroqService())
+
+
+def _install(orchestrator, agents):
+    orchestrator.product_analyzer = agents
+    orchestrator.material_analyzer = agents
+    orchestrator.manufacturing_analyzer = agents
+    orchestrator.pricing_analyzer = agents
+
+
+@pytest.mark.asyncio
+async def test_manufacturing_and_pricing_run_concurrently(orchestrator):
+    agents = FakeAgents(delay=0.1)
+    _install(orchestrator, agents)
+    
+    start = time.perf_counter()
+    result = await orchestrator.analyze_product(images=[], description="jacket")
+    elapsed = time.perf_counter() - start
+    
+    # Three sequential levels of 0.1s each, not four
+    assert elapsed < 0.35
+    starts = [name for kind, name in agents.events if kind == "start"]
+    assert set(starts[2:]) == {"manufacturing", "pricing"}
+    assert agents.events.index(("start", "pricing")) < agents.events.index(("end", "manufacturing"))
+    
+    assert set(result["stage_timings"]) == {
+        "product_analysis", "material_analysis", "manufacturing_analysis", "pricing_analysis"
+    }
+    assert result["bom"]["categories"][0]["items"][0]["name"] == "14oz Denim"
+
+
+@pytest.mark.asyncio
+async def test_optional_stage_failure_uses_fallback(orchestrator):
+    _install(orchestrator, FakeAgents(delay=0, fail={"manufacturing"}))
+    
+    result = await orchestrator.analyze_product(images=[])
+    
+    assert result["manufacturing_analysis"]["manufacturing_processes"] == []
+    assert result["bom"]["manufacturing_complexity"] == "medium"
+
+
+@pytest.mark.asyncio
+async def test_required_stage_failure_aborts(orchestrator):
+    agents = FakeAgents(delay=0, fail={"material"})
+    _install(orchestrator, agents)
+    
+    with pytest.raises(Exception, match="Material analysis failed"):
+        await orchestrator.analyze_product(images=[])
+    assert ("start", "pricing") not in agents.events
+
+
+@pytest.mark.asyncio
+async def test_stage_callback_receives_partial_boms(orchestrator):
+    _install(orchestrator, FakeAgents(delay=0))
+    seen = []
+    
+    async def on_stage_complete(stage_name, stage_time, partial_bom):
+        seen.append((stage_name, len(partial_bom["categories"])))
+    
+    await orchestrator.analyze_product(images=[], on_stage_complete=on_stage_complete)
+    
+    assert seen[0] == ("product_analysis", 0)
+    assert seen[1] == ("material_analysis", 1)
+    assert {name for name, _ in seen[2:]} == {"manufacturing_analysis", "pricing_analysis"}
+
+
+class ChunkedMaterialAgent:
+    """Material agent stand-in returning one item per component plus shared packaging"""
+    
+    def __init__(self, delay=0.1, fail_chunk=None):
+        self.delay = delay
+        self.fail_chunk = fail_chunk
+        self.chunks = []
+    
+    async def analyze_materials(self, product_analysis, images, on_item=None, chunk=None):
+        self.chunks.append((chunk, product_analysis["detected_components"]))
+        await asyncio.sleep(self.delay)
+        if chunk is not None and chunk[0] == self.fail_chunk:
+            return {"categories": [], "error": "Material analysis failed: boom"}
+        items = [{"name": f"{component} fabric", "unit_cost": 1.0} for component in product_analysis["detected_components"]]
+        if on_item is not None:
+            await on_item({"category": "Shell", "category_index": 0, "item": items[0], "attempt": 1})
+        return {
+            "categories": [
+                {"category": "Shell", "items": items},
+                {"category": " packaging", "items": [{"name": "Poly Bag"}, {"name": "", "unit_cost": 0.1}]}
+            ],
+            "primary_materials": [chunk]
+        }
+
+
+@pytest.mark.asyncio
+async def test_material_analysis_runs_component_chunks_concurrently(orchestrator):
+    agent = ChunkedMaterialAgent(delay=0.1)
+    orchestrator.material_analyzer = agent
+    orchestrator.material_chunk_size = 4
+    streamed = []
+    
+    async def on_item(event):
+        streamed.append(event["chunk"])
+    
+    start = time.perf_counter()
+    result = await orchestrator._analyze_material_chunks(
+        {"detected_components": ["body", "sleeves", "collar", "cuffs", "pockets", "lining"]}, [], on_item
+    )
+    elapsed = time.perf_counter() - start
+    
+    assert elapsed < 0.18
+    assert [chunk for chunk, _ in agent.chunks] == [(0, 2), (1, 2)]
+    assert [len(components) for _, components in agent.chunks] == [3, 3]
+    assert sorted(streamed) == [0, 1]
+    # Same-named categories and items are merged once; unnamed items are never merged
+    assert [category["category"] for category in result["categories"]] == ["Shell", " packaging"]
+    assert len(result["categories"][0]["items"]) == 6
+    assert [item["name"] for item in result["categories"][1]["items"]] == ["Poly Bag", "", ""]
+    assert result["primary_materials"] == [(0, 2), (1, 2)]
+    assert "missing_components" not in result
+
+
+@pytest.mark.asyncio
+async def test_material_chunk_failure_keeps_other_chunks(orchestrator):
+    orchestrator.material_analyzer = ChunkedMaterialAgent(delay=0, fail_chunk=1)
+    orchestrator.material_chunk_size = 2
+    
+    result = await orchestrator._analyze_material_chunks({"detected_components": ["a", "b", "c", "d"]}, [])
+    
+    assert [item["name"] for item in result["categories"][0]["items"]] == ["a fabric", "b fabric"]
+    assert result["missing_components"] == ["c", "d"]
+    
+    # Small products keep the single whole-product call
+    orchestrator.material_analyzer = agent = ChunkedMaterialAgent(delay=0)
+    await orchestrator._analyze_material_chunks({"detected_components": ["a", "b"]}, [])
+    assert agent.chunks == [(None, ["a", "b"])]
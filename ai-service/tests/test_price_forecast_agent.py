@@ -0,0 +1,76 @@
+"""
+PriceForecastAgent tests
+"""
+import json
+import re
+import pytest
+from types import SimpleNamespace
+
+from app.agents.price_forecast_agent import PriceForecastAgent
+
+
+class FakeGroqService:
+    """Records searches and answers each material with a weekly price series"""
+
+    def __init__(self, fail_materials=()):
+        self.searches = []
+        self.forecasts = []
+        self.fail_materials = set(fail_materials)
+
+    async def search_web_async(self, query):
+        self.searches.append(query)
+        return {"query": query, "results": f"context for {query.split(' materials')[0]}"}
+
+    async def chat_completion(self, **params):
+        prompt = params["messages"][-1]["content"]
+        material = re.search(r"Material: (.*)", prompt).group(1)
+        self.forecasts.append((material, params["model"], prompt))
+        if material in self.fail_materials:
+            raise RuntimeError("model overloaded")
+        base = 10.0 if "Cotton" in material else 1.0
+        points = [{"week": week, "price": base + week / 10} for week in (1, 2, 4)]
+        content = json.dumps({"forecasts": points})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def _parse_json_response(self, text):
+        return json.loads(text)
+
+
+def _material(name, material_type, unit="meter"):
+    return {"material_name": name, "material_type": material_type, "unit": unit}
+
+
+@pytest.mark.asyncio
+async def test_batch_forecast_shares_one_search_per_material_type():
+    service = FakeGroqService()
+    agent = PriceForecastAgent(service)
+    materials = [
+        _material("Cotton", "FABRIC"), _material("Brass Button", "HARDWARE", "piece"),
+        _material("Denim", "fabric"), _material("cotton ", "FABRIC")
+    ]
+
+    result = await agent.generate_forecasts_batch(materials, weeks=4)
+
+    assert len(service.searches) == 2
+    assert all("4-week price trends" in query for query in service.searches)
+    assert len(service.forecasts) == 3  # duplicate cotton row is forecast once
+    assert all(model == "llama-3.1-8b-instant" for _, model, _ in service.forecasts)
+    prompts = {material: prompt for material, _, prompt in service.forecasts}
+    assert "price trends for FABRIC" in prompts["Denim"]
+    assert "price trends for HARDWARE" in prompts["Brass Button"]
+    assert result["weeks"] == [1, 2, 3, 4]
+    assert result["prices"][0] == [10.1, 10.2, None, 10.4]
+    assert result["prices"][3] == result["prices"][0]
+    assert result["groups"] == {"FABRIC": [0, 2, 3], "HARDWARE": [1]}
+    assert result["errors"] == []
+
+
+@pytest.mark.asyncio
+async def test_batch_forecast_reports_failed_materials_per_row():
+    service = FakeGroqService(fail_materials={"Denim"})
+    agent = PriceForecastAgent(service)
+
+    result = await agent.generate_forecasts_batch([_material("Cotton", "FABRIC"), _material("Denim", "FABRIC")], weeks=2)
+
+    assert result["prices"] == [[10.1, 10.2], None]
+    assert result["errors"] == [{"index": 1, "material_name": "Denim", "error": "model overloaded"}]
@@ -0,0 +1,136 @@
+"""
+PricingAnalyzerAgent tests
+"""
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+
+from app.agents.pricing_analyzer import PricingAnalyzerAgent
+from app.services.response_cache import ResponseCache
+
+
+MATERIAL_ANALYSIS = {
+    "categories": [
+        {"category": "Shell Fabrication", "items": [
+            {"name": "14oz Denim", "specifications": {"weight": "14oz"}, "estimated_quantity": 2, "unit": "meter", "unit_cost": 5.0},
+            {"name": "Cotton Twill", "specifications": {"weight": "8oz"}, "estimated_quantity": 0.5, "unit": "meter", "unit_cost": 3.0},
+            {"name": "Interfacing", "specifications": {}, "estimated_quantity": 0.2, "unit": "meter", "unit_cost": 1.0}
+        ]},
+        {"category": "Trims & Hardware", "items": [
+            {"name": "Copper Button", "specifications": {"size": "17mm"}, "estimated_quantity": 6, "unit": "piece", "unit_cost": 0.3},
+            {"name": "Rivet", "specifications": {"size": "9mm"}, "estimated_quantity": 6, "unit": "piece", "unit_cost": 0.1}
+        ]},
+        {"category": "Labels & Packaging", "items": [
+            {"name": "Woven Label", "specifications": {}, "estimated_quantity": 1, "unit": "piece", "unit_cost": 0.2}
+        ]}
+    ]
+}
+
+
+class FakeGroqService:
+    """Prices every item named in a batch prompt at double its material unit cost"""
+
+    def __init__(self, fail_category=None):
+        self.response_cache = ResponseCache()
+        self.fail_category = fail_category
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_completion(self, **params):
+        content = params["messages"][-1]["content"]
+        table = json.loads(content.split("item_columns):\n")[1].split("\n\nReview")[0])
+        requested = [category["category"] for category in table["categories"]]
+        self.calls.append(requested)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if self.fail_category in requested:
+            raise Exception("boom")
+        name, unit_cost = table["item_columns"].index("name"), table["item_columns"].index("unit_cost")
+        categories = [
+            # The model shouts category names back; items are matched case-insensitively
+            {"category": category["category"].upper(), "items": [
+                {"name": row[name], "unit_cost": row[unit_cost] * 2, "price_source": "Wholesale market"}
+                for row in category["items"]
+            ]}
+            for category in table["categories"]
+        ]
+        # Restated items from other batches are ignored; new ones are kept
+        categories[0]["items"] += [{"name": "14oz denim", "unit_cost": 99}, {"name": "Thread", "unit_cost": 0.05}]
+        content = json.dumps({"pricing_analysis": {"currency": "USD"}, "categories": categories, "cost_drivers": [{"factor": "cotton"}]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")])
+
+    def _parse_json_response(self, text):
+        return json.loads(text)
+
+
+def _prices(result):
+    return {item["name"]: item["unit_cost"] for category in result["categories"] for item in category["items"]}
+
+
+@pytest.mark.asyncio
+async def test_batches_run_concurrently_and_merge_in_material_order():
+    service = FakeGroqService()
+
+    result = await PricingAnalyzerAgent(service, items_per_call=4).analyze_pricing(MATERIAL_ANALYSIS)
+
+    # Categories share a batch while they fit: 3 items, then 2 + 1
+    assert service.calls == [["Shell Fabrication"], ["Trims & Hardware", "Labels & Packaging"]]
+    assert service.max_in_flight == 2
+    assert [category["category"] for category in result["categories"]] == ["Shell Fabrication", "Trims & Hardware", "Labels & Packaging"]
+    assert _prices(result) == {
+        "14oz Denim": 10.0, "Cotton Twill": 6.0, "Interfacing": 2.0, "Thread": 0.05,
+        "Copper Button": 0.6, "Rivet": 0.2, "Woven Label": 0.4
+    }
+    assert result["categories"][0]["items"][-1]["name"] == "Thread"
+    assert result["categories"][0]["items"][0]["estimated_quantity"] == 2
+    assert result["cost_drivers"] == [{"factor": "cotton"}, {"factor": "cotton"}]
+    assert result["pricing_analysis"] == {"currency": "USD"}
+
+
+@pytest.mark.asyncio
+async def test_indexed_prices_skip_the_llm():
+    service = FakeGroqService()
+    agent = PricingAnalyzerAgent(service, items_per_call=2)
+    first = await agent.analyze_pricing(MATERIAL_ANALYSIS)
+    calls = len(service.calls)
+
+    again = await agent.analyze_pricing(MATERIAL_ANALYSIS)
+
+    assert len(service.calls) == calls
+    # Only material analysis items are indexed, not the model's additions
+    assert _prices(again) == {name: price for name, price in _prices(first).items() if name != "Thread"}
+    assert "total_cost" not in again["categories"][0]["items"][0]
+    assert again["pricing_analysis"]["market_conditions"] == "Prices from the material price index"
+
+    # A new material or changed specifications still go to the model
+    changed = json.loads(json.dumps(MATERIAL_ANALYSIS))
+    changed["categories"][1]["items"][0]["specifications"]["size"] = "20mm"
+    await agent.analyze_pricing(changed)
+    assert service.calls[calls:] == [["Trims & Hardware"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_keeps_material_prices(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def no_backoff(delay, *args, **kwargs):
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", no_backoff)
+    service = FakeGroqService(fail_category="Trims & Hardware")
+
+    result = await PricingAnalyzerAgent(service, items_per_call=3).analyze_pricing(MATERIAL_ANALYSIS)
+
+    prices = _prices(result)
+    assert prices["14oz Denim"] == 10.0
+    assert prices["Copper Button"] == 0.3 and prices["Woven Label"] == 0.2
+
+    # Every batch failing returns the material analysis fallback
+    service = FakeGroqService(fail_category="Shell Fabrication")
+    fallback = await PricingAnalyzerAgent(service, items_per_call=0).analyze_pricing(MATERIAL_ANALYSIS)
+    assert fallback["categories"] == MATERIAL_ANALYSIS["categories"]
+    assert fallback["materials_pricing"] == []
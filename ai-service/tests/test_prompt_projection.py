@@ -0,0 +1,73 @@
+"""
+Compact prompt serialization tests
+"""
+import json
+import os
+
+import pytest
+
+from app.agents.manufacturing_analyzer import ManufacturingAnalyzerAgent
+from app.agents.pricing_analyzer import PricingAnalyzerAgent
+from app.utils.prompt_projection import item_table, project, to_prompt_json
+from benchmarks.bench_prompt_tokens import CapturingGroqService
+
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures", "denim_jacket.json")
+
+
+def test_project_keeps_declared_fields_only():
+    analysis = {
+        "product_category": "Apparel",
+        "confidence": 0.9,
+        "key_materials": [],
+        "detected_components": [
+            {"name": "Body", "type": "Shell", "notes": "rigid", "dimensions": None},
+            "zipper"
+        ],
+        "product_properties": {"finish": "Rinse", "color": "Indigo"}
+    }
+
+    projected = project(analysis, {
+        "product_category": True,
+        "key_materials": True,
+        "detected_components": {"name": True, "type": True, "dimensions": True},
+        "product_properties": {"finish": True}
+    })
+
+    assert projected == {
+        "product_category": "Apparel",
+        "detected_components": [{"name": "Body", "type": "Shell"}, "zipper"],
+        "product_properties": {"finish": "Rinse"}
+    }
+    assert to_prompt_json({"name": "Café", "qty": [1, 2]}) == '{"name":"Café","qty":[1,2]}'
+
+
+def test_item_table_lists_columns_once():
+    table = item_table(
+        [{"category": "Trims", "items": [{"name": "Button", "unit_cost": 0.3, "total_cost": 1.8}, {"name": "Rivet"}]}],
+        ["name", "unit_cost"]
+    )
+
+    assert table == {
+        "item_columns": ["name", "unit_cost"],
+        "categories": [{"category": "Trims", "items": [["Button", 0.3], ["Rivet", None]]}]
+    }
+    assert item_table(None, ["name"])["categories"] == []
+
+
+@pytest.mark.asyncio
+async def test_stage_prompts_carry_compact_projections():
+    with open(FIXTURE, encoding="utf-8") as f:
+        fixture = json.load(f)
+    service = CapturingGroqService()
+
+    await ManufacturingAnalyzerAgent(service).analyze_manufacturing(fixture["product_analysis"], fixture["material_analysis"])
+    manufacturing_prompt = service.messages[-1]["content"]
+    await PricingAnalyzerAgent(service, items_per_call=0).analyze_pricing(fixture["material_analysis"])
+    pricing_prompt = service.messages[-1]["content"]
+
+    assert '\n  "' not in manufacturing_prompt and '\n  "' not in pricing_prompt
+    # Fields no downstream stage reads stay out of the prompt
+    assert "overall_confidence" not in manufacturing_prompt and "unit_cost" not in manufacturing_prompt
+    assert "supplier_notes" not in pricing_prompt and "total_cost" not in pricing_prompt.split("Material Analysis")[1].split("Review")[0]
+    assert '["14oz Selvedge Denim","Primary Fabric",' in pricing_prompt
@@ -0,0 +1,55 @@
+"""
+Prompt registry tests
+"""
+import pytest
+
+from app.agents.prompts.registry import PROMPTS, ChatPrompt, get_prompt, register_prompt
+from benchmarks.bench_prompt_render import load_all_prompts, sample_values
+
+
+def test_every_prompt_renders_like_langchain():
+    prompts = pytest.importorskip("langchain_core.prompts")
+    load_all_prompts()
+    assert len(PROMPTS) >= 14
+
+    for name, prompt in PROMPTS.items():
+        legacy = prompts.ChatPromptTemplate.from_messages([
+            prompts.SystemMessagePromptTemplate.from_template(prompt.system.template),
+            prompts.HumanMessagePromptTemplate.from_template(prompt.human.template)
+        ])
+        values = sample_values(prompt)
+        expected = [
+            {"role": {"system": "system", "human": "user"}[message.type], "content": message.content}
+            for message in legacy.format_messages(**values)
+        ]
+        assert prompt.render(**values) == expected, name
+        assert prompt.input_variables == sorted(legacy.input_variables), name
+
+
+def test_static_system_message_is_rendered_once_and_messages_are_fresh():
+    prompt = ChatPrompt("test", "You price {{materials}}.", "Cost: ${cost:.2f} for {name}")
+
+    first = prompt.render(cost=3, name="denim")
+    second = prompt.render(cost=4.125, name="twill")
+    first[-1]["content"] += " (be concise)"
+
+    assert prompt.system.static == "You price {materials}."
+    assert first[0]["content"] is second[0]["content"]
+    assert second == [
+        {"role": "system", "content": "You price {materials}."},
+        {"role": "user", "content": "Cost: $4.12 for twill"}
+    ]
+    assert prompt.input_variables == ["cost", "name"]
+    with pytest.raises(KeyError):
+        prompt.render(cost=1)
+
+
+def test_registry_rejects_bad_fields_and_duplicates():
+    with pytest.raises(ValueError):
+        ChatPrompt("bad", "system", "{material.name}")
+
+    registered = register_prompt("test_registry_prompt", "system", "{x}")
+    assert get_prompt("test_registry_prompt") is registered
+    with pytest.raises(ValueError):
+        register_prompt("test_registry_prompt", "system", "{x}")
+    PROMPTS.pop("test_registry_prompt")
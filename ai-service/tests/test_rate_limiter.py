@@ -0,0 +1,94 @@
+"""
+Per-model token-bucket rate limiter tests
+"""
+import asyncio
+
+import pytest
+
+from app.services.rate_limiter import (
+    RateLimiter,
+    RateLimitExceeded,
+    estimate_tokens,
+    parse_duration,
+    parse_limits,
+)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    
+    async def fake_sleep(delay):
+        recorded.append(delay)
+    
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def test_parse_helpers():
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("3") == 3.0
+    assert parse_duration("soon") is None
+    assert parse_limits("llama-3.1-8b-instant=60:12000, bad") == {"llama-3.1-8b-instant": (60, 12000)}
+
+
+def test_estimate_counts_text_images_and_expected_output():
+    messages = [
+        {"role": "system", "content": "x" * 400},
+        {"role": "user", "content": [
+            {"type": "text", "text": "y" * 40},
+            {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,..."}}
+        ]}
+    ]
+    assert estimate_tokens(messages, max_completion_tokens=256) == 100 + 10 + 1024 + 256
+
+
+@pytest.mark.asyncio
+async def test_callers_queue_in_order_once_budget_is_spent(sleeps):
+    limiter = RateLimiter(limits={"m": (2, 100000)}, max_wait=120)
+    
+    for _ in range(4):
+        await limiter.acquire("m", 10)
+    
+    # Two requests fit the burst; the rest wait 30s apiece at 2 RPM
+    assert sleeps[0] == pytest.approx(30, abs=0.1)
+    assert sleeps[1] == pytest.approx(60, abs=0.1)
+    stats = limiter.stats()["models"]["m"]
+    assert stats["acquired"] == 4
+    assert stats["queue_wait_seconds"]["max"] == pytest.approx(60, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_callers_are_shed_when_wait_exceeds_limit(sleeps):
+    limiter = RateLimiter(limits={"m": (60, 1000)}, max_wait=5)
+    
+    await limiter.acquire("m", 1000)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire("m", 500)
+    
+    assert sleeps == []
+    assert limiter.stats()["models"]["m"]["shed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_headers_recalibrate_budget(sleeps):
+    limiter = RateLimiter(limits={"m": (30, 6000)}, max_wait=600)
+    
+    limiter.calibrate("m", {"x-ratelimit-limit-tokens": "12000", "x-ratelimit-remaining-tokens": "200"})
+    stats = limiter.stats()["models"]["m"]
+    assert stats["tpm"] == 12000
+    assert stats["available_tokens"] <= 201
+    
+    limiter.calibrate("m", {"retry-after": "12"}, rate_limited=True)
+    await limiter.acquire("m", 10)
+    assert sleeps[0] == pytest.approx(12, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_disabled_limiter_never_waits(sleeps):
+    limiter = RateLimiter(limits={"m": (1, 10)}, enabled=False)
+    for _ in range(5):
+        assert await limiter.acquire("m", 1000) == 0
+    assert sleeps == []
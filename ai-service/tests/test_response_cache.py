@@ -0,0 +1,124 @@
+"""
+ResponseCache tests
+"""
+import pytest
+
+from app.services.response_cache import ResponseCache, make_cache_key, parse_ttls
+
+
+PARAMS = {
+    "model": "llama-3.1-8b-instant",
+    "messages": [{"role": "user", "content": "Cotton price"}],
+    "temperature": 0.6,
+    "max_completion_tokens": 1024,
+    "response_format": {"type": "json_object"}
+}
+
+
+def test_cache_key_is_canonical():
+    reordered = dict(reversed(list(PARAMS.items())))
+    assert make_cache_key(PARAMS) == make_cache_key(reordered)
+    assert make_cache_key(PARAMS) != make_cache_key({**PARAMS, "temperature": 0.7})
+
+
+def test_parse_ttls():
+    assert parse_ttls("price_forecast=600, default=0") == {"price_forecast": 600.0, "default": 0.0}
+    assert parse_ttls(None) == {}
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_is_bounded_lru():
+    cache = ResponseCache(max_entries=2)
+    await cache.set("a", "A")
+    await cache.set("b", "B")
+    assert await cache.get("a") == "A"  # "a" becomes most recently used
+    await cache.set("c", "C")
+    
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "A"
+    assert await cache.get("c") == "C"
+    assert cache.stats()["namespaces"]["default"] == {
+        "memory_hits": 3, "disk_hits": 0, "misses": 1, "stores": 3
+    }
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_is_bounded_by_bytes():
+    cache = ResponseCache(max_bytes=10)
+    await cache.set("a", "é" * 3)  # 6 bytes encoded
+    await cache.set("b", "bbbb")
+    await cache.set("c", "cc")  # 12 bytes: evicts "a"
+    await cache.set("huge", "x" * 11)  # never fits in memory
+
+    assert await cache.get("a") is None
+    assert await cache.get("huge") is None
+    assert await cache.get("b") == "bbbb" and await cache.get("c") == "cc"
+    await cache.set("b", "b")
+    assert cache.stats()["memory_bytes"] == 3
+
+
+@pytest.mark.asyncio
+async def test_namespace_ttls(monkeypatch):
+    cache = ResponseCache(ttls={"price_forecast": 10, "market_forecast": 0})
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.response_cache.time.time", lambda: clock[0])
+    
+    await cache.set("k", "v", "price_forecast")
+    await cache.set("m", "v", "market_forecast")
+    assert await cache.get("k", "price_forecast") == "v"
+    assert await cache.get("m", "market_forecast") is None
+    
+    clock[0] += 11
+    assert await cache.get("k", "price_forecast") is None
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    first = ResponseCache(db_path=db_path)
+    await first.set("k", '{"x": 1}', "supplier_contact")
+    first.close()
+    
+    second = ResponseCache(db_path=db_path)
+    assert await second.get("k", "supplier_contact") == '{"x": 1}'
+    assert second.stats()["namespaces"]["supplier_contact"]["disk_hits"] == 1
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_deletes_expired_rows_and_is_capped(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.response_cache.time.time", lambda: clock[0])
+    db_path = str(tmp_path / "cache.db")
+    cache = ResponseCache(db_path=db_path, ttls={"default": 10, "long": 100}, max_disk_entries=3, prune_every=4)
+    
+    def rows():
+        return [row[0] for row in cache._db.execute("SELECT key FROM responses ORDER BY key")]
+    
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    await cache.set("keep", "3", "long")
+    clock[0] += 11
+    
+    # A stale row is deleted when it is read
+    cache._forget("a")
+    assert await cache.get("a") is None
+    assert rows() == ["b", "keep"]
+    
+    # The fourth store prunes expired rows and trims to the cap
+    await cache.set("c", "4", "long")
+    clock[0] += 1
+    await cache.set("d", "5", "long")
+    assert rows() == ["c", "d", "keep"]
+    for key in ("e", "f", "g"):
+        clock[0] += 1
+        await cache.set(key, key, "long")
+    # The soonest-expiring rows go first
+    assert rows() == ["e", "f", "g"]
+    cache.close()
+    
+    # Expired rows are also deleted when the table is opened
+    clock[0] += 200
+    reopened = ResponseCache(db_path=db_path)
+    assert reopened._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+    reopened.close()
@@ -0,0 +1,114 @@
+"""
+Single-flight request coalescing tests
+"""
+import asyncio
+
+import pytest
+
+from app.services import metrics
+from app.services.deferred_batcher import deferred_priority
+from app.services.groq_service import GroqService
+from app.services.single_flight import SingleFlight, request_key
+
+
+class CountingForecastAgent:
+    """MarketForecastAgent stand-in that counts calls and answers after a short delay"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_forecast(self, product_name, product_description, bom_materials, target_markets=None):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return {"forecasts": [{"country": market} for market in target_markets or []]}
+
+
+def _coalesced(operation):
+    return metrics.COALESCED_CALLS.labels(operation)._value.get()
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_calls_share_one_agent_call(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    groq_service = GroqService()
+    agent = groq_service._market_forecast_agent = CountingForecastAgent()
+    before = _coalesced("market_forecast")
+
+    results = await asyncio.gather(
+        groq_service.generate_market_demand_forecast("Denim Jacket", "Indigo denim", ["Denim"], ["USA", "Japan"]),
+        groq_service.generate_market_demand_forecast("denim jacket ", "indigo denim", ["denim"], ["usa", "japan"]),
+        groq_service.generate_market_demand_forecast(
+            product_name="Denim Jacket", product_description="Indigo denim", bom_materials=["Denim"],
+            target_markets=["USA", "Japan"]
+        ),
+        groq_service.generate_market_demand_forecast("Denim Jacket", "Indigo denim", ["Denim"], ["Japan", "USA"])
+    )
+
+    # Keyword and positional calls bind to the same arguments; a change in case or
+    # spacing, or a reordered market list, is a different request
+    assert agent.calls == 3
+    assert results[0] is results[2]
+    assert results[1] is not results[0]
+    assert results[3]["forecasts"][0]["country"] == "Japan"
+    assert _coalesced("market_forecast") - before == 1
+    assert groq_service.single_flight.stats()["in_flight"] == 0
+
+    # Finished calls are not reused; that is the response cache's job
+    await groq_service.generate_market_demand_forecast("Denim Jacket", "Indigo denim", ["Denim"], ["USA", "Japan"])
+    assert agent.calls == 4
+    await groq_service.aclose()
+
+
+def test_deferred_and_interactive_calls_are_not_coalesced():
+    interactive = request_key("market_forecast", {"product_name": "Jacket"})
+    with deferred_priority():
+        deferred = request_key("market_forecast", {"product_name": "Jacket"})
+
+    assert interactive != deferred
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_leaves_others_running_until_the_last_one_goes():
+    flights = SingleFlight()
+    started = asyncio.Event()
+    finished = []
+
+    async def work():
+        started.set()
+        await asyncio.sleep(0.05)
+        finished.append(True)
+        return "done"
+
+    first = asyncio.create_task(flights.do("key", work))
+    second = asyncio.create_task(flights.do("key", work))
+    await started.wait()
+    first.cancel()
+
+    assert await second == "done"
+    assert finished == [True]
+
+    lone = asyncio.create_task(flights.do("other", work))
+    await asyncio.sleep(0.01)
+    lone.cancel()
+    await asyncio.sleep(0.08)
+    assert finished == [True]
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_disabled_table_runs_every_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(flights.do("key", failing), flights.do("key", failing), return_exceptions=True)
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    disabled = SingleFlight(enabled=False)
+    await asyncio.gather(*[disabled.do("key", failing) for _ in range(3)], return_exceptions=True)
+    assert len(calls) == 4
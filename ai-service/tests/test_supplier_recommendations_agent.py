@@ -0,0 +1,126 @@
+"""
+SupplierRecommendationsAgent tests
+"""
+import json
+import re
+import pytest
+from types import SimpleNamespace
+
+from app.agents.supplier_recommendations_agent import SupplierRecommendationsAgent
+from app.services.response_cache import ResponseCache
+
+
+class FakeGroqService:
+    """Answers bulk packs per material id and single requests with one supplier"""
+
+    def __init__(self, skip_ids=(), single_content=None):
+        self.response_cache = ResponseCache()
+        self.skip_ids = set(skip_ids)
+        self.single_content = single_content or {"suppliers": [{"name": "Single Supplier"}]}
+        self.packs = []
+        self.prompts = []
+        self.singles = []
+
+    async def chat_completion(self, **params):
+        prompt = params["messages"][-1]["content"]
+        ids = re.findall(r"^(m\d+): ", prompt, re.MULTILINE)
+        if ids:
+            self.packs.append(ids)
+            self.prompts.append(prompt)
+            content = {"materials": [
+                {"id": material_id, "suppliers": [
+                    {"name": f"Supplier {material_id}", "rating": 4.0},
+                    {"name": f"supplier {material_id} ", "rating": 3.0},
+                ]}
+                for material_id in ids if material_id not in self.skip_ids
+            ]}
+        else:
+            self.singles.append(re.search(r"Material: (.*)", prompt).group(1))
+            content = self.single_content
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(content)))])
+
+    def _parse_json_response(self, text):
+        return json.loads(text)
+
+
+def _material(name, quantity=1.0, material_type="fabric", unit="m"):
+    return {"material_name": name, "material_type": material_type, "quantity": quantity, "unit": unit}
+
+
+async def _bulk(agent, materials):
+    results = []
+
+    async def on_result(result):
+        results.append(result)
+
+    summary = await agent.find_suppliers_bulk(materials, on_result)
+    return summary, sorted(results, key=lambda r: r["index"])
+
+
+@pytest.mark.asyncio
+async def test_equivalent_materials_are_requested_once_and_packed():
+    service = FakeGroqService()
+    agent = SupplierRecommendationsAgent(service, pack_token_budget=2000)
+    materials = [_material("Nylon 420D"), _material("nylon-420d ", 2), _material("YKK Zipper", unit="pcs"),
+                 _material("Polyester Webbing"), _material("Cotton Thread")]
+
+    summary, results = await _bulk(agent, materials)
+
+    assert summary == {"materials": 5, "unique_materials": 4, "cached": 0, "packs": 2}
+    assert [len(pack) for pack in service.packs] == [2, 2]
+    assert "m1: Nylon 420D | Type: fabric | Quantity Needed: 3 m" in service.prompts[0]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["data"] == results[1]["data"]
+    assert results[0]["data"]["suppliers"] == [{"name": "Supplier m1", "rating": 4.0}]
+
+
+@pytest.mark.asyncio
+async def test_materials_missing_from_a_pack_fall_back_to_single_requests():
+    service = FakeGroqService(skip_ids={"m2"})
+    agent = SupplierRecommendationsAgent(service)
+
+    _, results = await _bulk(agent, [_material("Nylon"), _material("Leather", material_type="leather")])
+
+    assert service.singles == ["Leather"]
+    assert results[1]["data"]["suppliers"] == [{"name": "Single Supplier"}]
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_are_served_from_the_material_cache():
+    service = FakeGroqService()
+    agent = SupplierRecommendationsAgent(service)
+    await _bulk(agent, [_material("Nylon"), _material("Leather")])
+
+    summary, results = await _bulk(agent, [_material("Leather"), _material("Canvas")])
+
+    assert summary["cached"] == 1
+    assert service.packs[-1] == ["m2"]
+    assert [r["cached"] for r in results] == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_cached_materials_are_keyed_by_quantity_magnitude():
+    service = FakeGroqService()
+    agent = SupplierRecommendationsAgent(service)
+    await _bulk(agent, [_material("Leather", 20)])
+
+    summary, _ = await _bulk(agent, [_material("Leather", 5000)])
+    assert summary["cached"] == 0
+
+    # 20 and 50 share an order of magnitude
+    summary, _ = await _bulk(agent, [_material("Leather", 50)])
+    assert summary["cached"] == 1
+
+
+@pytest.mark.asyncio
+async def test_incomplete_fallback_results_are_not_cached():
+    # A repaired partial response without a suppliers list
+    service = FakeGroqService(skip_ids={"m1"}, single_content={"material": "Leather"})
+    agent = SupplierRecommendationsAgent(service)
+    _, results = await _bulk(agent, [_material("Leather")])
+    assert results[0]["data"] == {"material": "Leather"}
+
+    summary, _ = await _bulk(agent, [_material("Leather")])
+
+    assert summary["cached"] == 0
+    assert service.singles == ["Leather", "Leather"]